@@ -1,25 +1,116 @@
 import datetime
-import requests
 import os
-import argparse
-import re
+import array
+import bisect
+import csv
+import io
+import itertools
 import json
-from dateutil.easter import easter
-from dateutil.relativedelta import relativedelta as rd, FR
-from holidays.constants import JAN, MAY, AUG, OCT, NOV, DEC
-from holidays.holiday_base import HolidayBase
+import sys
+import mmap
+import struct
+import threading
+import time
+from collections import OrderedDict, deque
 
+# requests, dateutil, asyncio, numpy y argparse se importan solo en las
+# rutas que los usan, asi una consulta sin conexion no paga su tiempo de carga
+# (ver benchmarks.py --presupuesto-importacion).
 
-class FestividadesEcuador(HolidayBase):
+# Meses, con los mismos valores que holidays.constants
+JAN, FEB, MAR, APR, MAY, JUN, JUL, AUG, SEP, OCT, NOV, DEC = range(1, 13)
+
+# ISO 3166-2 codigos para las principal subdivision, 
+# llamadas provincias
+# https://es.wikipedia.org/wiki/ISO_3166-2:EC
+PROVINCIAS = [
+    "EC-A",  # Azuay
+    "EC-B",  # Bolívar
+    "EC-C",  # Carchi
+    "EC-D",  # Orellana
+    "EC-E",  # Esmeraldas
+    "EC-F",  # Cañar
+    "EC-G",  # Guayas
+    "EC-H",  # Chimborazo
+    "EC-I",  # Imbabura
+    "EC-L",  # Loja
+    "EC-M",  # Manabí
+    "EC-N",  # Napo
+    "EC-O",  # El Oro
+    "EC-P",  # Pichincha
+    "EC-R",  # Los Ríos
+    "EC-S",  # Morona Santiago
+    "EC-SD",  # Santo Domingo de los Tsáchilas
+    "EC-SE",  # Santa Elena
+    "EC-T",  # Tungurahua
+    "EC-U",  # Sucumbíos
+    "EC-W",  # Galápagos
+    "EC-X",  # Cotopaxi
+    "EC-Y",  # Pastaza
+    "EC-Z",  # Zamora Chinchipe
+]
+
+# Nombres de las provincias, para reconocerlas en el campo location de la API
+# (ver ConciliadorFestivos)
+NOMBRES_PROVINCIAS = {
+    "EC-A": "Azuay",
+    "EC-B": "Bolívar",
+    "EC-C": "Carchi",
+    "EC-D": "Orellana",
+    "EC-E": "Esmeraldas",
+    "EC-F": "Cañar",
+    "EC-G": "Guayas",
+    "EC-H": "Chimborazo",
+    "EC-I": "Imbabura",
+    "EC-L": "Loja",
+    "EC-M": "Manabí",
+    "EC-N": "Napo",
+    "EC-O": "El Oro",
+    "EC-P": "Pichincha",
+    "EC-R": "Los Ríos",
+    "EC-S": "Morona Santiago",
+    "EC-SD": "Santo Domingo de los Tsáchilas",
+    "EC-SE": "Santa Elena",
+    "EC-T": "Tungurahua",
+    "EC-U": "Sucumbíos",
+    "EC-W": "Galápagos",
+    "EC-X": "Cotopaxi",
+    "EC-Y": "Pastaza",
+    "EC-Z": "Zamora Chinchipe",
+}
+
+# Festivos locales por provincia: (mes, dia, nombre). Las provincias sin
+# entrada solo tienen los festivos nacionales.
+FESTIVOS_PROVINCIALES = {
+    "EC-A": [(APR, 12, "Fundación de Cuenca")],
+    "EC-E": [(AUG, 5, "Independencia de Esmeraldas")],
+    "EC-G": [(JUL, 25, "Fundación de Guayaquil")],
+    "EC-L": [(NOV, 18, "Independencia de Loja")],
+    "EC-P": [(DEC, 6, "Fundación de Quito")],
+    "EC-W": [(FEB, 12, "Provincialización de Galápagos")],
+}
+
+
+class FestividadesEcuador(dict):
     """
     Una clase para representar un dia festivo en Ecuador por provincias(FestividadesEcuador)
     El objetivo es determinar si una fecha especifica es un dia festivo de la manera mas rapida y flexible.
     https://www.turismo.gob.ec/wp-content/uploads/2020/03/CALENDARIO-DE-FERIADOS.pdf
     ...
-    Atributos (Estos se hereran de la clase HolidayBase)
+    Es un dict de datetime.date a nombre del festivo con la interfaz de
+    holidays.HolidayBase que usa este modulo: las claves pueden ser date,
+    datetime o cadenas AAAA-MM-DD y, con expand, consultar una fecha genera los
+    festivos de su año. dateutil se importa al generar el primer año, asi cargar
+    el modulo no lo importa.
+    ...
+    Atributos
     ----------
     prov: str
         Codigo de provincia según  ISO3166-2
+    expand: boolean
+        Si consultar una fecha genera los festivos de su año
+    years: set de int
+        Años ya generados
     Metodos:
     -------
     __init__(self, placa, fecha, hora, en_linea=False):
@@ -28,18 +119,72 @@ class FestividadesEcuador(HolidayBase):
     _Es_Festivo(self, fecha):
         Retorna si una fecha es festiva o no.
     """     
-    # ISO 3166-2 codigos para las principal subdivision, 
-    # llamadas provincias
-    # https://es.wikipedia.org/wiki/ISO_3166-2:EC
-    PROVINCIAS = ["EC-P"]  # TODO añadir mas provincias
+    PROVINCIAS = PROVINCIAS
+    FESTIVOS_PROVINCIALES = FESTIVOS_PROVINCIALES
+    # Incrementar al cambiar _Festivos_Nacionales o _Festivos_Provinciales: es
+    # parte de la huella de InstantaneaFestivos, y festivos.pyfe se regenera
+    # con --compilar-festivos
+    VERSION_REGLAS = 1
 
-    def __init__(self, **kwargs):
+    def __init__(self, prov="ON", expand=True, years=None):
         """
         Contruye todos los atributos necesarios para el objeto FestividadesEcuador
-        """         
+
+        Parametros
+        ----------
+        prov : str, opcional
+            Codigo de provincia según ISO3166-2
+        expand : boolean, opcional
+            Si consultar una fecha genera los festivos de su año (el valor
+            predeterminado es Verdadero, como en holidays.HolidayBase)
+        years : int o iterable de int, opcional
+            Años que se generan de inmediato
+        """
+        dict.__init__(self)
         self.pais = "ECU"
-        self.prov = kwargs.pop("prov", "ON")
-        HolidayBase.__init__(self, **kwargs)
+        self.prov = prov
+        self.expand = expand
+        self.years = set()
+        for año in [years] if isinstance(years, int) else years or ():
+            self._populate(año)
+
+    @staticmethod
+    def _fecha(clave):
+        if isinstance(clave, datetime.datetime):
+            return clave.date()
+        if isinstance(clave, datetime.date):
+            return clave
+        if isinstance(clave, str):
+            return datetime.date.fromisoformat(clave)
+        raise TypeError('No se puede convertir {!r} en una fecha'.format(clave))
+
+    def _expandir(self, fecha):
+        if self.expand and fecha.year not in self.years:
+            self._populate(fecha.year)
+        return fecha
+
+    def __contains__(self, clave):
+        return dict.__contains__(self, self._expandir(self._fecha(clave)))
+
+    def __getitem__(self, clave):
+        return dict.__getitem__(self, self._expandir(self._fecha(clave)))
+
+    def get(self, clave, valor=None):
+        return dict.get(self, self._expandir(self._fecha(clave)), valor)
+
+    def __setitem__(self, clave, nombre):
+        # Dos festivos en la misma fecha se unen con "; ", como en HolidayBase
+        fecha = self._fecha(clave)
+        anterior = dict.get(self, fecha)
+        if anterior is not None and nombre not in anterior.split("; "):
+            nombre = "{}; {}".format(anterior, nombre)
+        dict.__setitem__(self, fecha, nombre)
+
+    def _populate(self, año):
+        """
+        Genera los festivos del año cuando se consulta una fecha, como el gancho de HolidayBase.
+        """
+        self._Es_Festivo(año)
 
     def _Es_Festivo(self, año):
         """
@@ -52,7 +197,23 @@ class FestividadesEcuador(HolidayBase):
         Retorna
         -------
         Retorna verdadero si una fecha es una dia festivo caso contrario retorna falso.
-        """                    
+        """
+        self.years.add(año)
+        self._Festivos_Nacionales(año)
+        self._Festivos_Provinciales(año)
+
+    def _Festivos_Nacionales(self, año):
+        """
+        Genera los festivos nacionales del año, comunes a todas las provincias.
+
+        Parametros
+        ----------
+        año : int
+            año de los festivos
+        """
+        from dateutil.easter import easter
+        from dateutil.relativedelta import relativedelta as rd, FR
+
         # Año nuevo
         self[datetime.date(año, JAN, 1)] = "Año Nuevo [New Year's Day]"
         
@@ -89,7 +250,7 @@ class FestividadesEcuador(HolidayBase):
         # Batalla del Pichincha, las reglas son de la misma manera que el dia del trabajo.
         name = "Batalla del Pichincha"
         if año > 2015 and datetime.date(año, MAY, 24).weekday() in (5,1):
-            self[datetime.date(año, MAY, 24).weekday() - datetime.timedelta(days=1)] = name
+            self[datetime.date(año, MAY, 24) - datetime.timedelta(days=1)] = name
         elif año > 2015 and datetime.date(año, MAY, 24).weekday() == 6:
             self[datetime.date(año, MAY, 24) + datetime.timedelta(days=1)] = name
         elif año > 2015 and  datetime.date(año, MAY, 24).weekday() in (2,3):
@@ -145,18 +306,3145 @@ class FestividadesEcuador(HolidayBase):
             self[datetime.date(año, NOV, 2)] = namedd
             self[datetime.date(año, NOV, 3)] = nameic  
             
-        # Fundacion de Quito, aplica solo para la provincia de Pichincha.
-        # las reglas son las mismas que el dia del trabajo.
-        name = "Fundación de Quito"        
-        if self.prov in ("EC-P"):
-            if año > 2015 and datetime.date(año, DEC, 6).weekday() in (5,1):
-                self[datetime.date(año, DEC, 6) - datetime.timedelta(days=1)] = name
-            elif año > 2015 and datetime.date(año, DEC, 6).weekday() == 6:
-                self[(datetime.date(año, DEC, 6).weekday()) + datetime.timedelta(days=1)] =name
-            elif año > 2015 and  datetime.date(año, DEC, 6).weekday() in (2,3):
-                self[datetime.date(año, DEC, 6) + rd(weekday=FR)] = name
+    def _Festivos_Provinciales(self, año):
+        """
+        Genera los festivos propios de la provincia del objeto.
+
+        Parametros
+        ----------
+        año : int
+            año de los festivos
+        """
+        from dateutil.relativedelta import relativedelta as rd, FR
+
+        # Las fechas locales se trasladan con las mismas reglas que el dia del trabajo.
+        for mes, dia, name in self.FESTIVOS_PROVINCIALES.get(self.prov, ()):
+            fecha = datetime.date(año, mes, dia)
+            if año > 2015 and fecha.weekday() in (5,1):
+                self[fecha - datetime.timedelta(days=1)] = name
+            elif año > 2015 and fecha.weekday() == 6:
+                self[fecha + datetime.timedelta(days=1)] = name
+            elif año > 2015 and fecha.weekday() in (2,3):
+                self[fecha + rd(weekday=FR)] = name
+            else:
+                self[fecha] = name
+
+
+def _huella_festividades():
+    """
+    Retorna un CRC-32 de las reglas de FestividadesEcuador: VERSION_REGLAS y
+    FESTIVOS_PROVINCIALES. No depende de la version de Python, asi festivos.pyfe
+    sirve en cualquier interprete.
+    """
+    import zlib
+    return zlib.crc32(repr((FestividadesEcuador.VERSION_REGLAS,
+                            sorted(FESTIVOS_PROVINCIALES.items()))).encode('utf-8'))
+
+
+class InstantaneaFestivos:
+    """
+    Tablas de festivos precalculadas por provincia y año, guardadas en un archivo.
+
+    Con una instantanea, CalendarioFestivos responde sin importar holidays ni
+    dateutil; los años que no estan en ella se siguen calculando con
+    FestividadesEcuador. La provincia "EC" guarda los festivos nacionales y las
+    demas solo sus fechas locales, igual que las tablas de CalendarioFestivos.
+
+    Formato del archivo: encabezado '<4sHHII' (firma, version, reservado, huella
+    de las reglas, numero de tablas) seguido de cada tabla: '<5sHH' (provincia,
+    año, numero de fechas) y un uint32 little-endian por fecha con su ordinal
+    proleptico. La huella (ver _huella_festividades) identifica las reglas con que
+    se calcularon las tablas: CalendarioFestivos no usa una instantanea de otras
+    reglas, que se regenera con --compilar-festivos.
+    ...
+    Atributos
+    ----------
+    tablas : dict
+        (provincia, año) -> tupla ordenada de ordinales
+    desde : int
+        Primer año con tabla nacional, o None si esta vacia
+    hasta : int
+        Ultimo año con tabla nacional, o None si esta vacia
+    huella : int
+        Huella de las reglas de FestividadesEcuador con que se calculo
+    vigente : boolean
+        Si la huella coincide con las reglas actuales
+    Metodos
+    -------
+    compilar(años, calendario=None):
+        Calcula las tablas de un rango de años.
+    abrir(ruta):
+        Lee un archivo generado con guardar().
+    guardar(self, ruta):
+        Escribe la instantanea en un archivo.
+    tabla(self, prov, año):
+        Retorna el frozenset de fechas de una tabla, o None si el año no esta.
+    """
+
+    FIRMA = b'PYFE'
+    VERSION = 2
+    _ENCABEZADO = struct.Struct('<4sHHII')
+    _TABLA = struct.Struct('<5sHH')
+
+    def __init__(self, tablas, huella=None):
+        self.tablas = {clave: tuple(sorted(ordinales)) for clave, ordinales in tablas.items()}
+        self.huella = huella if huella is not None else _huella_festividades()
+        años = [año for prov, año in self.tablas if prov == CalendarioFestivos.NACIONAL]
+        self.desde = min(años) if años else None
+        self.hasta = max(años) if años else None
+
+    @classmethod
+    def compilar(cls, años, calendario=None):
+        """
+        Calcula las tablas nacionales y provinciales de varios años.
+
+        Parametros
+        ----------
+        años : iterable de int
+            Años a incluir, por ejemplo range(2000, 2061)
+        calendario : CalendarioFestivos, opcional
+            Calendario del que se toman las tablas; por defecto uno nuevo sin
+            instantanea, que las calcula con FestividadesEcuador
+        """
+        calendario = calendario if calendario is not None else CalendarioFestivos()
+        tablas = {}
+        for año in años:
+            tablas[(calendario.NACIONAL, año)] = [f.toordinal() for f in calendario.nacional(año)]
+            for prov in FESTIVOS_PROVINCIALES:
+                tablas[(prov, año)] = [f.toordinal() for f in calendario.provincial(prov, año)]
+        return cls(tablas)
+
+    @classmethod
+    def abrir(cls, ruta):
+        """
+        Lee una instantanea.
+
+        Parametros
+        ----------
+        ruta : str
+            Archivo generado con guardar()
+        Plantear
+        ------
+        ValorError
+            Si el archivo no es una instantanea compatible o esta truncado
+        """
+        with open(ruta, 'rb') as archivo:
+            datos = archivo.read()
+        try:
+            firma, version, _, huella, n = cls._ENCABEZADO.unpack_from(datos, 0)
+            if firma != cls.FIRMA or version != cls.VERSION:
+                raise ValueError('El archivo no es una instantanea de festivos compatible')
+            tablas = {}
+            posicion = cls._ENCABEZADO.size
+            for _ in range(n):
+                prov, año, fechas = cls._TABLA.unpack_from(datos, posicion)
+                posicion += cls._TABLA.size
+                tablas[(prov.rstrip(b'\0').decode('ascii'), año)] = struct.unpack_from(
+                    '<{}I'.format(fechas), datos, posicion)
+                posicion += 4 * fechas
+        except struct.error:
+            raise ValueError('La instantanea de festivos esta truncada')
+        return cls(tablas, huella)
+
+    def guardar(self, ruta):
+        """
+        Escribe la instantanea; el archivo se reemplaza de forma atomica.
+
+        Parametros
+        ----------
+        ruta : str
+            Archivo de destino
+        """
+        temporal = '{}.{}.tmp'.format(ruta, os.getpid())
+        with open(temporal, 'wb') as archivo:
+            archivo.write(self._ENCABEZADO.pack(self.FIRMA, self.VERSION, 0, self.huella, len(self.tablas)))
+            for (prov, año), ordinales in sorted(self.tablas.items()):
+                archivo.write(self._TABLA.pack(prov.encode('ascii'), año, len(ordinales)))
+                archivo.write(struct.pack('<{}I'.format(len(ordinales)), *ordinales))
+        os.replace(temporal, ruta)
+
+    @property
+    def vigente(self):
+        """True si la instantanea se calculo con las reglas actuales de FestividadesEcuador."""
+        return self.huella == _huella_festividades()
+
+    def tabla(self, prov, año):
+        """
+        Retorna las fechas de una tabla.
+
+        Parametros
+        ----------
+        prov : str
+            "EC" para los festivos nacionales o un codigo de provincia
+        año : int
+            Año de la tabla
+        Retorna
+        -------
+        frozenset de datetime.date, o None si la instantanea no cubre el año.
+        """
+        if (CalendarioFestivos.NACIONAL, año) not in self.tablas:
+            return None
+        return frozenset(map(datetime.date.fromordinal, self.tablas.get((prov, año), ())))
+
+
+class CalendarioFestivos:
+    """
+    Cache compartido y seguro entre hilos de las tablas de festivos por provincia y año.
+
+    Los festivos nacionales de cada año se calculan una sola vez y los comparten
+    todas las provincias; cada provincia solo agrega una tabla pequeña con sus
+    fechas locales. Construir un objeto FestividadesEcuador recalcula la pascua y
+    llena la tabla del año completo; aqui cada tabla se construye una sola vez y
+    se guarda como un frozenset de fechas, de modo que una consulta repetida son a
+    lo sumo dos busquedas en conjuntos. Con una InstantaneaFestivos las tablas de
+    los años que cubre se leen de ella en lugar de calcularse. Las funciones
+    registradas con suscribir() reciben las fechas cuyo estado cambia.
+    ...
+    Atributos
+    ----------
+    max_entradas : int
+        Numero maximo de tablas (nacionales y provinciales) que se conservan; al
+        superarlo se descarta la usada hace mas tiempo.
+    aciertos : int
+        Consultas respondidas desde el cache.
+    fallos : int
+        Consultas que obligaron a construir una tabla.
+    desde_instantanea : int
+        Tablas tomadas de la instantanea en lugar de calcularse.
+    Metodos
+    -------
+    usar_instantanea(self, instantanea):
+        Cambia la instantanea consultada y vacia el cache.
+    ajustar(self, prov, año, fechas):
+        Reemplaza una tabla, por ejemplo con las fechas confirmadas por la API.
+    suscribir(self, funcion):
+        Registra una funcion(prov, fechas) que se llama cuando cambian festivos.
+    nacional(self, año):
+        Retorna el frozenset de festivos nacionales del año.
+    provincial(self, prov, año):
+        Retorna el frozenset de festivos locales de la provincia en el año.
+    tabla(self, prov, año):
+        Retorna el frozenset de fechas festivas del año para la provincia.
+    es_festivo(self, fecha, prov="EC-P"):
+        Retorna True si la fecha (date o cadena AAAA-MM-DD) es festiva.
+    precalentar(self, años, prov="EC-P"):
+        Construye por adelantado las tablas de un rango de años.
+    limpiar(self):
+        Vacia el cache y reinicia los contadores.
+    """
+
+    # Clave de las tablas nacionales en el cache
+    NACIONAL = "EC"
+    _VACIO = frozenset()
+
+    def __init__(self, max_entradas=256, instantanea=None):
+        """
+        Construye un cache vacio.
+
+        Parametros
+        ----------
+        max_entradas : int, opcional
+            Numero maximo de tablas conservadas (el valor predeterminado es 256)
+        instantanea : InstantaneaFestivos o str, opcional
+            Tablas precalculadas, o la ruta de su archivo; la ruta se lee en la
+            primera consulta y se ignora si el archivo no existe; una instantanea
+            calculada con otras reglas de FestividadesEcuador tambien se ignora
+        """
+        if max_entradas < 1:
+            raise ValueError('max_entradas debe ser mayor o igual a 1')
+        self.max_entradas = max_entradas
+        self.aciertos = 0
+        self.fallos = 0
+        self.desde_instantanea = 0
+        self._instantanea = self._vigente(instantanea)
+        self._ajustes = {}
+        self._suscriptores = ()
+        self._tablas = OrderedDict()
+        self._candado = threading.Lock()
+
+    def _abrir_instantanea(self):
+        """
+        Retorna la instantanea, leyendo su archivo la primera vez; None si no hay o
+        si se calculo con otras reglas de FestividadesEcuador.
+        """
+        instantanea = self._instantanea
+        if isinstance(instantanea, str):
+            with self._candado:
+                if isinstance(self._instantanea, str):
+                    ruta = self._instantanea
+                    try:
+                        abierta = InstantaneaFestivos.abrir(ruta) if os.path.exists(ruta) else None
+                    except ValueError:
+                        # Formato anterior o archivo dañado: se calcula con las reglas
+                        abierta = None
+                    self._instantanea = self._vigente(abierta)
+                instantanea = self._instantanea
+        return instantanea
+
+    @staticmethod
+    def _vigente(instantanea):
+        """Retorna la instantanea, o None si se calculo con otras reglas."""
+        if isinstance(instantanea, InstantaneaFestivos) and not instantanea.vigente:
+            return None
+        return instantanea
+
+    def usar_instantanea(self, instantanea):
+        """
+        Cambia la instantanea consultada y vacia el cache.
+
+        Parametros
+        ----------
+        instantanea : InstantaneaFestivos, str o None
+            Tablas precalculadas, la ruta de su archivo, o None para calcular
+            siempre; se ignora si se calculo con otras reglas
+        """
+        with self._candado:
+            self._instantanea = self._vigente(instantanea)
+            self._tablas.clear()
+        self._avisar(None, None)
+
+    def ajustar(self, prov, año, fechas):
+        """
+        Reemplaza la tabla de una provincia y año; el ajuste se conserva aunque la
+        tabla salga del cache o cambie la instantanea.
+
+        Parametros
+        ----------
+        prov : str
+            "EC" para los festivos nacionales o un codigo de provincia
+        año : int
+            Año de la tabla
+        fechas : iterable de datetime.date
+            Festivos de la tabla
+        Retorna
+        -------
+        frozenset con las fechas que dejaron de ser o pasaron a ser festivas.
+        """
+        if prov != self.NACIONAL:
+            self._validar_provincia(prov)
+        nueva = frozenset(fechas)
+        anterior = self.nacional(año) if prov == self.NACIONAL else self.provincial(prov, año)
+        with self._candado:
+            self._ajustes[(prov, año)] = nueva
+            self._tablas[(prov, año)] = nueva
+            self._tablas.move_to_end((prov, año))
+            while len(self._tablas) > self.max_entradas:
+                self._tablas.popitem(last=False)
+        cambios = anterior ^ nueva
+        if cambios:
+            self._avisar(prov, cambios)
+        return cambios
+
+    def suscribir(self, funcion):
+        """
+        Registra una funcion(prov, fechas) que se llama cuando cambian festivos:
+        prov es "EC" para los nacionales, y prov y fechas son None si puede haber
+        cambiado cualquier fecha (por ejemplo al cambiar de instantanea).
+        """
+        with self._candado:
+            self._suscriptores = self._suscriptores + (funcion,)
+
+    def desuscribir(self, funcion):
+        """Retira una funcion registrada con suscribir()."""
+        with self._candado:
+            self._suscriptores = tuple(f for f in self._suscriptores if f is not funcion)
+
+    def _avisar(self, prov, fechas):
+        for funcion in self._suscriptores:
+            funcion(prov, fechas)
+
+    def _construir(self, prov, año):
+        """Genera una tabla fuera del candado: la nacional si prov es NACIONAL, si no la local."""
+        ajuste = self._ajustes.get((prov, año))
+        if ajuste is not None:
+            return ajuste
+        instantanea = self._abrir_instantanea()
+        if instantanea is not None:
+            tabla = instantanea.tabla(prov, año)
+            if tabla is not None:
+                with self._candado:
+                    self.desde_instantanea += 1
+                return tabla
+        # expand=False: solo se genera la parte de la tabla que se pide
+        festivos = FestividadesEcuador(prov=prov, expand=False)
+        if prov == self.NACIONAL:
+            festivos._Festivos_Nacionales(año)
+        else:
+            festivos._Festivos_Provinciales(año)
+        return frozenset(festivos.keys())
+
+    def _obtener(self, prov, año):
+        """Retorna una tabla del cache, construyendola si hace falta."""
+        clave = (prov, año)
+        with self._candado:
+            tabla = self._tablas.get(clave)
+            if tabla is not None:
+                self._tablas.move_to_end(clave)
+                self.aciertos += 1
+                return tabla
+            self.fallos += 1
+        # La construccion es costosa, se hace sin bloquear a los demas hilos;
+        # si dos hilos construyen la misma tabla se conserva la primera.
+        nueva = self._construir(prov, año)
+        with self._candado:
+            tabla = self._tablas.setdefault(clave, nueva)
+            self._tablas.move_to_end(clave)
+            while len(self._tablas) > self.max_entradas:
+                self._tablas.popitem(last=False)
+        return tabla
+
+    @staticmethod
+    def _validar_provincia(prov):
+        if prov not in _PROVINCIAS_VALIDAS:
+            raise ValueError('Provincia desconocida: {}. Use un codigo ISO 3166-2:EC, por ejemplo EC-P'.format(prov))
+
+    def nacional(self, año):
+        """
+        Obtiene los festivos nacionales de un año.
+
+        Parametros
+        ----------
+        año : int
+            Año de la tabla
+        Retorna
+        -------
+        frozenset de datetime.date.
+        """
+        return self._obtener(self.NACIONAL, año)
+
+    def provincial(self, prov, año):
+        """
+        Obtiene los festivos locales de una provincia en un año, sin los nacionales.
+
+        Parametros
+        ----------
+        prov : str
+            Codigo de provincia según ISO3166-2
+        año : int
+            Año de la tabla
+        Retorna
+        -------
+        frozenset de datetime.date; vacio si la provincia no tiene festivos locales.
+        """
+        self._validar_provincia(prov)
+        if prov not in FESTIVOS_PROVINCIALES and (prov, año) not in self._ajustes:
+            return self._VACIO
+        return self._obtener(prov, año)
+
+    def tabla(self, prov, año):
+        """
+        Obtiene la tabla completa de festivos de un año para una provincia.
+
+        Parametros
+        ----------
+        prov : str
+            Codigo de provincia según ISO3166-2
+        año : int
+            Año de la tabla
+        Retorna
+        -------
+        frozenset de datetime.date con los dias festivos nacionales y locales del año.
+        """
+        local = self.provincial(prov, año)
+        nacional = self.nacional(año)
+        return nacional | local if local else nacional
+
+    def es_festivo(self, fecha, prov="EC-P"):
+        """
+        Comprueba si una fecha es festiva.
+
+        Parametros
+        ----------
+        fecha : datetime.date o str
+            Fecha a comprobar; las cadenas siguen el formato ISO 8601 AAAA-MM-DD
+        prov : str, opcional
+            Codigo de provincia según ISO3166-2 (el valor predeterminado es "EC-P")
+        Retorna
+        -------
+        Retorna verdadero si la fecha es un dia festivo caso contrario retorna falso.
+        """
+        if isinstance(fecha, str):
+            fecha = datetime.date.fromisoformat(fecha)
+        self._validar_provincia(prov)
+        return fecha in self.nacional(fecha.year) or fecha in self.provincial(prov, fecha.year)
+
+    def precalentar(self, años, prov="EC-P"):
+        """
+        Construye por adelantado las tablas de varios años.
+
+        Parametros
+        ----------
+        años : iterable de int
+            Años a construir, por ejemplo range(2020, 2031)
+        prov : str, opcional
+            Codigo de provincia según ISO3166-2 (el valor predeterminado es "EC-P")
+        """
+        for año in años:
+            self.nacional(año)
+            self.provincial(prov, año)
+
+    def limpiar(self):
+        """Vacia el cache y reinicia los contadores de aciertos y fallos."""
+        with self._candado:
+            self._tablas.clear()
+            self.aciertos = 0
+            self.fallos = 0
+            self.desde_instantanea = 0
+
+    def estadisticas(self):
+        """
+        Retorna
+        -------
+        dict con los aciertos, fallos, tablas leidas de la instantanea y numero de
+        tablas en el cache.
+        """
+        with self._candado:
+            return {"aciertos": self.aciertos,
+                    "fallos": self.fallos,
+                    "instantanea": self.desde_instantanea,
+                    "entradas": len(self._tablas)}
+
+
+_PROVINCIAS_VALIDAS = frozenset(PROVINCIAS)
+
+# Instantanea de festivos que usa CALENDARIO_FESTIVOS; se regenera con
+# python PicoPlaca.py --compilar-festivos 2000 2060
+RUTA_FESTIVOS = os.environ.get('PICOPLACA_FESTIVOS', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'festivos.pyfe'))
+
+# Cache de festivos compartido por todo el proceso.
+CALENDARIO_FESTIVOS = CalendarioFestivos(instantanea=RUTA_FESTIVOS)
+
+
+class Instrumentacion:
+    """
+    Registro opcional de metricas de la ruta critica.
+
+    Acumula, por etapa, el numero de llamadas y el tiempo total, ademas de
+    contadores sueltos (por ejemplo errores de la API) y las estadisticas de las
+    fuentes registradas (caches). Mientras esta desactivada el evaluador solo
+    revisa el atributo activo, asi que el costo es practicamente nulo.
+    ...
+    Atributos
+    ----------
+    activo : boolean
+        Si es Falso no se registra nada
+    Metodos
+    -------
+    observar(self, etapa, segundos):
+        Suma una llamada y su duracion a la etapa.
+    etapa(self, etapa, desde):
+        Observa la etapa iniciada en desde y retorna el instante actual.
+    incrementar(self, nombre, n=1):
+        Suma n a un contador.
+    suscribir(self, funcion):
+        Registra una funcion(etapa, segundos) que se llama en cada observacion.
+    registrar_fuente(self, nombre, funcion):
+        Registra una funcion que retorna un dict de contadores numericos.
+    exportar_prometheus(self):
+        Retorna las metricas en formato de texto de Prometheus.
+    """
+
+    def __init__(self):
+        self.activo = False
+        self.etapas = {}
+        self.contadores = {}
+        self._suscriptores = ()
+        self._fuentes = {}
+        self._candado = threading.Lock()
+
+    def activar(self):
+        """Empieza a registrar metricas."""
+        self.activo = True
+
+    def desactivar(self):
+        """Deja de registrar metricas; los valores acumulados se conservan."""
+        self.activo = False
+
+    def reiniciar(self):
+        """Pone en cero las etapas y los contadores."""
+        with self._candado:
+            self.etapas = {}
+            self.contadores = {}
+
+    def observar(self, etapa, segundos):
+        """Suma una llamada de la etapa y su duracion en segundos."""
+        with self._candado:
+            acumulado = self.etapas.get(etapa)
+            if acumulado is None:
+                self.etapas[etapa] = [1, segundos]
+            else:
+                acumulado[0] += 1
+                acumulado[1] += segundos
+        for funcion in self._suscriptores:
+            funcion(etapa, segundos)
+
+    def etapa(self, etapa, desde):
+        """
+        Observa la etapa que empezo en desde (segun time.perf_counter) y retorna el
+        instante actual, que sirve de inicio para la etapa siguiente.
+        """
+        ahora = time.perf_counter()
+        self.observar(etapa, ahora - desde)
+        return ahora
+
+    def incrementar(self, nombre, n=1):
+        """Suma n al contador nombre si la instrumentacion esta activa."""
+        if not self.activo:
+            return
+        with self._candado:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + n
+
+    def suscribir(self, funcion):
+        """Registra una funcion(etapa, segundos) que recibe cada observacion."""
+        with self._candado:
+            self._suscriptores = self._suscriptores + (funcion,)
+
+    def desuscribir(self, funcion):
+        """Retira una funcion registrada con suscribir()."""
+        with self._candado:
+            self._suscriptores = tuple(f for f in self._suscriptores if f is not funcion)
+
+    def registrar_fuente(self, nombre, funcion):
+        """Registra una funcion sin argumentos que retorna un dict de contadores numericos."""
+        with self._candado:
+            self._fuentes[nombre] = funcion
+
+    def instantanea(self):
+        """
+        Retorna
+        -------
+        dict con las etapas, los contadores y las estadisticas de cada fuente; las
+        fuentes con aciertos y fallos incluyen la razon de aciertos.
+        """
+        with self._candado:
+            etapas = {e: {"llamadas": n, "segundos": s} for e, (n, s) in self.etapas.items()}
+            contadores = dict(self.contadores)
+            fuentes = dict(self._fuentes)
+        estadisticas = {}
+        for nombre, funcion in fuentes.items():
+            datos = dict(funcion())
+            total = datos.get("aciertos", 0) + datos.get("fallos", 0)
+            if "aciertos" in datos and total:
+                datos["razon_aciertos"] = datos["aciertos"] / total
+            estadisticas[nombre] = datos
+        return {"etapas": etapas, "contadores": contadores, "fuentes": estadisticas}
+
+    def exportar_prometheus(self, prefijo="picoplaca"):
+        """
+        Retorna las metricas en formato de texto de Prometheus (version 0.0.4).
+        """
+        datos = self.instantanea()
+        lineas = []
+
+        def metrica(nombre, tipo, ayuda, muestras):
+            lineas.append("# HELP {}_{} {}".format(prefijo, nombre, ayuda))
+            lineas.append("# TYPE {}_{} {}".format(prefijo, nombre, tipo))
+            for etiquetas, valor in muestras:
+                texto = ",".join('{}="{}"'.format(k, v) for k, v in etiquetas.items())
+                lineas.append("{}_{}{} {}".format(prefijo, nombre, "{" + texto + "}" if texto else "", repr(float(valor))))
+
+        metrica("etapa_llamadas_total", "counter", "Llamadas por etapa de predecir",
+                [({"etapa": e}, v["llamadas"]) for e, v in sorted(datos["etapas"].items())])
+        metrica("etapa_segundos_total", "counter", "Tiempo acumulado por etapa de predecir",
+                [({"etapa": e}, v["segundos"]) for e, v in sorted(datos["etapas"].items())])
+        for nombre, valor in sorted(datos["contadores"].items()):
+            metrica(nombre + "_total", "counter", "Contador " + nombre, [({}, valor)])
+        for fuente, valores in sorted(datos["fuentes"].items()):
+            for nombre, valor in sorted(valores.items()):
+                if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                    tipo = "counter" if nombre in ("aciertos", "fallos", "solicitudes", "respaldos") else "gauge"
+                    sufijo = "_total" if tipo == "counter" else ""
+                    metrica("{}_{}{}".format(fuente, nombre, sufijo), tipo,
+                            "{} de {}".format(nombre, fuente), [({}, valor)])
+        return "\n".join(lineas) + "\n"
+
+
+# Registro de metricas del proceso, desactivado por defecto.
+INSTRUMENTACION = Instrumentacion()
+INSTRUMENTACION.registrar_fuente("calendario", CALENDARIO_FESTIVOS.estadisticas)
+
+
+class LimitadorTokens:
+    """
+    Limitador de tasa por cubeta de tokens, seguro entre hilos.
+    ...
+    Atributos
+    ----------
+    tasa : float
+        Tokens que se reponen por segundo
+    capacidad : float
+        Maximo de tokens acumulables (tamaño de rafaga)
+    """
+
+    def __init__(self, tasa=1.0, capacidad=1.0):
+        if tasa <= 0 or capacidad < 1:
+            raise ValueError('La tasa debe ser positiva y la capacidad mayor o igual a 1')
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self._tokens = capacidad
+        self._ultimo = time.monotonic()
+        self._candado = threading.Lock()
+
+    def adquirir(self, bloquear=True):
+        """
+        Toma un token, esperando a que se reponga si hace falta.
+
+        Parametros
+        ----------
+        bloquear : boolean, opcional
+            Si es Falso retorna de inmediato cuando no hay tokens (el valor predeterminado es Verdadero)
+        Retorna
+        -------
+        Verdadero si se obtuvo un token.
+        """
+        while True:
+            with self._candado:
+                ahora = time.monotonic()
+                self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                espera = (1 - self._tokens) / self.tasa
+            if not bloquear:
+                return False
+            time.sleep(espera)
+
+
+class ProveedorFestivosEnLinea:
+    """
+    Cliente persistente de la API de días festivos abstractapi.
+
+    Reutiliza una sesion HTTP, guarda las respuestas en un cache en disco con
+    tiempo de vida, agrupa las consultas concurrentes de una misma fecha en una
+    sola llamada y respeta los limites de la version gratuita (1 solicitud por
+    segundo, 1000 por mes). Cuando la cuota mensual se agota, o la API responde
+    429, la consulta se responde con la tabla sin conexion de FestividadesEcuador.
+    ...
+    Atributos
+    ----------
+    api_key : str
+        Clave de la API
+    url_base : str
+        URL de la API; se puede apuntar a un servidor local para pruebas
+    ruta_cache : str
+        Archivo JSON del cache en disco, o None para un cache solo en memoria
+    ttl : float
+        Segundos que una respuesta se considera vigente
+    cuota_mensual : int
+        Numero maximo de solicitudes por mes calendario
+    Metodos
+    -------
+    es_festivo(self, fecha):
+        Retorna True si la fecha (date o cadena AAAA-MM-DD) es festiva.
+    reservar_cuota(self, guardar=False):
+        Descuenta una solicitud de la cuota del mes; False si esta agotada.
+    """
+
+    URL_ABSTRACTAPI = "https://holidays.abstractapi.com/v1/"
+
+    def __init__(self, api_key=None, url_base=URL_ABSTRACTAPI, ruta_cache=None,
+                 ttl=30 * 24 * 3600, tasa=1.0, cuota_mensual=1000, prov="EC-P",
+                 calendario=None, sesion=None, tiempo_espera=10):
+        self.api_key = api_key
+        self.url_base = url_base
+        self.ruta_cache = ruta_cache
+        self.ttl = ttl
+        self.cuota_mensual = cuota_mensual
+        self.prov = prov
+        self.tiempo_espera = tiempo_espera
+        self.calendario = calendario if calendario is not None else CALENDARIO_FESTIVOS
+        self.limitador = LimitadorTokens(tasa)
+        if sesion is None:
+            import requests
+            sesion = requests.Session()
+        self.sesion = sesion
+        self.solicitudes = 0
+        self.respaldos = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self._candado = threading.Lock()
+        self._en_curso = {}
+        self._cache, self._cuota = self._cargar_cache()
+
+    def _cargar_cache(self):
+        """Lee el cache en disco; un archivo ausente o dañado equivale a un cache vacio."""
+        if not self.ruta_cache or not os.path.exists(self.ruta_cache):
+            return {}, {}
+        try:
+            with open(self.ruta_cache, encoding='utf-8') as archivo:
+                datos = json.load(archivo)
+            return dict(datos.get("fechas", {})), dict(datos.get("cuota", {}))
+        except (OSError, ValueError):
+            return {}, {}
+
+    def _guardar_cache(self):
+        """Escribe el cache en disco de forma atomica. Se llama con el candado tomado."""
+        if not self.ruta_cache:
+            return
+        directorio = os.path.dirname(os.path.abspath(self.ruta_cache))
+        os.makedirs(directorio, exist_ok=True)
+        temporal = '{}.{}.tmp'.format(self.ruta_cache, os.getpid())
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump({"fechas": self._cache, "cuota": self._cuota}, archivo)
+        os.replace(temporal, self.ruta_cache)
+
+    def _vigente(self, clave):
+        entrada = self._cache.get(clave)
+        if entrada is not None and time.time() - entrada["t"] < self.ttl:
+            return entrada["festivo"]
+        return None
+
+    def reservar_cuota(self, guardar=False):
+        """
+        Descuenta una solicitud de la cuota del mes.
+
+        Toda solicitud a la API con la misma clave debe reservarse aqui, tambien
+        las de otros clientes como ConciliadorFestivos, para que la cuota sea
+        una sola.
+
+        Parametros
+        ----------
+        guardar : boolean, opcional
+            Escribir la cuota en disco en el acto, para clientes cuyas
+            solicitudes no pasan por el cache (el valor predeterminado es Falso)
+        Retorna
+        -------
+        True si se reservo la solicitud, False si la cuota del mes esta agotada.
+        """
+        mes = time.strftime('%Y-%m')
+        with self._candado:
+            usadas = self._cuota.get(mes, 0)
+            if usadas >= self.cuota_mensual:
+                return False
+            self._cuota = {mes: usadas + 1}
+            self.solicitudes += 1
+            if guardar:
+                self._guardar_cache()
+            return True
+
+    def _consultar_api(self, fecha):
+        """
+        Consulta la API para una fecha.
+
+        Retorna
+        -------
+        True o False segun la API, o None si hay que usar la tabla sin conexion.
+        """
+        import requests
+        if not self.reservar_cuota():
+            return None
+        self.limitador.adquirir()
+        inicio = time.perf_counter()
+        try:
+            response = self.sesion.get(self.url_base, timeout=self.tiempo_espera, params={
+                "api_key": self.api_key, "country": "EC",
+                "year": fecha.year, "month": fecha.month, "day": fecha.day})
+        except requests.RequestException:
+            INSTRUMENTACION.incrementar("api_errores")
+            raise
+        finally:
+            if INSTRUMENTACION.activo:
+                INSTRUMENTACION.observar("api_en_linea", time.perf_counter() - inicio)
+        if response.status_code >= 400:
+            INSTRUMENTACION.incrementar("api_errores")
+        if response.status_code == 401:
+            # Esto significa que falta una clave de API.
+            raise requests.HTTPError(
+                'Falta la clave API. Guarde su clave en la variable de entorno HOLIDAYS_API_KEY')
+        if response.status_code == 429:
+            # La API reporta la cuota agotada aunque el contador local no lo haga
+            with self._candado:
+                self._cuota = {time.strftime('%Y-%m'): self.cuota_mensual}
+            return None
+        response.raise_for_status()
+        try:
+            festivos = response.json()  # si no hay vacaciones obtenemos una matriz vacía
+        except ValueError:
+            festivos = None
+        if not isinstance(festivos, list) or not all(isinstance(f, dict) for f in festivos):
+            # Por ejemplo {"error": {...}}: no se puede saber si la fecha es festiva
+            INSTRUMENTACION.incrementar("api_errores")
+            raise requests.HTTPError('Respuesta invalida de la API: {!r}'.format(festivos)[:200],
+                                     response=response)
+        # Arreglar el Jueves Santo incorrectamente denotado como feriado
+        return any(f.get('name') != 'Maundy Thursday' for f in festivos)
+
+    def estadisticas(self):
+        """
+        Retorna
+        -------
+        dict con los aciertos y fallos del cache, las solicitudes hechas a la API y
+        las consultas respondidas con la tabla sin conexion.
+        """
+        with self._candado:
+            return {"aciertos": self.aciertos, "fallos": self.fallos,
+                    "solicitudes": self.solicitudes, "respaldos": self.respaldos}
+
+    def es_festivo(self, fecha):
+        """
+        Comprueba si una fecha es festiva consultando el cache o la API.
+
+        Parametros
+        ----------
+        fecha : datetime.date o str
+            Fecha a comprobar; las cadenas siguen el formato ISO 8601 AAAA-MM-DD
+        Retorna
+        -------
+        Retorna verdadero si la fecha es un dia festivo caso contrario retorna falso.
+
+        Plantear
+        ------
+        requests.RequestException
+            Si la API falla, falta la clave o la respuesta no es una lista de
+            festivos; las consultas de la misma fecha que esperaban a esta
+            reciben el mismo error
+        """
+        if isinstance(fecha, str):
+            fecha = datetime.date.fromisoformat(fecha)
+        clave = fecha.isoformat()
+        with self._candado:
+            festivo = self._vigente(clave)
+            if festivo is not None:
+                self.aciertos += 1
+                return festivo
+            self.fallos += 1
+            # [evento, excepcion del lider]
+            en_curso = self._en_curso.get(clave)
+            lider = en_curso is None
+            if lider:
+                en_curso = self._en_curso[clave] = [threading.Event(), None]
+        if not lider:
+            # Otra consulta de la misma fecha ya esta en curso, se espera su resultado
+            en_curso[0].wait()
+            if en_curso[1] is not None:
+                raise en_curso[1]
+            with self._candado:
+                festivo = self._vigente(clave)
+            return festivo if festivo is not None else self.calendario.es_festivo(fecha, self.prov)
+        try:
+            festivo = self._consultar_api(fecha)
+            if festivo is None:
+                with self._candado:
+                    self.respaldos += 1
+                return self.calendario.es_festivo(fecha, self.prov)
+            with self._candado:
+                self._cache[clave] = {"festivo": festivo, "t": time.time()}
+                self._guardar_cache()
+            return festivo
+        except Exception as e:
+            # Las consultas que esperaban reciben el mismo error en lugar del respaldo
+            en_curso[1] = e
+            raise
+        finally:
+            with self._candado:
+                del self._en_curso[clave]
+            en_curso[0].set()
+
+
+_proveedor_en_linea = None
+_candado_proveedor = threading.Lock()
+
+
+def proveedor_en_linea():
+    """
+    Retorna el proveedor en linea compartido por el proceso, creandolo la primera vez.
+
+    La clave se lee de la variable de entorno HOLIDAYS_API_KEY y el cache en disco
+    de PICOPLACA_CACHE (por defecto ~/.cache/picoplaca/festivos.json).
+    """
+    global _proveedor_en_linea
+    with _candado_proveedor:
+        if _proveedor_en_linea is None:
+            ruta = os.environ.get('PICOPLACA_CACHE', os.path.join(
+                os.path.expanduser('~'), '.cache', 'picoplaca', 'festivos.json'))
+            _proveedor_en_linea = ProveedorFestivosEnLinea(
+                api_key=os.environ.get('HOLIDAYS_API_KEY'), ruta_cache=ruta)
+            INSTRUMENTACION.registrar_fuente("api", _proveedor_en_linea.estadisticas)
+        return _proveedor_en_linea
+
+
+class ConciliadorFestivos:
+    """
+    Conciliacion masiva de las tablas sin conexion con la API de festivos.
+
+    En lugar de una solicitud por fecha, se pide a la API un mes completo por
+    solicitud (country, year y month), desde varios hilos a la vez pero con un
+    LimitadorTokens compartido que respeta la tasa de la API. Cada mes
+    descargado se guarda en un archivo de progreso JSON, de modo que una
+    conciliacion interrumpida continua donde quedo sin repetir solicitudes.
+    El archivo registra la URL y el pais consultados; si no coinciden con los
+    del conciliador, o con refrescar, se descarta y se descarga todo de nuevo.
+    Cada solicitud se descuenta de la cuota mensual del ProveedorFestivosEnLinea
+    compartido; agotada la cuota, los meses restantes quedan como errores.
+
+    Los festivos de la API se reparten por su campo location: los de
+    "Ecuador" (o sin lugar) van a la tabla nacional "EC" y los que nombran
+    una provincia a la tabla de esa provincia; los demas se reportan como no
+    asignados. Igual que ProveedorFestivosEnLinea, se descarta el Jueves Santo.
+    Con las tablas de la API se arma un informe de diferencias por año y
+    provincia, una InstantaneaFestivos (instantanea()) o ajustes de un
+    CalendarioFestivos (aplicar()).
+    ...
+    Atributos
+    ----------
+    api_key : str
+        Clave de la API
+    url_base : str
+        URL de la API; se puede apuntar a un servidor local para pruebas
+    ruta_progreso : str
+        Archivo JSON con los meses ya descargados, o None para no guardarlos
+    proveedor : ProveedorFestivosEnLinea
+        Proveedor cuya cuota mensual comparten las solicitudes
+    trabajadores : int
+        Numero de hilos que consultan la API
+    reintentos : int
+        Reintentos de un mes ante errores de red, 429 o 5xx
+    solicitudes : int
+        Solicitudes hechas a la API
+    errores : dict
+        "AAAA-MM" -> mensaje del ultimo error de los meses que no se pudieron descargar
+    Metodos
+    -------
+    descargar(self, años):
+        Descarga los meses que faltan de los años indicados.
+    conciliar(self, años, provincias=None):
+        Retorna el informe de diferencias por año y provincia.
+    instantanea(self, años):
+        Retorna una InstantaneaFestivos con las tablas conciliadas.
+    aplicar(self, años, calendario=None):
+        Ajusta un CalendarioFestivos con las tablas conciliadas.
+    """
+
+    # Festivos que la API publica pero que no son de descanso obligatorio
+    NO_FESTIVOS = frozenset(["Maundy Thursday"])
+    PAIS = "EC"
+    VERSION = 2
+
+    def __init__(self, api_key=None, url_base=ProveedorFestivosEnLinea.URL_ABSTRACTAPI,
+                 ruta_progreso=None, tasa=1.0, trabajadores=4, reintentos=3, calendario=None,
+                 sesion=None, tiempo_espera=10, espera_reintento=1.0, proveedor=None,
+                 refrescar=False):
+        """
+        Construye el conciliador y lee el progreso guardado.
+
+        Parametros
+        ----------
+        tasa : float, opcional
+            Solicitudes por segundo entre todos los hilos (el valor predeterminado es 1)
+        calendario : CalendarioFestivos, opcional
+            Tablas sin conexion a comparar (el valor predeterminado es CALENDARIO_FESTIVOS)
+        sesion : requests.Session, opcional
+            Sesion compartida; por defecto cada hilo abre la suya
+        espera_reintento : float, opcional
+            Segundos antes del primer reintento; se duplica en cada uno
+        proveedor : ProveedorFestivosEnLinea, opcional
+            Proveedor cuya cuota se descuenta (el valor predeterminado es proveedor_en_linea())
+        refrescar : boolean, opcional
+            Ignorar el progreso guardado y descargar todos los meses de nuevo
+            (el valor predeterminado es Falso)
+        """
+        if trabajadores < 1:
+            raise ValueError('trabajadores debe ser mayor o igual a 1')
+        self.api_key = api_key
+        self.url_base = url_base
+        self.ruta_progreso = ruta_progreso
+        self.trabajadores = trabajadores
+        self.reintentos = reintentos
+        self.tiempo_espera = tiempo_espera
+        self.espera_reintento = espera_reintento
+        self.calendario = calendario if calendario is not None else CALENDARIO_FESTIVOS
+        self.proveedor = proveedor if proveedor is not None else proveedor_en_linea()
+        self.limitador = LimitadorTokens(tasa)
+        self.solicitudes = 0
+        self.errores = {}
+        self._sesion = sesion
+        self._hilos = threading.local()
+        self._candado = threading.Lock()
+        self._meses = {} if refrescar else self._cargar_progreso()
+
+    def _cargar_progreso(self):
+        """
+        Lee el progreso; un archivo ausente, dañado, de otra version o de otra URL
+        o pais equivale a empezar de cero.
+        """
+        if not self.ruta_progreso or not os.path.exists(self.ruta_progreso):
+            return {}
+        try:
+            with open(self.ruta_progreso, encoding='utf-8') as archivo:
+                datos = json.load(archivo)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(datos, dict) or datos.get("version") != self.VERSION:
+            return {}
+        if datos.get("url_base") != self.url_base or datos.get("pais") != self.PAIS:
+            return {}
+        return dict(datos.get("meses", {}))
+
+    def _guardar_progreso(self):
+        """Escribe el progreso de forma atomica. Se llama con el candado tomado."""
+        if not self.ruta_progreso:
+            return
+        directorio = os.path.dirname(os.path.abspath(self.ruta_progreso))
+        os.makedirs(directorio, exist_ok=True)
+        temporal = '{}.{}.tmp'.format(self.ruta_progreso, os.getpid())
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump({"version": self.VERSION, "url_base": self.url_base, "pais": self.PAIS,
+                       "meses": self._meses}, archivo, ensure_ascii=False)
+        os.replace(temporal, self.ruta_progreso)
+
+    def _sesion_del_hilo(self):
+        if self._sesion is not None:
+            return self._sesion
+        sesion = getattr(self._hilos, "sesion", None)
+        if sesion is None:
+            import requests
+            sesion = self._hilos.sesion = requests.Session()
+        return sesion
+
+    @staticmethod
+    def _fecha_de(festivo):
+        """Retorna la fecha ISO de un festivo de la API (date_year/month/day o date MM/DD/AAAA)."""
+        if festivo.get("date_year"):
+            return datetime.date(int(festivo["date_year"]), int(festivo["date_month"]),
+                                 int(festivo["date_day"])).isoformat()
+        mes, dia, año = festivo["date"].split("/")
+        return datetime.date(int(año), int(mes), int(dia)).isoformat()
+
+    def _consultar_mes(self, año, mes):
+        """
+        Descarga los festivos de un mes, reintentando ante errores transitorios.
+
+        Retorna
+        -------
+        list de [fecha AAAA-MM-DD, nombre, lugar].
+
+        Plantear
+        ------
+        requests.RequestException
+            Si la clave falta (401), la cuota mensual esta agotada o se agotan
+            los reintentos
+        """
+        import requests
+        error = None
+        for intento in range(self.reintentos + 1):
+            if intento:
+                time.sleep(self.espera_reintento * 2 ** (intento - 1))
+            if not self.proveedor.reservar_cuota(guardar=True):
+                raise requests.HTTPError('Cuota mensual de la API agotada')
+            self.limitador.adquirir()
+            with self._candado:
+                self.solicitudes += 1
+            try:
+                response = self._sesion_del_hilo().get(self.url_base, timeout=self.tiempo_espera, params={
+                    "api_key": self.api_key, "country": self.PAIS, "year": año, "month": mes})
+            except requests.RequestException as e:
+                INSTRUMENTACION.incrementar("api_errores")
+                error = e
+                continue
+            if response.status_code >= 400:
+                INSTRUMENTACION.incrementar("api_errores")
+            if response.status_code == 401:
+                raise requests.HTTPError(
+                    'Falta la clave API. Guarde su clave en la variable de entorno HOLIDAYS_API_KEY',
+                    response=response)
+            if response.status_code == 429 or response.status_code >= 500:
+                error = requests.HTTPError('La API respondio {}'.format(response.status_code))
+                continue
+            response.raise_for_status()
+            try:
+                return [[self._fecha_de(f), f.get("name") or "", f.get("location") or ""]
+                        for f in response.json() if f.get("name") not in self.NO_FESTIVOS]
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                raise requests.HTTPError('Respuesta invalida de la API: {}'.format(e))
+        raise error
+
+    def descargar(self, años):
+        """
+        Descarga los meses de los años indicados que no estan en el progreso.
+
+        Los meses que fallan quedan en errores y se vuelven a intentar en la
+        siguiente llamada; un 401 detiene la descarga.
+
+        Parametros
+        ----------
+        años : iterable de int
+            Años a descargar
+        Retorna
+        -------
+        Numero de meses descargados en esta llamada.
+        """
+        import requests
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        pendientes = [(año, mes) for año in años for mes in range(1, 13)
+                      if '{:04d}-{:02d}'.format(año, mes) not in self._meses]
+        descargados = 0
+        with ThreadPoolExecutor(max_workers=self.trabajadores) as grupo:
+            futuros = {grupo.submit(self._consultar_mes, año, mes): '{:04d}-{:02d}'.format(año, mes)
+                       for año, mes in pendientes}
+            try:
+                for futuro in as_completed(futuros):
+                    clave = futuros[futuro]
+                    try:
+                        festivos = futuro.result()
+                    except requests.RequestException as e:
+                        if getattr(e.response, "status_code", None) == 401:
+                            raise
+                        with self._candado:
+                            self.errores[clave] = str(e)
+                        continue
+                    with self._candado:
+                        self.errores.pop(clave, None)
+                        self._meses[clave] = festivos
+                        self._guardar_progreso()
+                    descargados += 1
+            except BaseException:
+                for futuro in futuros:
+                    futuro.cancel()
+                raise
+        return descargados
+
+    @staticmethod
+    def _normalizar(texto):
+        import unicodedata
+        return ''.join(c for c in unicodedata.normalize('NFKD', texto)
+                       if not unicodedata.combining(c)).lower()
+
+    def _provincia_de(self, lugar):
+        """Retorna "EC", el codigo de la provincia nombrada en lugar, o None si no se reconoce."""
+        lugar = self._normalizar(lugar).strip()
+        if lugar in ("", "ecuador"):
+            return CalendarioFestivos.NACIONAL
+        # Los nombres mas largos primero: "Santo Domingo de los Tsachilas" antes que otros
+        for codigo, nombre in sorted(NOMBRES_PROVINCIAS.items(), key=lambda p: -len(p[1])):
+            if self._normalizar(nombre) in lugar:
+                return codigo
+        return None
+
+    def tablas_api(self, año):
+        """
+        Retorna las tablas de la API de un año ya descargado.
+
+        Retorna
+        -------
+        Tupla (tablas, no_asignados): tablas es un dict prov -> frozenset de
+        fechas, con "EC" para los nacionales, y no_asignados una lista de
+        [fecha, nombre, lugar]; o None si falta algun mes del año.
+        """
+        with self._candado:
+            meses = [self._meses.get('{:04d}-{:02d}'.format(año, mes)) for mes in range(1, 13)]
+        if any(m is None for m in meses):
+            return None
+        tablas = {CalendarioFestivos.NACIONAL: set()}
+        no_asignados = []
+        for fecha, nombre, lugar in itertools.chain.from_iterable(meses):
+            prov = self._provincia_de(lugar)
+            if prov is None:
+                no_asignados.append([fecha, nombre, lugar])
+            else:
+                tablas.setdefault(prov, set()).add(datetime.date.fromisoformat(fecha))
+        return {prov: frozenset(fechas) for prov, fechas in tablas.items()}, no_asignados
+
+    def _tabla_local(self, prov, año):
+        if prov == CalendarioFestivos.NACIONAL:
+            return self.calendario.nacional(año)
+        return self.calendario.provincial(prov, año)
+
+    def conciliar(self, años, provincias=None, descargar=True):
+        """
+        Compara las tablas sin conexion con las de la API.
+
+        Parametros
+        ----------
+        años : iterable de int
+            Años a comparar
+        provincias : iterable de str, opcional
+            Provincias a comparar ademas de "EC" (por defecto todas)
+        descargar : boolean, opcional
+            Descargar antes los meses que falten (el valor predeterminado es Verdadero)
+        Retorna
+        -------
+        dict serializable en JSON con las diferencias (año, provincia, fechas solo
+        en la tabla local y solo en la API), los años de cada provincia con
+        festivos locales a los que la API no asigna ninguna fecha, los festivos
+        no asignados, los años incompletos y los errores de descarga.
+        """
+        años = list(años)
+        provincias = list(provincias) if provincias is not None else list(PROVINCIAS)
+        for prov in provincias:
+            CalendarioFestivos._validar_provincia(prov)
+        if descargar:
+            self.descargar(años)
+        diferencias, no_asignados, incompletos, sin_datos = [], [], [], {}
+        for año in años:
+            api = self.tablas_api(año)
+            if api is None:
+                incompletos.append(año)
+                continue
+            tablas, sueltos = api
+            no_asignados.extend(sueltos)
+            for prov in [CalendarioFestivos.NACIONAL] + provincias:
+                local = self._tabla_local(prov, año)
+                remota = tablas.get(prov)
+                if remota is None:
+                    # La API no asigna fechas a la provincia: no hay con que comparar
+                    if local:
+                        sin_datos.setdefault(prov, []).append(año)
+                    continue
+                if local != remota:
+                    diferencias.append({
+                        "año": año, "provincia": prov,
+                        "solo_local": sorted(f.isoformat() for f in local - remota),
+                        "solo_api": sorted(f.isoformat() for f in remota - local)})
+        with self._candado:
+            errores = dict(sorted(self.errores.items()))
+        return {"años": años, "provincias": provincias, "diferencias": diferencias,
+                "sin_datos_api": sin_datos, "no_asignados": no_asignados,
+                "incompletos": incompletos, "errores": errores}
+
+    def _tablas_conciliadas(self, años):
+        """
+        Genera (prov, año, fechas) de los años completos: la tabla nacional de la
+        API y, para cada provincia, la de la API si la API le asigna alguna fecha
+        ese año o si no la tabla local.
+        """
+        for año in años:
+            api = self.tablas_api(año)
+            if api is None:
+                continue
+            tablas = api[0]
+            yield CalendarioFestivos.NACIONAL, año, tablas[CalendarioFestivos.NACIONAL]
+            for prov in sorted(set(FESTIVOS_PROVINCIALES) | set(tablas) - {CalendarioFestivos.NACIONAL}):
+                yield prov, año, tablas[prov] if prov in tablas else self.calendario.provincial(prov, año)
+
+    def instantanea(self, años):
+        """
+        Congela las tablas conciliadas de los años completos en una InstantaneaFestivos.
+
+        Retorna
+        -------
+        InstantaneaFestivos; se guarda con guardar() y se usa con
+        CalendarioFestivos.usar_instantanea().
+        """
+        return InstantaneaFestivos({(prov, año): [f.toordinal() for f in fechas]
+                                    for prov, año, fechas in self._tablas_conciliadas(años)})
+
+    def aplicar(self, años, calendario=None):
+        """
+        Ajusta un calendario con las tablas conciliadas que difieren de las suyas.
+
+        Parametros
+        ----------
+        calendario : CalendarioFestivos, opcional
+            Calendario a ajustar (por defecto el del conciliador)
+        Retorna
+        -------
+        Numero de fechas que cambiaron de estado.
+        """
+        calendario = calendario if calendario is not None else self.calendario
+        return sum(len(calendario.ajustar(prov, año, fechas))
+                   for prov, año, fechas in self._tablas_conciliadas(años))
+
+
+class MapaRestricciones:
+    """
+    Tabla precompilada de restricciones por dia, mapeable en memoria.
+
+    Cada dia del rango guarda una mascara de 10 bits: el bit d esta encendido si
+    las placas terminadas en d no pueden circular en horas pico ese dia. La mascara
+    ya combina los festivos y la tabla de restricciones por dia de la semana, de
+    modo que la consulta es un indice en el arreglo y una prueba de bit. El archivo
+    se abre con mmap en solo lectura, asi todos los procesos comparten las mismas
+    paginas.
+
+    Formato del archivo: encabezado '<4sHH5s3xIII' (firma, version, reservado,
+    provincia, huella de las reglas, ordinal del primer dia, numero de dias)
+    seguido de un uint16 little-endian por dia. La provincia y la huella
+    (ReglasPicoPlaca.huella) quedan en el archivo porque las mascaras dependen de
+    ellas; EvaluadorPicoPlaca deja de usar la tabla si sus reglas son otras.
+    ...
+    Metodos
+    -------
+    compilar(inicio, fin, ruta, prov="EC-P"):
+        Genera el archivo de la tabla para el rango de fechas [inicio, fin].
+    abrir(ruta, prov=None):
+        Abre un archivo compilado.
+    mascara(self, fecha, reglas=None):
+        Retorna la mascara de digitos restringidos de una fecha.
+    restringido(self, fecha, digito):
+        Retorna True si el digito esta restringido en horas pico ese dia.
+    """
+
+    FIRMA = b'PYPM'
+    VERSION = 3
+    _ENCABEZADO = struct.Struct('<4sHH5s3xIII')
+    _DIA = struct.Struct('<H')
+
+    def __init__(self, datos, prov=None, archivo=None):
+        try:
+            (firma, version, _, provincia, self.huella,
+             self.primer_ordinal, self.dias) = self._ENCABEZADO.unpack_from(datos, 0)
+        except struct.error:
+            raise ValueError('La tabla de restricciones esta truncada')
+        if firma != self.FIRMA or version != self.VERSION:
+            raise ValueError('El archivo no es una tabla de restricciones compatible')
+        if len(datos) < self._ENCABEZADO.size + 2 * self.dias:
+            raise ValueError('La tabla de restricciones esta truncada')
+        provincia = provincia.rstrip(b'\0').decode('ascii')
+        if prov is not None and prov != provincia:
+            raise ValueError('La tabla de restricciones se compilo para {}, no para {}'.format(provincia, prov))
+        self.prov = provincia
+        self._datos = datos
+        self._archivo = archivo
+
+    @staticmethod
+    def mascara_calculada(fecha, prov="EC-P", reglas=None, calendario=None):
+        """
+        Calcula la mascara de un dia a partir del calendario y las reglas (por
+        defecto CALENDARIO_FESTIVOS y MOTOR_REGLAS).
+        """
+        if (calendario or CALENDARIO_FESTIVOS).es_festivo(fecha, prov):
+            return 0
+        reglas = reglas or MOTOR_REGLAS.reglas
+        return reglas.version_para(fecha).mascaras[fecha.weekday()]
+
+    @classmethod
+    def compilar(cls, inicio, fin, ruta, prov="EC-P", reglas=None):
+        """
+        Genera el archivo de la tabla para un rango de fechas.
+
+        Parametros
+        ----------
+        inicio : datetime.date o str
+            Primer dia del rango (AAAA-MM-DD)
+        fin : datetime.date o str
+            Ultimo dia del rango, incluido
+        ruta : str
+            Archivo de destino; se reemplaza de forma atomica
+        prov : str, opcional
+            Codigo de provincia según ISO3166-2 (el valor predeterminado es "EC-P")
+        reglas : ReglasPicoPlaca, opcional
+            Reglas a compilar (por defecto las vigentes en MOTOR_REGLAS)
+        Retorna
+        -------
+        Numero de dias escritos.
+        """
+        if isinstance(inicio, str):
+            inicio = datetime.date.fromisoformat(inicio)
+        if isinstance(fin, str):
+            fin = datetime.date.fromisoformat(fin)
+        if fin < inicio:
+            raise ValueError('La fecha final debe ser posterior a la inicial')
+        CalendarioFestivos._validar_provincia(prov)
+        dias = fin.toordinal() - inicio.toordinal() + 1
+        cuerpo = bytearray(2 * dias)
+        reglas = reglas or MOTOR_REGLAS.reglas
+        for i in range(dias):
+            fecha = datetime.date.fromordinal(inicio.toordinal() + i)
+            cls._DIA.pack_into(cuerpo, 2 * i, cls.mascara_calculada(fecha, prov, reglas))
+        temporal = '{}.{}.tmp'.format(ruta, os.getpid())
+        with open(temporal, 'wb') as archivo:
+            archivo.write(cls._ENCABEZADO.pack(cls.FIRMA, cls.VERSION, 0, prov.encode('ascii'),
+                                               reglas.huella, inicio.toordinal(), dias))
+            archivo.write(cuerpo)
+        os.replace(temporal, ruta)
+        return dias
+
+    @classmethod
+    def abrir(cls, ruta, prov=None):
+        """
+        Abre una tabla compilada con mmap en solo lectura.
+
+        Parametros
+        ----------
+        ruta : str
+            Archivo generado con compilar()
+        prov : str, opcional
+            Provincia esperada; por defecto la del archivo
+
+        Plantear
+        ------
+        ValorError
+            Si el archivo no es una tabla compatible o se compilo para otra provincia
+        """
+        with open(ruta, 'rb') as archivo:
+            datos = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return cls(datos, prov, ruta)
+        except ValueError:
+            datos.close()
+            raise
+
+    def cerrar(self):
+        """Libera el mapeo del archivo."""
+        if isinstance(self._datos, mmap.mmap):
+            self._datos.close()
+
+    def mascara(self, fecha, reglas=None, calendario=None):
+        """
+        Retorna la mascara de digitos restringidos de una fecha.
+
+        Parametros
+        ----------
+        fecha : datetime.date o int
+            Fecha o su ordinal proleptico (datetime.date.toordinal)
+        reglas : ReglasPicoPlaca, opcional
+            Reglas para las fechas fuera del rango compilado (por defecto MOTOR_REGLAS)
+        calendario : CalendarioFestivos, opcional
+            Festivos para las fechas fuera del rango (por defecto CALENDARIO_FESTIVOS)
+        Retorna
+        -------
+        int con el bit d encendido si el digito d esta restringido ese dia.
+        """
+        ordinal = fecha if isinstance(fecha, int) else fecha.toordinal()
+        i = ordinal - self.primer_ordinal
+        if 0 <= i < self.dias:
+            return self._DIA.unpack_from(self._datos, self._ENCABEZADO.size + 2 * i)[0]
+        # Fuera del rango compilado se calcula con el calendario
+        if isinstance(fecha, int):
+            fecha = datetime.date.fromordinal(fecha)
+        return self.mascara_calculada(fecha, self.prov, reglas, calendario)
+
+    def restringido(self, fecha, digito):
+        """Retorna True si el digito esta restringido en horas pico en la fecha."""
+        return (self.mascara(fecha) >> digito) & 1 == 1
+
+
+class EvaluadorPicoPlaca:
+    """
+    Evaluador reutilizable y sin estado de las reglas de Pico y Placa.
+
+    Guarda los patrones precompilados, la tabla de restricciones como mascaras de
+    digitos por dia de la semana y el cache de festivos; evaluar() no modifica el
+    objeto, por lo que una misma instancia se puede usar desde muchos hilos a la vez
+    (tambien en CPython sin GIL): el unico estado mutable compartido es el de
+    CalendarioFestivos y ProveedorFestivosEnLinea, que lo protegen con candados.
+    ...
+    Atributos
+    ----------
+    calendario : CalendarioFestivos
+        Cache de festivos usado sin conexion
+    mapa : MapaRestricciones o None
+        Tabla precompilada; si se indica reemplaza la consulta de festivos sin conexion
+    prov : str
+        Codigo de provincia según ISO3166-2
+    Metodos
+    -------
+    validar_placa(self, placa), validar_fecha(self, fecha), validar_hora(self, hora):
+        Validan el formato y lanzan ValueError con los mensajes de PicoPlaca.
+    es_festivo(self, fecha, en_linea=False):
+        Retorna True si la fecha es festiva.
+    es_hora_pico(self, hora):
+        Retorna True si la hora esta dentro de las horas pico.
+    digitos_restringidos(self, fecha):
+        Retorna la mascara de ultimos digitos restringidos de la fecha.
+    evaluar(self, placa, fecha, hora, en_linea=False):
+        Retorna True si el vehiculo puede circular.
+    evaluar_validado(self, placa, dia, hora, en_linea=False):
+        Igual que evaluar() para valores ya validados, como los de PicoPlaca.
+    evaluar_lote(self, placas, fechas, horas, prov=None):
+        Version vectorizada de evaluar() sin conexion.
+    ventanas_restriccion(self, placa, desde, dias=30):
+        Retorna los intervalos restringidos de una placa en un horizonte.
+    proxima_hora_permitida(self, placa, momento, dias=30):
+        Retorna el primer minuto en que la placa puede circular, o None.
+    """
+
+    #Dias de la semana
+    DIAS = (
+            "Lunes",
+            "Martes",
+            "Miercoles",
+            "Jueves",
+            "Viernes",
+            "Sabado",
+            "Domingo")
+
+    # Diccionario que contiene la informacion de los dias de restricciones.
+    RESTRICCIONES = {
+            "Lunes": (1, 2),
+            "Martes": (3, 4),
+            "Miercoles": (5, 6),
+            "Jueves": (7, 8),
+            "Viernes": (9, 0),
+            "Sabado": (),
+            "Domingo": ()}
+
+    # Las tablas de esta clase son las reglas predeterminadas (ReglasPicoPlaca.predeterminadas);
+    # en tiempo de ejecucion se usan las de MotorReglas, que se pueden cargar de un archivo.
+
+    # Segundas letras de placas exentas
+    # https://es.wikipedia.org/wiki/Matr%C3%ADculas_automovil%C3%ADsticas_de_Ecuador
+    LETRAS_EXENTAS = 'AUZEXM'
+
+    # Horas pico en minutos del dia, ambos extremos incluidos: 07:00 - 09:30 y 16:00 - 19:30
+    HORAS_PICO = ((7 * 60, 9 * 60 + 30), (16 * 60, 19 * 60 + 30))
+
+    MENSAJE_PLACA = 'La placa debe estar en el siguiente formato:XX-YYYY o XXX-YYYY, Donde X es una letra mayuscula y Y es un digito.'
+    MENSAJE_FECHA = 'La fecha debe tener el siguiente formato: AAAA-MM-DD (por ejemplo: 2021-04-02)'
+    MENSAJE_HORA = 'Si el valor de la cadena no tiene el formato: HH:MM (Ej., 08:31, 14:22, 00:01)'
+
+    def __init__(self, calendario=None, mapa=None, proveedor=None, prov="EC-P", reglas=None):
+        """
+        Construye el evaluador.
+
+        Parametros
+        ----------
+        calendario : CalendarioFestivos, opcional
+            Cache de festivos (el valor predeterminado es CALENDARIO_FESTIVOS)
+        mapa : MapaRestricciones, opcional
+            Tabla precompilada de restricciones por dia
+        proveedor : ProveedorFestivosEnLinea, opcional
+            Proveedor usado cuando en_linea == Verdadero (por defecto el compartido por el proceso)
+        prov : str, opcional
+            Codigo de provincia según ISO3166-2 (el valor predeterminado es "EC-P")
+        reglas : MotorReglas o ReglasPicoPlaca, opcional
+            Reglas de la ordenanza (por defecto MOTOR_REGLAS); con un MotorReglas
+            cada evaluacion usa las reglas vigentes al momento de la consulta
+
+        Plantear
+        ------
+        ValorError
+            Si el mapa se compilo para otra provincia o con otras reglas
+        """
+        CalendarioFestivos._validar_provincia(prov)
+        self.calendario = calendario if calendario is not None else CALENDARIO_FESTIVOS
+        self.mapa = mapa
+        self.prov = prov
+        self._proveedor = proveedor
+        if reglas is None:
+            reglas = MOTOR_REGLAS
+        elif isinstance(reglas, ReglasPicoPlaca):
+            reglas = MotorReglas(reglas=reglas)
+        self.motor = reglas
+        self._reglas_del_mapa = None
+        if mapa is not None and mapa.prov != prov:
+            raise ValueError('La tabla de restricciones se compilo para {}, no para {}'.format(mapa.prov, prov))
+        if mapa is not None and self._mapa_para(reglas.reglas) is None:
+            raise ValueError('La tabla de restricciones se compilo con otras reglas; vuelva a compilarla')
+
+    def _mapa_para(self, reglas):
+        """
+        Retorna el mapa si se compilo con las reglas (por su huella), si no None:
+        tras una recarga de MotorReglas con otras reglas la tabla deja de usarse.
+        """
+        mapa = self.mapa
+        if mapa is None or reglas is self._reglas_del_mapa:
+            return mapa
+        if mapa.huella != reglas.huella:
+            return None
+        self._reglas_del_mapa = reglas
+        return mapa
+
+    def version(self, fecha=None):
+        """Retorna la VersionReglas vigente en la fecha (por defecto hoy)."""
+        return self.motor.reglas.version_para(fecha or datetime.date.today())
+
+    def validar_placa(self, placa):
+        """Retorna la placa si tiene el formato XX-YYYY o XXX-YYYY, si no lanza ValueError."""
+        analizar_placa(placa)
+        return placa
+
+    def validar_fecha(self, fecha):
+        """Retorna la fecha AAAA-MM-DD como datetime.date, si no lanza ValueError."""
+        return datetime.date.fromordinal(analizar_fecha(fecha))
+
+    def validar_hora(self, hora):
+        """Retorna la hora si tiene el formato HH:MM (o HH:, ver analizar_hora), si no lanza ValueError."""
+        analizar_hora(hora + '00' if len(hora) == 3 else hora)
+        return hora
+
+    def es_festivo(self, fecha, en_linea=False):
+        """
+        Comprueba si la fecha es un día festivo en Ecuador.
+
+        Parametros
+        ----------
+        fecha : datetime.date o str
+            Fecha a comprobar; las cadenas siguen el formato ISO 8601 AAAA-MM-DD
+        en_linea : boolean, opcional
+            si en línea == Verdadero, se utilizará la API de días festivos abstractos
+        """
+        if isinstance(fecha, str):
+            fecha = datetime.date.fromisoformat(fecha)
+        if en_linea:
+            proveedor = self._proveedor if self._proveedor is not None else proveedor_en_linea()
+            return proveedor.es_festivo(fecha)
+        return self.calendario.es_festivo(fecha, self.prov)
+
+    def es_exenta(self, placa, version=None):
+        """
+        Retorna True si la placa esta excluida de la restriccion por su segunda letra o por tener dos letras.
+
+        Parametros
+        ----------
+        version : VersionReglas, opcional
+            Reglas a aplicar (por defecto las vigentes hoy)
+        """
+        return (version or self.version()).es_exenta(placa)
+
+    def es_hora_pico(self, hora, version=None):
+        """
+        Comprueba si la hora HH:MM esta dentro de las horas pico prohibidas.
+
+        Parametros
+        ----------
+        version : VersionReglas, opcional
+            Reglas a aplicar (por defecto las vigentes hoy)
+
+        Plantear
+        ------
+        ValorError
+            Si la hora no tiene el formato HH:MM, con los mensajes de analizar_hora
+        """
+        return (version or self.version()).es_pico(analizar_hora(hora))
+
+    def digitos_restringidos(self, fecha, version=None):
+        """
+        Retorna la mascara de ultimos digitos restringidos en horas pico en la fecha.
+
+        Sin mapa solo considera el dia de la semana; con mapa tambien los festivos.
+        El mapa solo se usa si se compilo con las reglas vigentes.
+        """
+        reglas = self.motor.reglas
+        mapa = self._mapa_para(reglas)
+        if mapa is not None:
+            return mapa.mascara(fecha, reglas, self.calendario)
+        return (version or reglas.version_para(fecha)).mascaras[fecha.weekday()]
+
+    def mascara_del_dia(self, fecha, en_linea=False):
+        """
+        Retorna la mascara de ultimos digitos restringidos en horas pico en la fecha,
+        considerando los festivos (la mascara es 0 en un dia festivo).
+        """
+        reglas = self.motor.reglas
+        mapa = None if en_linea else self._mapa_para(reglas)
+        if mapa is not None:
+            return mapa.mascara(fecha, reglas, self.calendario)
+        if self.es_festivo(fecha, en_linea):
+            return 0
+        return reglas.version_para(fecha).mascaras[fecha.weekday()]
+
+    def ventanas_restriccion(self, placa, desde, dias=30, en_linea=False):
+        """
+        Calcula los intervalos en que la placa no puede circular dentro de un horizonte.
+
+        El costo depende del numero de dias y no del de minutos: por cada dia se
+        consulta una vez la mascara de digitos (festivos y dia de la semana) y se
+        emiten las horas pico si el ultimo digito esta restringido. Las ventanas
+        que se tocan, como una hora pico que termina a medianoche y otra que
+        empieza a esa hora el dia siguiente, se unen en una sola.
+
+        Parametros
+        ----------
+        placa : str
+            Placa en formato XX-YYYY o XXX-YYYY
+        desde : datetime.datetime
+            Inicio del horizonte; los intervalos que ya empezaron se recortan
+        dias : int, opcional
+            Longitud del horizonte en dias (el valor predeterminado es 30)
+        en_linea : boolean, opcional
+            si en línea == Verdadero, se utilizará la API de días festivos abstractos
+        Retorna
+        -------
+        list de tuplas (inicio, fin) de datetime.datetime en orden y disjuntas;
+        inicio es el primer minuto restringido y fin el primer minuto permitido
+        despues de el, o el fin del horizonte si la ventana llega hasta ahi.
+        """
+        self.validar_placa(placa)
+        bit = 1 << int(placa[-1])
+        fin_horizonte = desde + datetime.timedelta(days=dias)
+        ventanas = []
+        reglas = self.motor.reglas
+        dia = desde.date()
+        medianoche = datetime.datetime.combine(dia, datetime.time(), desde.tzinfo)
+        while medianoche < fin_horizonte:
+            version = reglas.version_para(dia)
+            if not version.es_exenta(placa) and self.mascara_del_dia(dia, en_linea) & bit:
+                for inicio, fin in version.intervalos_pico:
+                    a = medianoche + datetime.timedelta(minutes=inicio)
+                    b = medianoche + datetime.timedelta(minutes=fin + 1)
+                    a, b = max(a, desde), min(b, fin_horizonte)
+                    if a >= b:
+                        continue
+                    if ventanas and ventanas[-1][1] >= a:
+                        ventanas[-1] = (ventanas[-1][0], b)
+                    else:
+                        ventanas.append((a, b))
+            dia += datetime.timedelta(days=1)
+            medianoche += datetime.timedelta(days=1)
+        return ventanas
+
+    def proxima_hora_permitida(self, placa, momento, dias=30, en_linea=False):
+        """
+        Retorna el primer minuto, desde momento, en que la placa puede circular.
+
+        Parametros
+        ----------
+        placa : str
+            Placa en formato XX-YYYY o XXX-YYYY
+        momento : datetime.datetime
+            Instante de la consulta; se redondea hacia abajo al minuto
+        dias : int, opcional
+            Dias que se examinan hacia adelante (el valor predeterminado es 30)
+        Retorna
+        -------
+        datetime.datetime; es el mismo momento si ya puede circular, o None si la
+        restriccion sigue hasta el fin del horizonte.
+        """
+        momento = momento.replace(second=0, microsecond=0)
+        fin_horizonte = momento + datetime.timedelta(days=dias)
+        ventanas = self.ventanas_restriccion(placa, momento, dias, en_linea)
+        # Las ventanas estan unidas: si la primera contiene el momento, su fin es permitido
+        if not ventanas or ventanas[0][0] > momento:
+            return momento
+        fin = ventanas[0][1]
+        return fin if fin < fin_horizonte else None
+
+    def evaluar(self, placa, fecha, hora, en_linea=False):
+        """
+        Comprueba si el vehículo con la placa especificada puede estar en la carretera en la fecha y hora proporcionada.
+
+        Parametros
+        ----------
+        placa : str
+            Placa en formato XX-YYYY o XXX-YYYY
+        fecha : str
+            Fecha en formato ISO 8601 AAAA-MM-DD
+        hora : str
+            Hora en formato HH:MM
+        en_linea : boolean, opcional
+            si en línea == Verdadero, se utilizará la API de días festivos abstractos
+        Retorna
+        -------
+        Verdadero si el vehículo puede estar en el camino en la fecha y hora especificadas, de lo contrario Falso.
+
+        Plantear
+        ------
+        ValorError
+            Si la placa, la fecha o la hora no tienen el formato esperado
+        """
+        marca = time.perf_counter() if INSTRUMENTACION.activo else None
+        segunda, dos_letras, digito = analizar_placa(placa)
+        dia = datetime.date.fromordinal(analizar_fecha(fecha))
+        minuto = analizar_hora(hora)
+        if marca is not None:
+            INSTRUMENTACION.etapa("validacion", marca)
+        return self._decidir(segunda, dos_letras, digito, dia, minuto, hora, en_linea)
+
+    def componentes(self, placa, fecha, hora, en_linea=False):
+        """
+        Igual que evaluar() pero retorna tambien los valores intermedios, como una
+        fila de componentes_lote().
+
+        Retorna
+        -------
+        Tupla (hora 0 a 23, dia de la semana, ultimo digito, clase de exencion,
+        festivo, puede circular).
+        """
+        segunda, dos_letras, digito = analizar_placa(placa)
+        dia = datetime.date.fromordinal(analizar_fecha(fecha))
+        minuto = analizar_hora(hora)
+        version = self.motor.reglas.version_para(dia)
+        return (minuto // 60, dia.weekday(), digito, version.clase_exencion(segunda, dos_letras),
+                self.es_festivo(dia, en_linea),
+                self._decidir(segunda, dos_letras, digito, dia, minuto, hora, en_linea))
+
+    def evaluar_validado(self, placa, dia, hora, en_linea=False):
+        """
+        Igual que evaluar() para valores ya validados, sin volver a analizar la
+        placa ni la fecha; la hora se interpreta solo si hace falta.
+
+        Parametros
+        ----------
+        placa : str
+            Placa que ya paso por validar_placa()
+        dia : datetime.date
+            Fecha, como la retorna validar_fecha()
+        hora : str
+            Hora que ya paso por validar_hora()
+        en_linea : boolean, opcional
+            si en línea == Verdadero, se utilizará la API de días festivos abstractos
+        """
+        return self._decidir(ord(placa[1]), placa[2] == '-', int(placa[-1]), dia, None, hora, en_linea)
+
+    def _minuto(self, minuto, hora):
+        if minuto is None:
+            # hora ya paso por validar_hora: analizar_hora da el mismo resultado
+            # que strptime, incluido el error de "HH:", sin importar _strptime
+            return analizar_hora(hora)
+        return minuto
+
+    def _decidir(self, segunda, dos_letras, digito, dia, minuto, hora, en_linea):
+        """
+        Aplica las reglas a valores ya analizados.
+
+        Parametros
+        ----------
+        segunda : int
+            Codigo de la segunda letra de la placa
+        dos_letras : boolean
+            Si la placa tiene dos letras
+        digito : int
+            Ultimo digito de la placa
+        dia : datetime.date
+            Fecha de la consulta
+        minuto : int o None
+            Minuto del dia; si es None se interpreta hora cuando haga falta
+        hora : str
+            Hora original, usada solo si minuto es None
+        """
+        # Las reglas se leen una sola vez: una recarga simultanea no mezcla versiones
+        reglas = self.motor.reglas
+        version = reglas.version_para(dia)
+        # Con la instrumentacion apagada marca es None y medir cuesta una comparacion por etapa
+        marca = time.perf_counter() if INSTRUMENTACION.activo else None
+        mapa = None if en_linea else self._mapa_para(reglas)
+        sin_mapa = mapa is None
+        # Con el mapa la mascara del dia ya es 0 en los festivos
+        if sin_mapa:
+            festivo = self.es_festivo(dia, en_linea)
+            if marca is not None:
+                marca = INSTRUMENTACION.etapa("festivo_en_linea" if en_linea else "festivo_sin_conexion", marca)
+            if festivo:
+                return True
+        exenta = version.es_exenta_codigo(segunda, dos_letras)
+        if marca is not None:
+            marca = INSTRUMENTACION.etapa("exencion", marca)
+        if exenta:
+            return True
+        pico = version.es_pico(self._minuto(minuto, hora))
+        if marca is not None:
+            marca = INSTRUMENTACION.etapa("hora_pico", marca)
+        if not pico:
+            return True
+        if sin_mapa:
+            mascara = version.mascaras[dia.weekday()]
+        else:
+            mascara = mapa.mascara(dia, reglas, self.calendario)
+        if marca is not None:
+            INSTRUMENTACION.etapa("dia_semana" if sin_mapa else "mapa_restricciones", marca)
+        return (mascara >> digito) & 1 == 0
+
+    def evaluar_lote(self, placas, fechas, horas, prov=None):
+        """
+        Evalua columnas completas de placas, fechas y horas en una sola llamada (modo sin conexion).
+
+        Da las mismas respuestas que evaluar() pero trabaja sobre arreglos: la
+        validacion, el ultimo digito, la letra exenta, el dia de la semana, la hora
+        pico y los festivos se calculan como mascaras de NumPy.
+
+        Parametros
+        ----------
+        placas : lista o numpy.ndarray de str
+            Placas en formato XX-YYYY o XXX-YYYY
+        fechas : lista o numpy.ndarray de str
+            Fechas en formato ISO 8601 AAAA-MM-DD
+        horas : lista o numpy.ndarray de str
+            Horas en formato HH:MM
+        prov : str, opcional
+            Codigo de provincia según ISO3166-2 (por defecto la del evaluador)
+        Retorna
+        -------
+        numpy.ndarray de bool, verdadero donde el vehiculo puede circular.
+
+        Plantear
+        ------
+        ValorError
+            Si las columnas no tienen la misma longitud o alguna fila no tiene el
+            formato esperado; el mensaje indica la primera fila invalida y el
+            error que daria evaluar().
+        """
+        return self.componentes_lote(placas, fechas, horas, prov)["puede_circular"]
+
+    def componentes_lote(self, placas, fechas, horas, prov=None, tolerante=False):
+        """
+        Igual que evaluar_lote() pero retorna tambien los valores intermedios de
+        cada fila, para agregar sin volver a analizar los registros.
+
+        Las filas que la validacion vectorizada no acepta (formato distinto de
+        AAAA-MM-DD con digitos ASCII, fechas inexistentes, etc.) se evaluan una por
+        una con los analizadores de evaluar(), de modo que aceptan y rechazan lo
+        mismo que la consulta individual.
+
+        Parametros
+        ----------
+        tolerante : boolean, opcional
+            Si es Verdadero las filas invalidas no lanzan ValueError: se reportan en
+            "errores" y el resto de las filas se evalua igual
+        Retorna
+        -------
+        dict de numpy.ndarray con una posicion por fila: "hora" (0 a 23),
+        "dia_semana" (0 es lunes), "digito", "exencion" (ver VersionReglas.clase_exencion),
+        "festivo" y "puede_circular". Si tolerante, ademas "errores": dict de
+        fila a mensaje; en esas filas los demas valores son 0 o Falso.
+        """
+        import numpy as np
+
+        prov = prov or self.prov
+        placas = np.asarray(placas, dtype="U9")
+        fechas = np.asarray(fechas, dtype="U11")
+        horas = np.asarray(horas, dtype="U6")
+        n = len(placas)
+        if placas.ndim != 1 or fechas.shape != (n,) or horas.shape != (n,):
+            raise ValueError('Las columnas placas, fechas y horas deben tener la misma longitud')
+        if n == 0:
+            vacio = np.zeros(0, dtype=np.int64)
+            componentes = {"hora": vacio, "dia_semana": vacio, "digito": vacio, "exencion": vacio,
+                           "festivo": vacio.astype(bool), "puede_circular": vacio.astype(bool)}
+            if tolerante:
+                componentes["errores"] = {}
+            return componentes
+
+        def es_digito(c):
+            return (c >= ord('0')) & (c <= ord('9'))
+
+        def es_mayuscula(c):
+            return (c >= ord('A')) & (c <= ord('Z'))
+
+        # Placas: XX-YYYY (7 caracteres) o XXX-YYYY (8 caracteres)
+        p = placas.view(np.uint32).reshape(n, 9)
+        largo = np.char.str_len(placas)
+        dos_letras = largo == 7
+        digitos_ok = es_digito(p[:, 3:7]).all(axis=1)
+        ok2 = dos_letras & es_mayuscula(p[:, :2]).all(axis=1) & (p[:, 2] == ord('-')) & digitos_ok
+        ok3 = ((largo == 8) & es_mayuscula(p[:, :3]).all(axis=1) & (p[:, 3] == ord('-'))
+               & es_digito(p[:, 4:8]).all(axis=1))
+        placa_ok = ok2 | ok3
+        digito = np.where(placa_ok, np.where(dos_letras, p[:, 6], p[:, 7]).astype(np.int64) - ord('0'), 0)
+        segunda = np.where(placa_ok, p[:, 1].astype(np.int64) - ord('A'), 0)
+
+        # Fechas: AAAA-MM-DD; el calendario se valida aqui para que numpy no lance
+        # ValueError al convertir a datetime64 (ni acepte el año 0)
+        f = fechas.view(np.uint32).reshape(n, 11)
+        d = f[:, [0, 1, 2, 3, 5, 6, 8, 9]].astype(np.int64) - ord('0')
+        año = d[:, 0] * 1000 + d[:, 1] * 100 + d[:, 2] * 10 + d[:, 3]
+        mes = d[:, 4] * 10 + d[:, 5]
+        dia_mes = d[:, 6] * 10 + d[:, 7]
+        bisiesto = (año % 4 == 0) & ((año % 100 != 0) | (año % 400 == 0))
+        dias_del_mes = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])[np.clip(mes, 0, 12)]
+        fecha_ok = ((np.char.str_len(fechas) == 10) & es_digito(f[:, [0, 1, 2, 3, 5, 6, 8, 9]]).all(axis=1)
+                    & (f[:, 4] == ord('-')) & (f[:, 7] == ord('-')) & (año >= 1) & (mes >= 1) & (mes <= 12)
+                    & (dia_mes >= 1) & (dia_mes <= dias_del_mes + ((mes == 2) & bisiesto)))
+        dias = np.where(fecha_ok, fechas, '1970-01-01').astype("datetime64[D]")
+        # 1970-01-01 fue jueves; con el lunes como 0 el desplazamiento es 3
+        dia_semana = (dias.astype(np.int64) + 3) % 7
+
+        # Horas: HH:MM, con 00 <= HH <= 23 y 00 <= MM <= 59
+        h = horas.view(np.uint32).reshape(n, 6).astype(np.int64) - ord('0')
+        largo_h = np.char.str_len(horas)
+        hora = h[:, 0] * 10 + h[:, 1]
+        minuto = h[:, 3] * 10 + h[:, 4]
+        hora_ok = ((largo_h == 5) & es_digito(h[:, [0, 1, 3, 4]] + ord('0')).all(axis=1)
+                   & (h[:, 2] == ord(':') - ord('0')) & (hora <= 23) & (minuto <= 59))
+        valida = placa_ok & fecha_ok & hora_ok
+        hora = np.where(valida, hora, 0)
+        minuto_dia = np.where(valida, hora * 60 + minuto, 0)
+
+        # Version de las reglas de cada fila
+        reglas = self.motor.reglas
+        tablas = reglas.tablas_lote()
+        ordinales = dias.astype(np.int64) + datetime.date(1970, 1, 1).toordinal()
+        indice = np.maximum(np.searchsorted(tablas["ordinales"], ordinales, side='right') - 1, 0)
+        exenta_letra = valida & tablas["letras"][indice, segunda]
+        exenta_dos_letras = valida & dos_letras & tablas["dos_letras"][indice]
+        exenta = exenta_letra | exenta_dos_letras
+        años = dias[valida].astype("datetime64[Y]").astype(np.int64) + 1970
+        festivos = [d for a in np.unique(años).tolist() for d in self.calendario.tabla(prov, a)]
+        festivo = valida & np.isin(dias, np.array(festivos, dtype="datetime64[D]"))
+        pico = tablas["pico"][indice, minuto_dia]
+
+        # Mascara de digitos restringidos por dia de la semana
+        restringido = (tablas["mascaras"][indice, dia_semana] >> digito) & 1 == 1
+
+        componentes = {"hora": hora, "dia_semana": np.where(valida, dia_semana, 0), "digito": digito,
+                       "exencion": np.where(exenta_letra, 1, np.where(exenta_dos_letras, 2, 0)),
+                       "festivo": festivo,
+                       "puede_circular": valida & (festivo | exenta | ~pico | ~restringido)}
+        errores = {}
+        for i in np.flatnonzero(~valida).tolist():
+            # Forma que solo aceptan los analizadores (o fila invalida): se evalua sola
+            try:
+                segunda_i, dos_letras_i, digito_i = analizar_placa(str(placas[i]))
+                dia = datetime.date.fromordinal(analizar_fecha(str(fechas[i])))
+                minuto_i = analizar_hora(str(horas[i]))
+            except ValueError as e:
+                if not tolerante:
+                    raise ValueError('Fila {}: {}'.format(i, e))
+                errores[i] = str(e)
+                continue
+            version = reglas.version_para(dia)
+            festivo_i = self.calendario.es_festivo(dia, prov)
+            exencion_i = version.clase_exencion(segunda_i, dos_letras_i)
+            fila = {"hora": minuto_i // 60, "dia_semana": dia.weekday(), "digito": digito_i,
+                    "exencion": exencion_i, "festivo": festivo_i,
+                    "puede_circular": (festivo_i or exencion_i != 0 or not version.es_pico(minuto_i)
+                                       or (version.mascaras[dia.weekday()] >> digito_i) & 1 == 0)}
+            for clave, valor in fila.items():
+                componentes[clave][i] = valor
+        if tolerante:
+            componentes["errores"] = errores
+        return componentes
+
+
+class VersionReglas:
+    """
+    Reglas de Pico y Placa vigentes desde una fecha, compiladas en tablas de busqueda.
+    ...
+    Atributos
+    ----------
+    vigente_desde : datetime.date
+        Primer dia en que rige la version
+    mascaras : tuple de int
+        Mascara de ultimos digitos restringidos por dia de la semana (0 es lunes)
+    minutos_pico : int
+        Conjunto de bits de los minutos del dia (0 a 1439) que son hora pico
+    intervalos_pico : tuple de tuplas (inicio, fin)
+        Los mismos minutos agrupados en intervalos, ambos extremos incluidos
+    letras_exentas : frozenset de str
+        Segundas letras de placas exentas
+    exentas_dos_letras : boolean
+        Si las placas de dos letras estan exentas
+    """
+
+    __slots__ = ("vigente_desde", "mascaras", "minutos_pico", "intervalos_pico",
+                 "letras_exentas", "codigos_exentos", "exentas_dos_letras")
+
+    def __init__(self, vigente_desde, restricciones, horas_pico, letras_exentas, exentas_dos_letras=True):
+        """
+        Compila una version de las reglas.
+
+        Parametros
+        ----------
+        vigente_desde : datetime.date
+            Primer dia en que rige la version
+        restricciones : dict
+            Ultimos digitos restringidos por dia, con las claves de EvaluadorPicoPlaca.DIAS
+        horas_pico : iterable de tuplas (inicio, fin)
+            Intervalos de hora pico en minutos del dia, ambos extremos incluidos
+        letras_exentas : str
+            Segundas letras de placas exentas
+        exentas_dos_letras : boolean, opcional
+            Si las placas de dos letras estan exentas (el valor predeterminado es Verdadero)
+        """
+        self.vigente_desde = vigente_desde
+        mascaras = []
+        for dia in EvaluadorPicoPlaca.DIAS:
+            mascara = 0
+            for d in restricciones.get(dia, ()):
+                mascara |= 1 << d
+            mascaras.append(mascara)
+        self.mascaras = tuple(mascaras)
+        bits = 0
+        for inicio, fin in horas_pico:
+            bits |= ((1 << (fin - inicio + 1)) - 1) << inicio
+        self.minutos_pico = bits
+        # Se reconstruyen los intervalos desde los bits para unir los que se solapan
+        intervalos = []
+        minuto = 0
+        while minuto < 24 * 60:
+            if (bits >> minuto) & 1:
+                inicio = minuto
+                while minuto + 1 < 24 * 60 and (bits >> (minuto + 1)) & 1:
+                    minuto += 1
+                intervalos.append((inicio, minuto))
+            minuto += 1
+        self.intervalos_pico = tuple(intervalos)
+        self.letras_exentas = frozenset(letras_exentas)
+        self.codigos_exentos = frozenset(ord(c) for c in letras_exentas)
+        self.exentas_dos_letras = exentas_dos_letras
+
+    def es_pico(self, minuto):
+        """Retorna True si el minuto del dia (0 a 1439) es hora pico."""
+        return (self.minutos_pico >> minuto) & 1 == 1
+
+    def es_exenta(self, placa):
+        """Retorna True si la placa ya validada esta excluida de la restriccion."""
+        return placa[1] in self.letras_exentas or (self.exentas_dos_letras and placa[2] == '-')
+
+    def es_exenta_codigo(self, segunda, dos_letras):
+        """Igual que es_exenta() a partir de la salida de analizar_placa()."""
+        return segunda in self.codigos_exentos or (self.exentas_dos_letras and dos_letras)
+
+    def clase_exencion(self, segunda, dos_letras):
+        """
+        Retorna el motivo de la exencion a partir de la salida de analizar_placa():
+        0 si no esta exenta, 1 por la segunda letra y 2 por tener dos letras.
+        """
+        if segunda in self.codigos_exentos:
+            return 1
+        return 2 if self.exentas_dos_letras and dos_letras else 0
+
+
+class ReglasPicoPlaca:
+    """
+    Conjunto inmutable de versiones de las reglas ordenadas por fecha de vigencia.
+
+    Se carga desde un archivo JSON o TOML con esta forma (una sola version puede
+    escribirse sin la lista "versiones"):
+
+        {"versiones": [{
+            "vigente_desde": "2010-05-03",
+            "restricciones": {"Lunes": [1, 2], "Martes": [3, 4], "Miercoles": [5, 6],
+                              "Jueves": [7, 8], "Viernes": [9, 0]},
+            "horas_pico": [["07:00", "09:30"], ["16:00", "19:30"]],
+            "letras_exentas": "AUZEXM",
+            "exentas_dos_letras": true}]}
+
+    Las fechas anteriores a la primera version se juzgan con la primera version.
+    ...
+    Metodos
+    -------
+    predeterminadas():
+        Reglas de la ORDENANZA METROPOLITANA No. 0305 incluidas en el codigo.
+    desde_dict(datos):
+        Compila las reglas a partir de un dict ya leido.
+    cargar(ruta):
+        Lee y compila un archivo .json o .toml.
+    version_para(self, fecha):
+        Retorna la VersionReglas vigente en la fecha.
+    tablas_lote(self):
+        Retorna las tablas de NumPy de componentes_lote(), compiladas una vez.
+    """
+
+    def __init__(self, versiones):
+        if not versiones:
+            raise ValueError('Las reglas deben tener al menos una version')
+        self.versiones = tuple(sorted(versiones, key=lambda v: v.vigente_desde))
+        self._ordinales = [v.vigente_desde.toordinal() for v in self.versiones]
+        self._unica = self.versiones[0] if len(self.versiones) == 1 else None
+        self._huella = None
+        self._tablas_lote = None
+
+    @property
+    def huella(self):
+        """
+        CRC-32 del contenido de las versiones. Dos objetos con las mismas reglas
+        tienen la misma huella; MapaRestricciones la guarda para reconocer con que
+        reglas se compilo.
+        """
+        if self._huella is None:
+            import zlib
+            contenido = [(v.vigente_desde.toordinal(), v.mascaras, v.minutos_pico,
+                          ''.join(sorted(v.letras_exentas)), v.exentas_dos_letras) for v in self.versiones]
+            self._huella = zlib.crc32(repr(contenido).encode('ascii'))
+        return self._huella
+
+    def tablas_lote(self):
+        """
+        Retorna las tablas de busqueda de componentes_lote() como arreglos de NumPy.
+
+        Se construyen la primera vez y quedan guardadas con las reglas, que son
+        inmutables; una recarga de MotorReglas crea otro objeto y con el otras tablas.
+
+        Retorna
+        -------
+        dict con "ordinales" (vigencia de cada version), "pico" (versiones x 1440,
+        minutos de hora pico), "letras" (versiones x 26, segundas letras exentas),
+        "dos_letras" (si las placas de dos letras estan exentas) y "mascaras"
+        (versiones x 7, digitos restringidos por dia de la semana).
+        """
+        tablas = self._tablas_lote
+        if tablas is None:
+            import numpy as np
+            pico = np.stack([np.unpackbits(np.frombuffer(v.minutos_pico.to_bytes(180, 'little'), dtype=np.uint8),
+                                           bitorder='little')[:24 * 60] for v in self.versiones]).astype(bool)
+            tablas = {
+                "ordinales": np.array(self._ordinales, dtype=np.int64),
+                "pico": pico,
+                "letras": np.array([[chr(c) in v.letras_exentas for c in range(ord('A'), ord('Z') + 1)]
+                                    for v in self.versiones]),
+                "dos_letras": np.array([v.exentas_dos_letras for v in self.versiones]),
+                "mascaras": np.array([v.mascaras for v in self.versiones], dtype=np.int64),
+            }
+            self._tablas_lote = tablas
+        return tablas
+
+    @classmethod
+    def predeterminadas(cls):
+        """Retorna las reglas de la ordenanza incluidas en EvaluadorPicoPlaca."""
+        return cls([VersionReglas(datetime.date.min, EvaluadorPicoPlaca.RESTRICCIONES,
+                                  EvaluadorPicoPlaca.HORAS_PICO, EvaluadorPicoPlaca.LETRAS_EXENTAS)])
+
+    @staticmethod
+    def _minuto(valor):
+        if isinstance(valor, str) and len(valor) == 5:
+            try:
+                return analizar_hora(valor)
+            except ValueError:
+                pass
+        raise ValueError('Hora pico invalida: {!r}, se esperaba HH:MM'.format(valor))
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """
+        Compila las reglas a partir de un dict con la forma del archivo de configuracion.
+
+        Plantear
+        ------
+        ValorError
+            Si falta un campo o algun valor no es valido
+        """
+        versiones = []
+        for i, v in enumerate(datos.get("versiones", [datos])):
+            try:
+                desde = datetime.date.fromisoformat(v["vigente_desde"])
+                restricciones = v["restricciones"]
+                desconocidos = set(restricciones) - set(EvaluadorPicoPlaca.DIAS)
+                if desconocidos:
+                    raise ValueError('Dias desconocidos: {}'.format(', '.join(sorted(desconocidos))))
+                for digitos in restricciones.values():
+                    if any(not isinstance(d, int) or not 0 <= d <= 9 for d in digitos):
+                        raise ValueError('Los digitos restringidos deben ser enteros de 0 a 9')
+                horas = []
+                for inicio, fin in v["horas_pico"]:
+                    inicio, fin = cls._minuto(inicio), cls._minuto(fin)
+                    if fin < inicio:
+                        raise ValueError('Intervalo de hora pico invertido')
+                    horas.append((inicio, fin))
+                letras = v.get("letras_exentas", "")
+                if not all('A' <= c <= 'Z' for c in letras):
+                    raise ValueError('Las letras exentas deben ser mayusculas A-Z')
+                versiones.append(VersionReglas(desde, restricciones, horas, letras,
+                                               bool(v.get("exentas_dos_letras", True))))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError('Version {} de las reglas invalida: {}'.format(i, e))
+        return cls(versiones)
+
+    @classmethod
+    def cargar(cls, ruta):
+        """
+        Lee y compila un archivo de reglas .json o .toml.
+
+        Parametros
+        ----------
+        ruta : str
+            Archivo de configuracion; la extension .toml elige TOML, cualquier otra JSON
+        """
+        if ruta.lower().endswith(".toml"):
+            import tomllib
+            with open(ruta, "rb") as archivo:
+                return cls.desde_dict(tomllib.load(archivo))
+        with open(ruta, encoding="utf-8") as archivo:
+            return cls.desde_dict(json.load(archivo))
+
+    def version_para(self, fecha):
+        """
+        Retorna la version vigente en una fecha.
+
+        Parametros
+        ----------
+        fecha : datetime.date o int
+            Fecha o su ordinal proleptico
+        """
+        if self._unica is not None:
+            return self._unica
+        ordinal = fecha if isinstance(fecha, int) else fecha.toordinal()
+        return self.versiones[max(bisect.bisect_right(self._ordinales, ordinal) - 1, 0)]
+
+
+class MotorReglas:
+    """
+    Fuente recargable de las reglas vigentes.
+
+    El atributo reglas apunta siempre a un ReglasPicoPlaca inmutable; recargar()
+    compila el archivo completo y solo entonces reemplaza la referencia, de modo
+    que las consultas en curso terminan con las reglas que leyeron y nunca ven un
+    estado a medio cargar. Si el archivo nuevo es invalido se conservan las reglas
+    anteriores.
+    ...
+    Atributos
+    ----------
+    ruta : str o None
+        Archivo de reglas; None usa las reglas predeterminadas
+    reglas : ReglasPicoPlaca
+        Reglas vigentes
+    ultimo_error : Exception o None
+        Error de la ultima recarga fallida
+    """
+
+    def __init__(self, ruta=None, reglas=None):
+        self.ruta = ruta
+        self.ultimo_error = None
+        self._firma = self._firma_archivo()
+        if reglas is not None:
+            self.reglas = reglas
+        elif ruta:
+            self.reglas = ReglasPicoPlaca.cargar(ruta)
+        else:
+            self.reglas = ReglasPicoPlaca.predeterminadas()
+        self._candado = threading.Lock()
+        self._parar = None
+
+    def _firma_archivo(self):
+        if not self.ruta:
+            return None
+        try:
+            estado = os.stat(self.ruta)
+        except OSError:
+            return None
+        return (estado.st_mtime_ns, estado.st_size)
+
+    def recargar(self, forzar=False):
+        """
+        Vuelve a leer el archivo si cambio desde la ultima carga.
+
+        Parametros
+        ----------
+        forzar : boolean, opcional
+            Recargar aunque el archivo no haya cambiado
+        Retorna
+        -------
+        Verdadero si se reemplazaron las reglas.
+        """
+        if not self.ruta:
+            return False
+        with self._candado:
+            firma = self._firma_archivo()
+            if not forzar and firma == self._firma:
+                return False
+            try:
+                nuevas = ReglasPicoPlaca.cargar(self.ruta)
+            except (OSError, ValueError) as e:
+                self.ultimo_error = e
+                return False
+            self._firma = firma
+            self.ultimo_error = None
+            self.reglas = nuevas
+            return True
+
+    def vigilar(self, intervalo=5.0):
+        """Inicia un hilo que llama a recargar() cada intervalo segundos."""
+        if self._parar is not None or not self.ruta:
+            return
+        self._parar = threading.Event()
+        parar = self._parar
+
+        def ciclo():
+            while not parar.wait(intervalo):
+                self.recargar()
+
+        threading.Thread(target=ciclo, name="MotorReglas", daemon=True).start()
+
+    def detener(self):
+        """Detiene el hilo iniciado por vigilar()."""
+        if self._parar is not None:
+            self._parar.set()
+            self._parar = None
+
+
+# Dias acumulados antes de cada mes en un año no bisiesto (indice 1 = enero)
+_DIAS_ANTES_DEL_MES = (0, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+_DIAS_DEL_MES = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+_MESES = {'{:02d}'.format(m): m for m in range(1, 13)}
+_CERO = ord('0')
+
+
+def _texto(valor):
+    """
+    Acepta str, bytes, bytearray o memoryview y retorna un str: un str se retorna
+    tal cual, los demas se copian y se decodifican como latin-1.
+    """
+    if isinstance(valor, str):
+        return valor
+    return bytes(valor).decode('latin-1')
+
+
+def analizar_placa(valor):
+    """
+    Valida una placa y la descompone sin expresiones regulares.
+
+    Parametros
+    ----------
+    valor : str, bytes o buffer
+        Placa en formato XX-YYYY o XXX-YYYY
+    Retorna
+    -------
+    Tupla (codigo de la segunda letra, True si tiene dos letras, ultimo digito).
+
+    Plantear
+    ------
+    ValorError
+        Con el mismo mensaje que el setter PicoPlaca.placa
+    """
+    v = _texto(valor)
+    n = len(v)
+    if (n == 7 or n == 8) and v[n - 5] == '-':
+        i = 0
+        while i < n - 5 and 'A' <= v[i] <= 'Z':
+            i += 1
+        if i == n - 5:
+            j = n - 4
+            while j < n and '0' <= v[j] <= '9':
+                j += 1
+            if j == n:
+                return ord(v[1]), n == 7, ord(v[n - 1]) - _CERO
+    raise ValueError(EvaluadorPicoPlaca.MENSAJE_PLACA)
+
+
+def analizar_fecha(valor):
+    """
+    Valida una fecha AAAA-MM-DD y la convierte en su ordinal proleptico.
+
+    Acepta exactamente lo que aceptaba la validacion anterior, len(valor) == 10
+    y datetime.strptime(valor, '%Y-%m-%d'): ademas de la forma canonica, el dia
+    puede ir con espacio en lugar de cero ('2021-04- 2') y el año y la segunda
+    cifra de los dias 10 a 29 pueden ser digitos Unicode (por ejemplo de ancho
+    completo), como los acepta el \\d de strptime.
+
+    Parametros
+    ----------
+    valor : str, bytes o buffer
+        Fecha en formato ISO 8601 AAAA-MM-DD
+    Retorna
+    -------
+    int igual a datetime.date(...).toordinal().
+
+    Plantear
+    ------
+    ValorError
+        Con el mismo mensaje que el setter PicoPlaca.fecha
+    """
+    v = _texto(valor)
+    if len(v) == 10 and v[4] == '-' and v[7] == '-':
+        mes = _MESES.get(v[5:7])
+        d0, d1 = v[8], v[9]
+        # Las mismas formas de dia que la expresion %d de strptime
+        if (mes is not None and v[:4].isdecimal()
+                and ((d0 == '0' or d0 == ' ') and '1' <= d1 <= '9'
+                     or (d0 == '1' or d0 == '2') and d1.isdecimal()
+                     or d0 == '3' and (d1 == '0' or d1 == '1'))):
+            año = int(v[:4])
+            dia = int(v[8:])
+            bisiesto = año % 4 == 0 and (año % 100 != 0 or año % 400 == 0)
+            if año >= 1 and dia <= _DIAS_DEL_MES[mes] + (mes == 2 and bisiesto):
+                y = año - 1
+                return (y * 365 + y // 4 - y // 100 + y // 400
+                        + _DIAS_ANTES_DEL_MES[mes] + (mes > 2 and bisiesto) + dia)
+    raise ValueError(EvaluadorPicoPlaca.MENSAJE_FECHA)
+
+
+def analizar_hora(valor):
+    """
+    Valida una hora HH:MM y la convierte en minuto del dia.
+
+    Parametros
+    ----------
+    valor : str, bytes o buffer
+        Hora en formato HH:MM
+    Retorna
+    -------
+    int entre 0 y 1439.
+
+    Plantear
+    ------
+    ValorError
+        Con el mismo mensaje que el setter PicoPlaca.hora; "HH:" sin minutos, que el
+        setter acepta, falla con el mensaje que daba strptime en _Es_Hora_Pico.
+    """
+    v = _texto(valor)
+    n = len(v)
+    if (n == 5 or n == 3) and v[2] == ':':
+        h1, h2 = ord(v[0]) - _CERO, ord(v[1]) - _CERO
+        if 0 <= h1 <= 2 and 0 <= h2 <= 9 and (h1 < 2 or h2 <= 3):
+            if n == 3:
+                raise ValueError("time data {!r} does not match format '%H:%M'".format(v))
+            m1, m2 = ord(v[3]) - _CERO, ord(v[4]) - _CERO
+            if 0 <= m1 <= 5 and 0 <= m2 <= 9:
+                return (h1 * 10 + h2) * 60 + m1 * 10 + m2
+    raise ValueError(EvaluadorPicoPlaca.MENSAJE_HORA)
+
+
+def analizar_columna(buffer, tipo, separador=b'\n'):
+    """
+    Analiza una columna completa de valores en un buffer de bytes.
+
+    Si todos los valores tienen el mismo ancho (fechas y horas) la columna se
+    procesa con NumPy sobre arreglos, sin un objeto de Python por valor (el buffer
+    si se copia una vez para quitar los '\\r'); si no, valor por valor.
+
+    Parametros
+    ----------
+    buffer : bytes, bytearray, memoryview o mmap
+        Valores separados por separador; se ignoran un separador final y los '\\r'
+    tipo : str
+        "placa", "fecha" u "hora"
+    separador : bytes, opcional
+        Separador de un byte entre valores (el valor predeterminado es b'\\n')
+    Retorna
+    -------
+    array.array('q'): ordinales para "fecha", minutos del dia para "hora" y, para
+    "placa", digito | dos_letras << 4 | codigo de la segunda letra << 5.
+
+    Plantear
+    ------
+    ValorError
+        Con el mensaje del parser correspondiente, precedido por la fila invalida.
+    """
+    analizadores = {"placa": analizar_placa, "fecha": analizar_fecha, "hora": analizar_hora}
+    if tipo not in analizadores:
+        raise ValueError('El tipo debe ser placa, fecha u hora')
+    datos = bytes(buffer).replace(b'\r', b'')
+    if datos.endswith(separador):
+        datos = datos[:-1]
+    resultado = array.array('q')
+    if not datos:
+        return resultado
+    ancho = {"fecha": 10, "hora": 5}.get(tipo)
+    if ancho is not None and (len(datos) + 1) % (ancho + 1) == 0:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        if np is not None:
+            filas = np.frombuffer(datos + separador, dtype=np.uint8).reshape(-1, ancho + 1)
+            if (filas[:, ancho] == separador[0]).all():
+                valores = _analizar_columna_np(np, filas[:, :ancho].astype(np.int64) - _CERO, tipo)
+                if valores is not None:
+                    resultado.frombytes(valores.astype(np.int64).tobytes())
+                    return resultado
+    analizar = analizadores[tipo]
+    for i, valor in enumerate(datos.split(separador)):
+        try:
+            if tipo == "placa":
+                segunda, dos_letras, digito = analizar(valor)
+                resultado.append(digito | dos_letras << 4 | segunda << 5)
+            else:
+                resultado.append(analizar(valor))
+        except ValueError as e:
+            raise ValueError('Fila {}: {}'.format(i, e))
+    return resultado
+
+
+def _analizar_columna_np(np, c, tipo):
+    """
+    Convierte una matriz de digitos (valor del caracter - '0') en ordinales o minutos.
+    Retorna None si alguna fila es invalida, para que el llamador reporte cual.
+    """
+    if tipo == "hora":
+        ok = ((c[:, 2] == ord(':') - _CERO) & (c[:, [0, 1, 3, 4]] >= 0).all(axis=1)
+              & (c[:, [0, 1, 3, 4]] <= 9).all(axis=1))
+        hora = c[:, 0] * 10 + c[:, 1]
+        minuto = c[:, 3] * 10 + c[:, 4]
+        if not (ok & (hora <= 23) & (minuto <= 59)).all():
+            return None
+        return hora * 60 + minuto
+    cifras = c[:, [0, 1, 2, 3, 5, 6, 8, 9]]
+    ok = ((c[:, 4] == ord('-') - _CERO) & (c[:, 7] == ord('-') - _CERO)
+          & (cifras >= 0).all(axis=1) & (cifras <= 9).all(axis=1))
+    año = c[:, 0] * 1000 + c[:, 1] * 100 + c[:, 2] * 10 + c[:, 3]
+    mes = c[:, 5] * 10 + c[:, 6]
+    dia = c[:, 8] * 10 + c[:, 9]
+    bisiesto = (año % 4 == 0) & ((año % 100 != 0) | (año % 400 == 0))
+    mes_ok = (mes >= 1) & (mes <= 12)
+    mes_seguro = np.where(mes_ok, mes, 1)
+    limite = np.array(_DIAS_DEL_MES)[mes_seguro] + ((mes_seguro == 2) & bisiesto)
+    if not (ok & (año >= 1) & mes_ok & (dia >= 1) & (dia <= limite)).all():
+        return None
+    y = año - 1
+    return (y * 365 + y // 4 - y // 100 + y // 400
+            + np.array(_DIAS_ANTES_DEL_MES)[mes_seguro] + ((mes_seguro > 2) & bisiesto) + dia)
+
+
+# Reglas compartidas por el proceso, las predeterminadas salvo que se cargue un archivo.
+MOTOR_REGLAS = MotorReglas()
+
+# Evaluador compartido por el proceso; PicoPlaca delega en el.
+EVALUADOR = EvaluadorPicoPlaca()
+
+
+class MemoVeredictos:
+    """
+    Memo opcional de veredictos por clase de equivalencia, delante de predecir().
+
+    Sin conexion el veredicto solo depende de la clave (exenta, ultimo digito,
+    fecha, hora pico). La placa y la hora se reducen a su parte de la clave con
+    los analizadores rapidos; la parte costosa, la fecha, se guarda en un LRU
+    acotado indexado por el ordinal del dia, asi las distintas escrituras que
+    analizar_fecha acepta para un mismo dia comparten entrada y se invalidan
+    juntas. Cada entrada trae la version de las reglas, si el dia es festivo y
+    la mascara de digitos del dia, y resuelve todas las claves de esa fecha, asi
+    una consulta repetida no vuelve a buscar festivos ni reglas.
+
+    Las consultas en linea pasan directo al evaluador (el proveedor tiene su
+    propio cache con tiempo de vida). El memo se vacia cuando el motor cambia de
+    reglas, y las fechas que CalendarioFestivos avisa como cambiadas se invalidan
+    una por una.
+    ...
+    Atributos
+    ----------
+    evaluador : EvaluadorPicoPlaca
+        Evaluador cuyas respuestas se memorizan
+    max_entradas : int
+        Numero maximo de fechas conservadas
+    aciertos : int
+        Consultas cuya fecha estaba en el memo
+    fallos : int
+        Consultas que obligaron a consultar festivos y reglas
+    invalidaciones : int
+        Fechas descartadas por cambios del calendario o de las reglas
+    Metodos
+    -------
+    evaluar(self, placa, fecha, hora, en_linea=False):
+        Igual que EvaluadorPicoPlaca.evaluar().
+    evaluar_validado(self, placa, dia, hora, en_linea=False):
+        Igual que EvaluadorPicoPlaca.evaluar_validado().
+    invalidar(self, fechas=None):
+        Descarta las fechas indicadas, o todas.
+    estadisticas(self):
+        Retorna los contadores y la razon de aciertos.
+    cerrar(self):
+        Deja de recibir los avisos del calendario.
+    """
+
+    def __init__(self, evaluador=None, max_entradas=4096):
+        """
+        Construye un memo vacio.
+
+        Parametros
+        ----------
+        evaluador : EvaluadorPicoPlaca, opcional
+            Evaluador a memorizar (el valor predeterminado es EVALUADOR)
+        max_entradas : int, opcional
+            Numero maximo de fechas conservadas (el valor predeterminado es 4096)
+        """
+        if max_entradas < 1:
+            raise ValueError('max_entradas debe ser mayor o igual a 1')
+        self.evaluador = evaluador if evaluador is not None else EVALUADOR
+        self.max_entradas = max_entradas
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+        self._dias = OrderedDict()
+        self._reglas = self.evaluador.motor.reglas
+        # Cambia con cada invalidacion: una entrada calculada fuera del candado
+        # solo se guarda si no hubo invalidaciones mientras se calculaba
+        self._generacion = 0
+        self._candado = threading.Lock()
+        self.evaluador.calendario.suscribir(self._cambio_calendario)
+
+    def cerrar(self):
+        """Deja de recibir los avisos del calendario."""
+        self.evaluador.calendario.desuscribir(self._cambio_calendario)
+
+    def _cambio_calendario(self, prov, fechas):
+        if prov is None or prov == CalendarioFestivos.NACIONAL or prov == self.evaluador.prov:
+            self.invalidar(fechas)
+
+    def invalidar(self, fechas=None):
+        """
+        Descarta fechas del memo.
+
+        Parametros
+        ----------
+        fechas : iterable de datetime.date, opcional
+            Fechas a descartar; None descarta todas
+        Retorna
+        -------
+        Numero de fechas descartadas.
+        """
+        with self._candado:
+            self._generacion += 1
+            if fechas is None:
+                n = len(self._dias)
+                self._dias.clear()
+            else:
+                n = 0
+                for fecha in fechas:
+                    if self._dias.pop(fecha.toordinal(), None) is not None:
+                        n += 1
+            self.invalidaciones += n
+        return n
+
+    def _dia(self, ordinal):
+        """Retorna (version, festivo, mascara) del dia con ese ordinal, del memo o calculada."""
+        reglas = self.evaluador.motor.reglas
+        with self._candado:
+            if reglas is not self._reglas:
+                # El motor cargo reglas nuevas: ninguna entrada sigue valiendo
+                self.invalidaciones += len(self._dias)
+                self._dias.clear()
+                self._reglas = reglas
+                self._generacion += 1
+            entrada = self._dias.get(ordinal)
+            if entrada is not None:
+                self._dias.move_to_end(ordinal)
+                self.aciertos += 1
+                return entrada
+            self.fallos += 1
+            generacion = self._generacion
+        dia = datetime.date.fromordinal(ordinal)
+        version = reglas.version_para(dia)
+        # Con el mapa la mascara ya es 0 en los festivos, como en _decidir()
+        mapa = self.evaluador._mapa_para(reglas)
+        if mapa is None:
+            entrada = (version, self.evaluador.es_festivo(dia), version.mascaras[dia.weekday()])
+        else:
+            entrada = (version, False, mapa.mascara(dia, reglas, self.evaluador.calendario))
+        with self._candado:
+            if self._generacion == generacion:
+                self._dias[ordinal] = entrada
+                while len(self._dias) > self.max_entradas:
+                    self._dias.popitem(last=False)
+        return entrada
+
+    def evaluar(self, placa, fecha, hora, en_linea=False):
+        """
+        Comprueba si el vehículo puede circular; mismas respuestas y errores que
+        EvaluadorPicoPlaca.evaluar().
+        """
+        if en_linea:
+            return self.evaluador.evaluar(placa, fecha, hora, en_linea)
+        segunda, dos_letras, digito = analizar_placa(placa)
+        version, festivo, mascara = self._dia(analizar_fecha(_texto(fecha)))
+        minuto = analizar_hora(hora)
+        if festivo or version.es_exenta_codigo(segunda, dos_letras) or not version.es_pico(minuto):
+            return True
+        return (mascara >> digito) & 1 == 0
+
+    def evaluar_validado(self, placa, dia, hora, en_linea=False):
+        """
+        Igual que EvaluadorPicoPlaca.evaluar_validado(); dia es un datetime.date.
+        """
+        if en_linea:
+            return self.evaluador.evaluar_validado(placa, dia, hora, en_linea)
+        version, festivo, mascara = self._dia(dia.toordinal())
+        if festivo or version.es_exenta_codigo(ord(placa[1]), placa[2] == '-'):
+            return True
+        if not version.es_pico(analizar_hora(hora)):
+            return True
+        return (mascara >> int(placa[-1])) & 1 == 0
+
+    def estadisticas(self):
+        """
+        Retorna
+        -------
+        dict con los aciertos, fallos, invalidaciones, numero de fechas en el memo
+        y la razon de aciertos.
+        """
+        with self._candado:
+            total = self.aciertos + self.fallos
+            return {"aciertos": self.aciertos,
+                    "fallos": self.fallos,
+                    "invalidaciones": self.invalidaciones,
+                    "entradas": len(self._dias),
+                    "razon_aciertos": self.aciertos / total if total else 0.0}
+
+
+class PlanificadorRestricciones:
+    """
+    Planificador por eventos de las ventanas de restriccion de una flota registrada.
+
+    En lugar de consultar predecir() por cada vehiculo cada minuto, los vehiculos
+    se indexan en cubetas por ultimo digito y por su clave de exencion (segunda
+    letra y si la placa tiene dos letras), y el planificador solo despierta en
+    las transiciones: el inicio y el fin de cada hora pico de los dias cuya
+    mascara (dia de la semana, reglas vigentes y festivos, ver mascara_del_dia)
+    restringe algun digito. En cada transicion solo se recorren las cubetas de
+    los digitos que entran o salen, y la exencion se resuelve una vez por cubeta
+    con la version de las reglas del dia.
+
+    Las transiciones se calculan un dia a la vez y se vuelven a calcular si el
+    calendario de festivos avisa un cambio o el motor carga reglas nuevas; en ese
+    caso los vehiculos afectados reciben en el momento actual los eventos que
+    correspondan. Agregar y quitar vehiculos no recalcula nada.
+
+    Los festivos son siempre los del calendario sin conexion: buscar la proxima
+    transicion puede recorrer hasta horizonte dias con el candado tomado, y con
+    la API en linea serian hasta ese numero de consultas de red. Para planificar
+    con los festivos confirmados por la API se concilia el calendario
+    (ConciliadorFestivos.aplicar); el aviso de cambio recalcula el planificador.
+    ...
+    Atributos
+    ----------
+    evaluador : EvaluadorPicoPlaca
+        Evaluador del que se toman las reglas y los festivos
+    momento : datetime.datetime
+        Instante hasta el que se procesaron las transiciones
+    horizonte : int
+        Dias que se examinan hacia adelante para buscar la proxima transicion
+    Metodos
+    -------
+    agregar(self, placa), quitar(self, placa):
+        Registran o retiran un vehiculo.
+    restringidos(self):
+        Retorna las placas restringidas en el momento actual.
+    proxima_transicion(self):
+        Retorna el instante de la proxima transicion.
+    avanzar(self, hasta):
+        Procesa las transiciones hasta un instante y retorna sus eventos.
+    suscribir(self, funcion), desuscribir(self, funcion):
+        Registran o retiran una funcion(instante, tipo, placas) llamada por cada evento.
+    vigilar(self, reloj=None, espera_maxima=60.0), detener(self):
+        Inician o detienen un hilo que llama a avanzar() en cada transicion.
+    """
+
+    ENTRA = "entra"
+    SALE = "sale"
+
+    def __init__(self, evaluador=None, desde=None, horizonte=366):
+        """
+        Construye un planificador sin vehiculos.
+
+        Parametros
+        ----------
+        evaluador : EvaluadorPicoPlaca, opcional
+            Evaluador a usar (el valor predeterminado es EVALUADOR)
+        desde : datetime.datetime, opcional
+            Momento inicial (por defecto ahora); su zona horaria se usa en las transiciones
+        horizonte : int, opcional
+            Dias examinados para buscar la proxima transicion (el valor predeterminado es 366)
+        """
+        self.evaluador = evaluador if evaluador is not None else EVALUADOR
+        self.horizonte = horizonte
+        self.momento = (desde if desde is not None else datetime.datetime.now()).replace(second=0, microsecond=0)
+        # Una cubeta por (segunda letra, dos letras) dentro de cada ultimo digito
+        self._cubetas = [{} for _ in range(10)]
+        self._flota = {}
+        self._suscriptores = ()
+        self._candado = threading.RLock()
+        self._parar = None
+        self._obsoleto = False
+        self._activos, self._version = self._sincronizar()
+        self.evaluador.calendario.suscribir(self._cambio_calendario)
+
+    def cerrar(self):
+        """Detiene el hilo de vigilar() y deja de recibir los avisos del calendario."""
+        self.detener()
+        self.evaluador.calendario.desuscribir(self._cambio_calendario)
+
+    def _cambio_calendario(self, prov, fechas):
+        if prov is None or prov == CalendarioFestivos.NACIONAL or prov == self.evaluador.prov:
+            self._obsoleto = True
+
+    def _transiciones_del_dia(self, dia):
+        """Retorna las tuplas (instante, tipo, mascara, version) de las horas pico del dia."""
+        version = self._reglas.version_para(dia)
+        mascara = self.evaluador.mascara_del_dia(dia)
+        if not mascara:
+            return ()
+        medianoche = datetime.datetime.combine(dia, datetime.time(), self.momento.tzinfo)
+        transiciones = []
+        for inicio, fin in version.intervalos_pico:
+            transiciones.append((medianoche + datetime.timedelta(minutes=inicio), self.ENTRA, mascara, version))
+            transiciones.append((medianoche + datetime.timedelta(minutes=fin + 1), self.SALE, mascara, version))
+        return transiciones
+
+    def _generar(self, hasta_dia=None):
+        """
+        Agrega a las pendientes las transiciones de los dias siguientes, hasta
+        hasta_dia o hasta encontrar alguna dentro del horizonte.
+        """
+        limite = self.momento.date() + datetime.timedelta(days=self.horizonte)
+        while self._siguiente_dia <= limite and (
+                self._siguiente_dia <= hasta_dia if hasta_dia is not None else not self._pendientes):
+            self._pendientes.extend(self._transiciones_del_dia(self._siguiente_dia))
+            self._siguiente_dia += datetime.timedelta(days=1)
+
+    def _sincronizar(self):
+        """
+        Recalcula las transiciones desde el dia de momento y retorna la mascara
+        de digitos restringidos en momento y la version con que entraron.
+        """
+        self._reglas = self.evaluador.motor.reglas
+        self._obsoleto = False
+        self._pendientes = deque()
+        self._siguiente_dia = self.momento.date()
+        self._generar(self._siguiente_dia)
+        activos, version = 0, None
+        while self._pendientes and self._pendientes[0][0] <= self.momento:
+            _, tipo, mascara, version_transicion = self._pendientes.popleft()
+            if tipo == self.ENTRA:
+                activos, version = activos | mascara, version_transicion
             else:
-                self[datetime.date(año, DEC, 6)] = name
+                activos &= ~mascara
+        return activos, version
+
+    def _placas(self, digito, version):
+        """Retorna las placas no exentas de las cubetas del digito."""
+        placas = []
+        for (segunda, dos_letras), cubeta in self._cubetas[digito].items():
+            if not version.es_exenta_codigo(segunda, dos_letras):
+                placas.extend(cubeta)
+        return placas
+
+    def _eventos(self, instante, antes, version_antes, despues, version_despues, eventos):
+        """Agrega a eventos las salidas y entradas del cambio de mascara antes -> despues."""
+        salen, entran = [], []
+        for digito in range(10):
+            bit = 1 << digito
+            if antes & bit and not despues & bit:
+                salen.extend(self._placas(digito, version_antes))
+            elif despues & bit and not antes & bit:
+                entran.extend(self._placas(digito, version_despues))
+        if salen:
+            eventos.append((instante, self.SALE, salen))
+        if entran:
+            eventos.append((instante, self.ENTRA, entran))
+
+    def agregar(self, placa):
+        """
+        Registra un vehiculo.
+
+        Parametros
+        ----------
+        placa : str
+            Placa en formato XX-YYYY o XXX-YYYY
+        Retorna
+        -------
+        True si el vehiculo esta restringido en el momento actual (no se emite
+        un evento por eso; el siguiente evento del vehiculo sera su salida).
+
+        Plantear
+        ------
+        ValorError
+            Si la placa no tiene el formato esperado o ya esta registrada
+        """
+        segunda, dos_letras, digito = analizar_placa(placa)
+        with self._candado:
+            if placa in self._flota:
+                raise ValueError('La placa {} ya esta registrada'.format(placa))
+            self._flota[placa] = (digito, segunda, dos_letras)
+            self._cubetas[digito].setdefault((segunda, dos_letras), set()).add(placa)
+            return bool((self._activos >> digito) & 1) and not self._version.es_exenta_codigo(segunda, dos_letras)
+
+    def quitar(self, placa):
+        """Retira un vehiculo registrado; retorna False si no estaba registrado."""
+        with self._candado:
+            clave = self._flota.pop(placa, None)
+            if clave is None:
+                return False
+            digito, segunda, dos_letras = clave
+            cubeta = self._cubetas[digito][(segunda, dos_letras)]
+            cubeta.discard(placa)
+            if not cubeta:
+                del self._cubetas[digito][(segunda, dos_letras)]
+            return True
+
+    def __len__(self):
+        return len(self._flota)
+
+    def restringidos(self):
+        """Retorna la lista de placas restringidas en el momento actual."""
+        with self._candado:
+            placas = []
+            for digito in range(10):
+                if (self._activos >> digito) & 1:
+                    placas.extend(self._placas(digito, self._version))
+            return placas
+
+    def proxima_transicion(self):
+        """
+        Retorna
+        -------
+        datetime.datetime de la proxima transicion despues de momento, o None si
+        no hay ninguna dentro del horizonte.
+        """
+        with self._candado:
+            if self._obsoleto or self._reglas is not self.evaluador.motor.reglas:
+                # avanzar() debe recalcular el estado cuanto antes
+                return self.momento
+            self._generar()
+            return self._pendientes[0][0] if self._pendientes else None
+
+    def avanzar(self, hasta):
+        """
+        Procesa las transiciones hasta un instante, incluido.
+
+        Las transiciones de un mismo instante se aplican juntas, asi un digito que
+        sale y vuelve a entrar a la vez (por ejemplo a medianoche) no emite eventos.
+        Si cambiaron los festivos o las reglas, primero se recalcula el estado en
+        momento y se emiten las diferencias.
+
+        Parametros
+        ----------
+        hasta : datetime.datetime
+            Instante hasta el que se avanza; si es anterior a momento no hace nada
+        Retorna
+        -------
+        list de tuplas (instante, tipo, placas) en orden, donde tipo es ENTRA o
+        SALE; tambien se entregan a las funciones suscritas.
+        """
+        eventos = []
+        with self._candado:
+            if self._obsoleto or self._reglas is not self.evaluador.motor.reglas:
+                activos, version = self._sincronizar()
+                self._eventos(self.momento, self._activos, self._version, activos, version, eventos)
+                self._activos, self._version = activos, version
+            while True:
+                self._generar()
+                if not self._pendientes or self._pendientes[0][0] > hasta:
+                    break
+                instante = self._pendientes[0][0]
+                # Las transiciones del instante pueden venir del dia siguiente (medianoche)
+                self._generar(instante.date())
+                activos, version = self._activos, self._version
+                while self._pendientes and self._pendientes[0][0] == instante:
+                    _, tipo, mascara, version_transicion = self._pendientes.popleft()
+                    if tipo == self.ENTRA:
+                        activos, version = activos | mascara, version_transicion
+                    else:
+                        activos &= ~mascara
+                self._eventos(instante, self._activos, self._version, activos, version, eventos)
+                self._activos, self._version = activos, version
+            if hasta > self.momento:
+                self.momento = hasta
+        for instante, tipo, placas in eventos:
+            for funcion in self._suscriptores:
+                funcion(instante, tipo, placas)
+        return eventos
+
+    def suscribir(self, funcion):
+        """Registra una funcion(instante, tipo, placas) que se llama por cada evento."""
+        with self._candado:
+            self._suscriptores = self._suscriptores + (funcion,)
+
+    def desuscribir(self, funcion):
+        """Retira una funcion registrada con suscribir()."""
+        with self._candado:
+            self._suscriptores = tuple(f for f in self._suscriptores if f is not funcion)
+
+    def vigilar(self, reloj=None, espera_maxima=60.0):
+        """
+        Inicia un hilo que duerme hasta la proxima transicion y llama a avanzar().
+
+        Parametros
+        ----------
+        reloj : funcion, opcional
+            Retorna el instante actual (por defecto datetime.datetime.now, con la
+            zona horaria de momento)
+        espera_maxima : float, opcional
+            Segundos maximos entre revisiones, para notar cambios de festivos o
+            reglas (el valor predeterminado es 60)
+        """
+        if self._parar is not None:
+            return
+        if reloj is None:
+            zona = self.momento.tzinfo
+
+            def reloj():
+                return datetime.datetime.now(zona)
+        self._parar = threading.Event()
+        parar = self._parar
+
+        def ciclo():
+            while not parar.is_set():
+                self.avanzar(reloj())
+                siguiente = self.proxima_transicion()
+                espera = espera_maxima
+                if siguiente is not None:
+                    espera = min(max((siguiente - reloj()).total_seconds(), 0.0), espera_maxima)
+                parar.wait(espera)
+
+        threading.Thread(target=ciclo, name="PlanificadorRestricciones", daemon=True).start()
+
+    def detener(self):
+        """Detiene el hilo iniciado por vigilar()."""
+        if self._parar is not None:
+            self._parar.set()
+            self._parar = None
+
 
 class PicoPlaca:
     """
@@ -211,24 +3499,18 @@ class PicoPlaca:
         Devuelve True si el vehículo con la placa especificada puede estar en la carretera en la fecha y hora especificadas, de lo contrario, False
     """ 
     #Dias de la semana
-    __dias = [
-            "Lunes",
-            "Martes",
-            "Miercoles",
-            "Jueves",
-            "Viernes",
-            "Sabado",
-            "Domingo"]
+    __dias = EvaluadorPicoPlaca.DIAS
 
     # Diccionario que contiene la informacion de los dias de restricciones.
-    __restriciones = {
-            "Lunes": [1, 2],
-            "Martes": [3, 4],
-            "Miercoles": [5, 6],
-            "Jueves": [7, 8],
-            "Viernes": [9, 0],
-            "Sabado": [],
-            "Domingo": []}
+    __restriciones = EvaluadorPicoPlaca.RESTRICCIONES
+
+    # Evaluador en el que delegan la validacion y predecir(); se puede reemplazar,
+    # por ejemplo por uno con una tabla precompilada (MapaRestricciones).
+    evaluador = EVALUADOR
+
+    # MemoVeredictos opcional que responde predecir() sin conexion; debe envolver
+    # al mismo evaluador.
+    memo = None
 
     def __init__(self, placa, fecha, hora, En_Linea):
         """
@@ -276,20 +3558,17 @@ class PicoPlaca:
             XX-YYYY o XXX-YYYY, 
             Donde X es una letra mayuscula y Y is un digito.
         """
-        if not re.match('^[A-Z]{2,3}-[0-9]{4}$', valor):
-            raise ValueError(
-                'La placa debe estar en el siguiente formato:XX-YYYY o XXX-YYYY, Donde X es una letra mayuscula y Y es un digito.')
-        self._placa = valor
+        self._placa = self.evaluador.validar_placa(valor)
 
 
     @property
-    def Fecha(self):
+    def fecha(self):
         """Obtiene el valor del atributo fecha."""
         return self._fecha
 
 
-    @Fecha.setter
-    def Fecha(self, Valor):
+    @fecha.setter
+    def fecha(self, Valor):
         """
         Establece el valor del atributo fecha.
         Parametros
@@ -301,14 +3580,8 @@ class PicoPlaca:
         ValorError
             Si la cadena de valor no tiene el formato: YYYY-MM-DD (Ej.: 2021-04-02)
         """
-        try:
-            if len(Valor) != 10:
-                raise ValueError
-            datetime.datetime.strptime(Valor, "%Y-%m-%d")
-        except ValueError:
-            raise ValueError(
-                'La fecha debe tener el siguiente formato: AAAA-MM-DD (por ejemplo: 2021-04-02)')
-        self._date = Valor
+        self._dia = self.evaluador.validar_fecha(Valor)
+        self._fecha = Valor
         
 
     @property
@@ -330,10 +3603,7 @@ class PicoPlaca:
         ValorError
             Si el valor de la cadena no tiene el formato: HH:MM (Ej., 08:31, 14:22, 00:01)
         """
-        if not re.match('^([01][0-9]|2[0-3]):([0-5][0-9]|)$', valor):
-            raise ValueError(
-                'Si el valor de la cadena no tiene el formato: HH:MM (Ej., 08:31, 14:22, 00:01)')
-        self._time = valor
+        self._hora = self.evaluador.validar_hora(valor)
 
 
     def __Buscar_dia(self, fecha):
@@ -347,8 +3617,8 @@ class PicoPlaca:
         -------
         Retrona el dia de la fecha como una cadena
         """        
-        d = datetime.datetime.strptime(fecha, '%Y-%m-%d').weekday()
-        return self.__days[d]
+        # El ordinal 1 (0001-01-01) fue lunes
+        return self.__dias[(analizar_fecha(fecha) - 1) % 7]
 
 
     def _Es_Hora_Pico(self, hora):
@@ -363,9 +3633,8 @@ class PicoPlaca:
         -------
         Devuelve True si el tiempo proporcionado está dentro de las horas pico prohibidas, de lo contrario, False
         """           
-        t = datetime.datetime.strptime(hora, '%H:%M').time()
-        return ((t >= datetime.time(7, 0) and t <= datetime.time(9, 30)) or
-                (t >= datetime.time(16, 0) and t <= datetime.time(19, 30)))
+        # Las horas pico son las de la version vigente en la fecha de la consulta
+        return self.evaluador.es_hora_pico(hora, self.evaluador.version(self._dia))
 
 
     def __Es_Festivo(self, Fecha, En_Linea):
@@ -383,29 +3652,16 @@ class PicoPlaca:
         -------
         Devuelve True si la fecha marcada (en formato ISO 8601 AAAA-MM-DD) es un día festivo en Ecuador, de lo contrario, False
         """            
-        y, m, d = Fecha.split('-')
-
-        if En_Linea:
-            # API de vacaciones abstractapi, versión gratuita: 1000 solicitudes por mes
-            # 1 solicitud por segundo
-            # recuperar la clave API de la variable de entorno
-            key = os.environ.get('HOLIDAYS_API_KEY')
-            response = requests.get(
-                "https://holidays.abstractapi.com/v1/?api_key={}&country=EC&year={}&month={}&day={}".format(key, y, m, d))
-            if (response.status_code == 401):
-                # Esto significa que falta una clave de API.
-                raise requests.HTTPError(
-                    'Falta la clave API. Guarde su clave en la variable de entorno HOLIDAYS_API_KEY')
-            if response.content == b'[]':  # si no hay vacaciones obtenemos una matriz vacía
-                return False
-            # Arreglar el Jueves Santo incorrectamente denotado como feriado
-            if json.loads(response.text[1:-1])['name'] == 'Maundy Thursday':
-                return False
-            return True
-        else:
-            ecu_Festividades = FestividadesEcuador(prov='EC-P')
-            return Fecha in ecu_Festividades
+        return self.evaluador.es_festivo(Fecha, En_Linea)
+
 
+    @classmethod
+    def predecir_lote(cls, placas, fechas, horas, prov="EC-P"):
+        """
+        Evalua columnas completas de placas, fechas y horas en una sola llamada (modo sin conexion).
+        Ver EvaluadorPicoPlaca.evaluar_lote.
+        """
+        return cls.evaluador.evaluar_lote(placas, fechas, horas, prov)
 
     def predecir(self):
         """
@@ -418,61 +3674,1165 @@ class PicoPlaca:
         la placa especificada puede estar en el camino
         en la fecha y hora especificadas, de lo contrario Falso
         """
-        # Comprobar si la fecha es un día festivo
-        if self.__Es_Festivo(self.fecha, self.En_Linea):
-            return True
+        # Los valores ya fueron validados por los setters
+        if self.memo is not None and not self.En_Linea:
+            return self.memo.evaluar_validado(self.placa, self._dia, self.hora)
+        return self.evaluador.evaluar_validado(self.placa, self._dia, self.hora, self.En_Linea)
 
-       # Consultar vehículos excluidos de la restricción según la segunda letra de la placa o si se utilizan sólo dos letras
-        # https://es.wikipedia.org/wiki/Matr%C3%ADculas_automovil%C3%ADsticas_de_Ecuador
-        if self.placa[1] in 'AUZEXM' or len(self.placa.split('-')[0]) == 2:
-            return True
 
-        # Verifique si el tiempo proporcionado no está en las horas pico prohibidas
-        if not self._Es_Hora_Pico(self.hora):
-            return True
+def _leer_registros(entrada, formato, campos=None, primera_linea=1):
+    """
+    Lee los registros de un flujo CSV o JSONL sin cargarlo completo en memoria.
 
-        day = self.__Buscar_dia(self.fecha)  # Encuentra el día de la semana a partir de la fecha
-        # Verifique si el último dígito de la placa no está restringido en este día en particular
-        if int(self.placa[-1]) not in self.__restriciones[day]:
-            return True
+    Parametros
+    ----------
+    entrada : archivo de texto o iterable de lineas
+        Flujo con los registros; el CSV debe tener encabezado placa,fecha,hora
+    formato : str
+        "csv" o "jsonl"
+    campos : list de str, opcional
+        Encabezado CSV ya leido; si se indica la entrada no lo incluye
+    primera_linea : int, opcional
+        Numero de linea del primer elemento de la entrada (el valor predeterminado es 1)
+    Retorna
+    -------
+    Generador de tuplas (numero de linea, registro), donde registro es un dict con
+    placa, fecha y hora, o un str con el error de lectura.
+    """
+    if formato == "csv":
+        lector = csv.DictReader(entrada, fieldnames=campos)
+        for fila in lector:
+            yield primera_linea - 1 + lector.line_num, fila
+        return
+    for numero, linea in enumerate(entrada, primera_linea):
+        if not linea.strip():
+            continue
+        try:
+            registro = json.loads(linea)
+        except ValueError as e:
+            yield numero, 'JSON invalido: {}'.format(e)
+            continue
+        if not isinstance(registro, dict):
+            yield numero, 'Se esperaba un objeto JSON'
+            continue
+        yield numero, registro
+
+
+def _a_fila(numero, registro):
+    """Convierte un registro leido en la tupla (linea, placa, fecha, hora, error)."""
+    if isinstance(registro, str):
+        return (numero, None, None, None, registro)
+    campos = [registro.get(c) for c in ("placa", "fecha", "hora")]
+    if not all(isinstance(c, str) for c in campos):
+        return (numero, *campos, 'Faltan los campos placa, fecha u hora')
+    return (numero, *campos, None)
+
+
+def _escribir_bloque(salida, formato, bloque, veredictos):
+    """Escribe un bloque de veredictos y lo vacia hacia el flujo de salida."""
+    if formato == "csv":
+        escritor = csv.writer(salida, lineterminator="\n")
+        for (numero, placa, fecha, hora, error), veredicto in zip(bloque, veredictos):
+            escritor.writerow([numero, placa, fecha, hora,
+                               "" if error else ("SI" if veredicto else "NO"), error or ""])
+    else:
+        for (numero, placa, fecha, hora, error), veredicto in zip(bloque, veredictos):
+            registro = {"linea": numero, "placa": placa, "fecha": fecha, "hora": hora}
+            if error:
+                registro["error"] = error
+            else:
+                registro["puede_circular"] = bool(veredicto)
+            salida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    salida.flush()
+
+
+def _evaluar_bloque(bloque, en_linea):
+    """
+    Evalua un bloque de registros; las filas invalidas se marcan con su error sin
+    detener el resto del bloque.
+    """
+    validos = [i for i, r in enumerate(bloque) if r[4] is None]
+    veredictos = [None] * len(bloque)
+    if not en_linea and validos:
+        # Las filas invalidas se reportan sin sacar del camino vectorizado al resto
+        c = PicoPlaca.evaluador.componentes_lote([bloque[i][1] for i in validos],
+                                                 [bloque[i][2] for i in validos],
+                                                 [bloque[i][3] for i in validos], tolerante=True)
+        errores = c["errores"]
+        for k, (i, v) in enumerate(zip(validos, c["puede_circular"].tolist())):
+            if k in errores:
+                numero, placa, fecha, hora, _ = bloque[i]
+                bloque[i] = (numero, placa, fecha, hora, errores[k])
+            else:
+                veredictos[i] = v
+        return bloque, veredictos
+    for i in validos:
+        numero, placa, fecha, hora, _ = bloque[i]
+        try:
+            veredictos[i] = PicoPlaca.evaluador.evaluar(placa, fecha, hora, en_linea)
+        except ValueError as e:
+            bloque[i] = (numero, placa, fecha, hora, str(e))
+    return bloque, veredictos
+
+
+def procesar_flujo(entrada, salida, formato="csv", en_linea=False, tamaño_bloque=4096):
+    """
+    Procesa un flujo de registros y escribe un veredicto por registro, por bloques.
+
+    La memoria usada es constante: solo se conserva un bloque a la vez y cada
+    bloque se escribe y vacia apenas se evalua, de modo que la salida se puede
+    encadenar directamente en una tuberia.
+
+    Parametros
+    ----------
+    entrada : archivo de texto
+        Registros CSV (con encabezado placa,fecha,hora) o JSONL
+    salida : archivo de texto
+        Destino de los veredictos, en el mismo formato que la entrada
+    formato : str, opcional
+        "csv" o "jsonl" (el valor predeterminado es "csv")
+    en_linea : boolean, opcional
+        si esta en linea == Verdadero se utilizará la API de días festivos abstractos
+    tamaño_bloque : int, opcional
+        Numero de registros evaluados y escritos juntos (el valor predeterminado es 4096)
+    Retorna
+    -------
+    Tupla (registros procesados, registros con error).
+    """
+    if formato not in ("csv", "jsonl"):
+        raise ValueError('El formato debe ser csv o jsonl')
+    if formato == "csv":
+        csv.writer(salida, lineterminator="\n").writerow(
+            ["linea", "placa", "fecha", "hora", "puede_circular", "error"])
+    procesados = errores = 0
+    bloque = []
+
+    def vaciar():
+        nonlocal errores
+        evaluado, veredictos = _evaluar_bloque(bloque, en_linea)
+        errores += sum(1 for r in evaluado if r[4] is not None)
+        _escribir_bloque(salida, formato, evaluado, veredictos)
+
+    for numero, registro in _leer_registros(entrada, formato):
+        bloque.append(_a_fila(numero, registro))
+        procesados += 1
+        if len(bloque) >= tamaño_bloque:
+            vaciar()
+            bloque = []
+    if bloque:
+        vaciar()
+    return procesados, errores
+
+
+class AgregadoRestricciones:
+    """
+    Conteo de vehiculos y de vehiculos restringidos por grupo, acumulado en una pasada.
+
+    Cada registro suma uno a su grupo (distrito, hora, dia de la semana, ultimo
+    digito, clase de exencion, festivo) y, si no puede circular, tambien a los
+    restringidos del grupo. Cada distrito tiene un arreglo fijo de
+    24 x 7 x 10 x 3 x 2 grupos, asi la memoria no depende del numero de registros.
+    Dos agregados se suman con fusionar(): cada fragmento de una entrada
+    particionada se agrega por separado (en otro proceso o en otra maquina, con
+    a_dict() y desde_dict()) y los parciales se combinan al final.
+    ...
+    Atributos
+    ----------
+    registros : int
+        Registros leidos, incluidos los invalidos
+    errores : int
+        Registros invalidos, que no se cuentan en ningun grupo
+    Metodos
+    -------
+    agregar(self, placa, fecha, hora, distrito="", evaluador=None, en_linea=False):
+        Suma un registro.
+    agregar_bloque(self, placas, fechas, horas, distritos=None, evaluador=None, en_linea=False):
+        Suma columnas completas con evaluador.componentes_lote().
+    fusionar(self, otro):
+        Suma los conteos de otro agregado.
+    filas(self):
+        Retorna los grupos no vacios como dicts.
+    a_dict(self), desde_dict(datos):
+        Convierten el agregado a y desde un dict serializable en JSON.
+    """
+
+    CLASES_EXENCION = ("ninguna", "letra", "dos_letras")
+    GRUPOS = 24 * 7 * 10 * 3 * 2
+    VERSION = 1
+
+    def __init__(self):
+        self.registros = 0
+        self.errores = 0
+        # distrito -> (vehiculos, restringidos), un contador por grupo
+        self._conteos = {}
+
+    def _contadores(self, distrito):
+        contadores = self._conteos.get(distrito)
+        if contadores is None:
+            contadores = self._conteos[distrito] = (array.array('q', bytes(8 * self.GRUPOS)),
+                                                    array.array('q', bytes(8 * self.GRUPOS)))
+        return contadores
+
+    @staticmethod
+    def _grupo(hora, dia_semana, digito, exencion, festivo):
+        return (((hora * 7 + dia_semana) * 10 + digito) * 3 + exencion) * 2 + festivo
+
+    def agregar(self, placa, fecha, hora, distrito="", evaluador=None, en_linea=False):
+        """
+        Suma un registro; si es invalido solo cuenta como error.
+
+        Parametros
+        ----------
+        placa, fecha, hora : str
+            Valores del registro, con los formatos de EvaluadorPicoPlaca.evaluar()
+        distrito : str, opcional
+            Distrito del registro ("" si no se conoce)
+        evaluador : EvaluadorPicoPlaca, opcional
+            Evaluador a usar (por defecto PicoPlaca.evaluador)
+        en_linea : boolean, opcional
+            si esta en linea == Verdadero se utilizará la API de días festivos abstractos
+        Retorna
+        -------
+        True si el registro se conto, False si era invalido.
+        """
+        evaluador = evaluador if evaluador is not None else PicoPlaca.evaluador
+        self.registros += 1
+        try:
+            h, dia, digito, exencion, festivo, puede = evaluador.componentes(placa, fecha, hora, en_linea)
+        except ValueError:
+            self.errores += 1
+            return False
+        vehiculos, restringidos = self._contadores(distrito or "")
+        grupo = self._grupo(h, dia, digito, exencion, int(festivo))
+        vehiculos[grupo] += 1
+        if not puede:
+            restringidos[grupo] += 1
+        return True
+
+    def agregar_bloque(self, placas, fechas, horas, distritos=None, evaluador=None, en_linea=False):
+        """
+        Suma columnas completas de registros.
+
+        Sin conexion el bloque se evalua con componentes_lote() y se cuenta con
+        numpy.bincount; las filas invalidas solo se cuentan como errores, sin
+        sacar al resto del bloque del camino vectorizado. En linea se suma fila
+        por fila.
+
+        Parametros
+        ----------
+        placas, fechas, horas : list de str
+            Columnas del bloque
+        distritos : list de str, opcional
+            Distrito de cada fila (por defecto "" para todas)
+        Retorna
+        -------
+        Numero de filas invalidas del bloque.
+        """
+        evaluador = evaluador if evaluador is not None else PicoPlaca.evaluador
+        distritos = distritos if distritos is not None else [""] * len(placas)
+        if not en_linea and placas:
+            import numpy as np
 
-        return False
-        if __name__ == '__main__':
-
-            parser = argparse.ArgumentParser(
-            description='Pico y Placa Quito Predictor: Consulta si el vehículo con la placa proporcionada puede estar en la vía en la fecha y hora indicada')
-            parser.add_argument(
-                '-o',
-                '--EN_Linea',
-                action='store_true',
-                help='usar la API de días festivos de resumen')
-            parser.add_argument(
-                '-p',
-                '--placa',
-                required=True,
-                help='la placa del vehículo: XXX-YYYY o XX-YYYY, donde X es una letra mayúscula e Y es un dígito')
-            parser.add_argument(
-                '-d',
-                '--fecha',
-                required=True,
-                help='la fecha a comprobar: AAAA-MM-DD')
-            parser.add_argument(
-                '-t',
-                '--hora',
-                required=True,
-                help='la hora a comprobar: HH:MM')
-            args = parser.parse_args()
-        pyp = PicoPlaca(args.placa, args.fecha, args.hora, args.En_Linea)
-
-        if pyp.predecir():
-            print(
-                'El vehículo con placa {} PUEDE estar en la carretera el {} a las {}.'.format(
-                    args.placa,
-                    args.fecha,
-                    args.hora))
+            c = evaluador.componentes_lote(placas, fechas, horas, tolerante=True)
+            validas = np.ones(len(placas), dtype=bool)
+            validas[list(c["errores"])] = False
+            grupo = self._grupo(c["hora"], c["dia_semana"], c["digito"], c["exencion"],
+                                c["festivo"].astype(np.int64))[validas]
+            nombres, cual = np.unique(np.asarray(distritos, dtype=object).astype(str)[validas],
+                                      return_inverse=True)
+            indice = cual.reshape(-1) * self.GRUPOS + grupo
+            total = np.bincount(indice, minlength=len(nombres) * self.GRUPOS)
+            restringidos = np.bincount(indice, weights=~c["puede_circular"][validas],
+                                       minlength=len(nombres) * self.GRUPOS)
+            for i, nombre in enumerate(nombres.tolist()):
+                vehiculos, restringidos_d = self._contadores(nombre)
+                np.frombuffer(vehiculos, dtype=np.int64)[:] += total[i * self.GRUPOS:(i + 1) * self.GRUPOS]
+                np.frombuffer(restringidos_d, dtype=np.int64)[:] += restringidos[
+                    i * self.GRUPOS:(i + 1) * self.GRUPOS].astype(np.int64)
+            self.registros += len(placas)
+            self.errores += len(c["errores"])
+            return len(c["errores"])
+        errores = self.errores
+        for placa, fecha, hora, distrito in zip(placas, fechas, horas, distritos):
+            self.agregar(placa, fecha, hora, distrito, evaluador, en_linea)
+        return self.errores - errores
+
+    def fusionar(self, otro):
+        """
+        Suma los conteos de otro agregado a este.
+
+        Retorna
+        -------
+        Este mismo agregado.
+        """
+        self.registros += otro.registros
+        self.errores += otro.errores
+        for distrito, (vehiculos, restringidos) in otro._conteos.items():
+            propios, propios_r = self._contadores(distrito)
+            for grupo in range(self.GRUPOS):
+                if vehiculos[grupo]:
+                    propios[grupo] += vehiculos[grupo]
+                    propios_r[grupo] += restringidos[grupo]
+        return self
+
+    def filas(self):
+        """
+        Retorna
+        -------
+        Generador de dicts con distrito, hora, dia, digito, exencion, festivo,
+        vehiculos y restringidos, uno por grupo con algun vehiculo.
+        """
+        for distrito in sorted(self._conteos):
+            vehiculos, restringidos = self._conteos[distrito]
+            for grupo in range(self.GRUPOS):
+                if not vehiculos[grupo]:
+                    continue
+                resto, festivo = divmod(grupo, 2)
+                resto, exencion = divmod(resto, 3)
+                resto, digito = divmod(resto, 10)
+                hora, dia = divmod(resto, 7)
+                yield {"distrito": distrito, "hora": hora, "dia": EvaluadorPicoPlaca.DIAS[dia],
+                       "digito": digito, "exencion": self.CLASES_EXENCION[exencion],
+                       "festivo": bool(festivo), "vehiculos": vehiculos[grupo],
+                       "restringidos": restringidos[grupo]}
+
+    def a_dict(self):
+        """Retorna el agregado como un dict serializable en JSON."""
+        return {"version": self.VERSION, "registros": self.registros, "errores": self.errores,
+                "grupos": list(self.filas())}
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """
+        Reconstruye un agregado guardado con a_dict().
+
+        Plantear
+        ------
+        ValorError
+            Si el dict no tiene la forma esperada
+        """
+        if not isinstance(datos, dict) or datos.get("version") != cls.VERSION:
+            raise ValueError('El agregado no es compatible')
+        agregado = cls()
+        try:
+            agregado.registros = int(datos["registros"])
+            agregado.errores = int(datos["errores"])
+            for fila in datos["grupos"]:
+                hora, digito = int(fila["hora"]), int(fila["digito"])
+                if not (0 <= hora <= 23 and 0 <= digito <= 9):
+                    raise ValueError('hora o digito fuera de rango')
+                grupo = cls._grupo(hora, EvaluadorPicoPlaca.DIAS.index(fila["dia"]), digito,
+                                   cls.CLASES_EXENCION.index(fila["exencion"]), int(bool(fila["festivo"])))
+                vehiculos, restringidos = agregado._contadores(str(fila["distrito"]))
+                vehiculos[grupo] += int(fila["vehiculos"])
+                restringidos[grupo] += int(fila["restringidos"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError('Agregado invalido: {}'.format(e))
+        return agregado
+
+
+def agregar_flujo(entrada, formato="csv", en_linea=False, tamaño_bloque=4096, agregado=None):
+    """
+    Agrega un flujo de registros en una sola pasada y con memoria constante.
+
+    Parametros
+    ----------
+    entrada : archivo de texto
+        Registros CSV (con encabezado placa,fecha,hora y opcionalmente distrito) o JSONL
+    formato : str, opcional
+        "csv" o "jsonl" (el valor predeterminado es "csv")
+    en_linea : boolean, opcional
+        si esta en linea == Verdadero se utilizará la API de días festivos abstractos
+    tamaño_bloque : int, opcional
+        Numero de registros evaluados juntos (el valor predeterminado es 4096)
+    agregado : AgregadoRestricciones, opcional
+        Agregado al que se suman los registros (por defecto uno nuevo)
+    Retorna
+    -------
+    AgregadoRestricciones con los conteos del flujo.
+    """
+    if formato not in ("csv", "jsonl"):
+        raise ValueError('El formato debe ser csv o jsonl')
+    agregado = agregado if agregado is not None else AgregadoRestricciones()
+    columnas = ([], [], [], [])
+
+    def vaciar():
+        agregado.agregar_bloque(*columnas, en_linea=en_linea)
+        for columna in columnas:
+            columna.clear()
+
+    for _, registro in _leer_registros(entrada, formato):
+        campos = None if isinstance(registro, str) else [registro.get(c) for c in ("placa", "fecha", "hora")]
+        if campos is None or not all(isinstance(c, str) for c in campos):
+            agregado.registros += 1
+            agregado.errores += 1
+            continue
+        distrito = registro.get("distrito")
+        for columna, valor in zip(columnas, campos + ["" if distrito is None else str(distrito)]):
+            columna.append(valor)
+        if len(columnas[0]) >= tamaño_bloque:
+            vaciar()
+    if columnas[0]:
+        vaciar()
+    return agregado
+
+
+class HistogramaLatencia:
+    """
+    Histograma acumulativo de latencias con cubetas fijas, seguro entre hilos.
+    ...
+    Atributos
+    ----------
+    limites : tuple de float
+        Limite superior de cada cubeta en segundos; la ultima cubeta es +Inf
+    """
+
+    LIMITES = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+               0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+    def __init__(self, limites=LIMITES):
+        self.limites = tuple(limites)
+        self.cubetas = [0] * (len(self.limites) + 1)
+        self.cuenta = 0
+        self.suma = 0.0
+        self._candado = threading.Lock()
+
+    def registrar(self, segundos):
+        """Suma una observacion al histograma."""
+        i = 0
+        while i < len(self.limites) and segundos > self.limites[i]:
+            i += 1
+        with self._candado:
+            self.cubetas[i] += 1
+            self.cuenta += 1
+            self.suma += segundos
+
+    def percentil(self, p):
+        """
+        Estima un percentil como el limite superior de la cubeta que lo contiene.
+
+        Parametros
+        ----------
+        p : float
+            Percentil entre 0 y 100
+        Retorna
+        -------
+        Segundos, o None si no hay observaciones o cae en la cubeta +Inf.
+        """
+        with self._candado:
+            objetivo = self.cuenta * p / 100.0
+            acumulado = 0
+            for i, n in enumerate(self.cubetas):
+                acumulado += n
+                if n and acumulado >= objetivo:
+                    return self.limites[i] if i < len(self.limites) else None
+        return None
+
+    def resumen(self):
+        """Retorna un dict con la cuenta, el promedio, p50, p99 y las cubetas."""
+        with self._candado:
+            cuenta, suma, cubetas = self.cuenta, self.suma, list(self.cubetas)
+        return {"cuenta": cuenta,
+                "promedio": suma / cuenta if cuenta else None,
+                "p50": self.percentil(50),
+                "p99": self.percentil(99),
+                "cubetas": dict(zip([str(l) for l in self.limites] + ["+Inf"], cubetas))}
+
+
+class ServidorPicoPlaca:
+    """
+    Servicio HTTP asyncio de consultas de Pico y Placa.
+
+    Atiende consultas individuales y por lote en JSON sobre conexiones HTTP/1.1
+    persistentes. Las consultas individuales concurrentes se agrupan en lotes
+    pequeños antes de pasar por el evaluador y cada ruta registra su histograma
+    de latencias.
+
+    Rutas:
+    POST /consulta  {"placa": ..., "fecha": ..., "hora": ..., "en_linea": false}
+                    -> {"puede_circular": true}
+    POST /lote      {"consultas": [{...}, ...]} -> {"resultados": [{...}, ...]}
+    GET  /metricas  -> histogramas de latencia por ruta
+    GET  /metricas/prometheus -> INSTRUMENTACION en formato de texto de Prometheus
+    GET  /salud     -> {"estado": "ok"}
+    ...
+    Atributos
+    ----------
+    evaluador : EvaluadorPicoPlaca
+        Evaluador compartido por todas las conexiones
+    host : str
+        Direccion de escucha
+    puerto : int
+        Puerto de escucha; 0 elige uno libre (ver el atributo puerto tras iniciar())
+    tamaño_lote : int
+        Maximo de consultas individuales evaluadas juntas
+    espera_lote : float
+        Segundos que se espera a completar un lote despues de la primera consulta;
+        con 0 solo se agrupan las consultas que llegan en la misma vuelta del bucle
+    memo : MemoVeredictos o None
+        Memo por clase de equivalencia que responde las consultas sin conexion
+    """
+
+    MAX_CUERPO = 16 * 1024 * 1024
+    # Desde este numero de consultas sin conexion un lote se evalua con
+    # componentes_lote(); por debajo el costo fijo de NumPy supera al de evaluar()
+    MIN_VECTORIZADO = 8
+
+    def __init__(self, evaluador=None, host="127.0.0.1", puerto=8080,
+                 tamaño_lote=64, espera_lote=0.0, memo=None):
+        self.evaluador = evaluador if evaluador is not None else EVALUADOR
+        self.memo = memo
+        self.host = host
+        self.puerto = puerto
+        self.tamaño_lote = tamaño_lote
+        self.espera_lote = espera_lote
+        self.latencias = {ruta: HistogramaLatencia() for ruta in
+                          ("/consulta", "/lote", "/metricas", "/salud")}
+        self._servidor = None
+        self._cola = None
+        self._agrupador = None
+        # asyncio se importa aqui y no al importar el modulo: las consultas sin
+        # conexion no deben pagar su carga
+        import asyncio
+        self._asyncio = asyncio
+
+    async def iniciar(self):
+        """Abre el socket de escucha y arranca la tarea que agrupa las consultas."""
+        asyncio = self._asyncio
+        self._cola = asyncio.Queue()
+        self._agrupador = asyncio.ensure_future(self._agrupar())
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.puerto)
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+        return self
+
+    async def detener(self):
+        """Cierra el socket de escucha y la tarea de agrupacion."""
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+        if self._agrupador is not None:
+            self._agrupador.cancel()
+            try:
+                await self._agrupador
+            except self._asyncio.CancelledError:
+                pass
+
+    async def servir_por_siempre(self):
+        """Inicia el servidor y atiende hasta que se cancele."""
+        await self.iniciar()
+        try:
+            await self._servidor.serve_forever()
+        finally:
+            await self.detener()
+
+    @staticmethod
+    def _campos(consulta):
+        """Retorna (placa, fecha, hora, en_linea) de una consulta en dict o lanza ValueError."""
+        if not isinstance(consulta, dict):
+            raise ValueError('Cada consulta debe ser un objeto JSON')
+        campos = [consulta.get(c) for c in ("placa", "fecha", "hora")]
+        if not all(isinstance(c, str) for c in campos):
+            raise ValueError('Faltan los campos placa, fecha u hora')
+        return campos[0], campos[1], campos[2], bool(consulta.get("en_linea"))
+
+    def _evaluar_consultas(self, consultas):
+        """
+        Evalua una lista de consultas en dict y retorna la lista de dicts de respuesta.
+
+        Las consultas sin conexion se evaluan juntas con componentes_lote() (o con
+        el memo, si hay uno); las que piden la API en linea, una por una. Los errores
+        de formato quedan en la respuesta de su consulta; cualquier otra excepcion
+        se propaga.
+        """
+        respuestas = [None] * len(consultas)
+        filas = []
+        for i, consulta in enumerate(consultas):
+            try:
+                placa, fecha, hora, en_linea = self._campos(consulta)
+                if en_linea:
+                    respuestas[i] = {"puede_circular": self.evaluador.evaluar(placa, fecha, hora, True)}
+                else:
+                    filas.append((i, placa, fecha, hora))
+            except ValueError as e:
+                respuestas[i] = {"error": str(e)}
+        if self.memo is not None or len(filas) < self.MIN_VECTORIZADO:
+            evaluar = self.evaluador.evaluar if self.memo is None else self.memo.evaluar
+            for i, placa, fecha, hora in filas:
+                try:
+                    respuestas[i] = {"puede_circular": evaluar(placa, fecha, hora)}
+                except ValueError as e:
+                    respuestas[i] = {"error": str(e)}
+            return respuestas
+        indices, placas, fechas, horas = zip(*filas)
+        c = self.evaluador.componentes_lote(placas, fechas, horas, tolerante=True)
+        errores = c["errores"]
+        for k, (i, puede) in enumerate(zip(indices, c["puede_circular"].tolist())):
+            error = errores.get(k)
+            respuestas[i] = {"error": error} if error is not None else {"puede_circular": puede}
+        return respuestas
+
+    async def _agrupar(self):
+        """
+        Toma consultas individuales de la cola y las evalua en lotes pequeños.
+
+        Si la evaluacion del lote falla con algo distinto de un error de formato,
+        la excepcion se entrega a todas las consultas del lote y el bucle sigue.
+        """
+        asyncio = self._asyncio
+        bucle = asyncio.get_running_loop()
+        while True:
+            lote = [await self._cola.get()]
+            if self.espera_lote <= 0:
+                # Sin espera fija: se cede una vuelta del bucle para que las
+                # conexiones listas encolen sus consultas y se toman todas juntas
+                await asyncio.sleep(0)
+                while len(lote) < self.tamaño_lote and not self._cola.empty():
+                    lote.append(self._cola.get_nowait())
+            limite = bucle.time() + self.espera_lote
+            while len(lote) < self.tamaño_lote and self.espera_lote > 0:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except asyncio.QueueEmpty:
+                    restante = limite - bucle.time()
+                    if restante <= 0:
+                        break
+                    try:
+                        lote.append(await asyncio.wait_for(self._cola.get(), restante))
+                    except asyncio.TimeoutError:
+                        break
+            try:
+                respuestas = self._evaluar_consultas([consulta for consulta, _ in lote])
+            except Exception as e:
+                for _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                continue
+            for (_, futuro), respuesta in zip(lote, respuestas):
+                if not futuro.done():
+                    futuro.set_result(respuesta)
+
+    async def _consulta(self, cuerpo):
+        bucle = self._asyncio.get_running_loop()
+        if isinstance(cuerpo, dict) and cuerpo.get("en_linea"):
+            # La API en linea bloquea, se atiende fuera del bucle de eventos
+            respuesta = (await bucle.run_in_executor(None, self._evaluar_consultas, [cuerpo]))[0]
+        else:
+            futuro = bucle.create_future()
+            self._cola.put_nowait((cuerpo, futuro))
+            respuesta = await futuro
+        return (400 if "error" in respuesta else 200), respuesta
+
+    async def _lote(self, cuerpo):
+        consultas = cuerpo.get("consultas") if isinstance(cuerpo, dict) else cuerpo
+        if not isinstance(consultas, list):
+            return 400, {"error": 'Se esperaba {"consultas": [...]}'}
+        # Un lote puede traer millones de filas o pedir la API en linea: se evalua
+        # en un hilo para no detener las demas conexiones
+        resultados = await self._asyncio.get_running_loop().run_in_executor(
+            None, self._evaluar_consultas, consultas)
+        return 200, {"resultados": resultados}
+
+    @staticmethod
+    def _error_interno(error):
+        """Retorna (estado, respuesta) de una excepcion que no es un error de formato."""
+        requests = sys.modules.get("requests")
+        if requests is not None and isinstance(error, requests.RequestException):
+            return 502, {"error": 'Fallo la API de festivos: {}'.format(error)}
+        return 500, {"error": 'Error interno: {}'.format(type(error).__name__)}
+
+    async def _atender(self, lector, escritor):
+        """Atiende una conexion HTTP/1.1 con keep-alive."""
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea:
+                    break
+                inicio = time.perf_counter()
+                try:
+                    metodo, ruta, version = linea.decode('latin-1').split()
+                except ValueError:
+                    await self._responder(escritor, 400, {"error": "Solicitud invalida"}, False)
+                    break
+                encabezados = {}
+                while True:
+                    linea = await lector.readline()
+                    if linea in (b'\r\n', b'\n', b''):
+                        break
+                    nombre, _, valor = linea.decode('latin-1').partition(':')
+                    encabezados[nombre.strip().lower()] = valor.strip()
+                mantener = (encabezados.get('connection', '').lower() != 'close'
+                            and version == 'HTTP/1.1')
+                largo = encabezados.get('content-length') or '0'
+                if not (largo.isascii() and largo.isdigit()):
+                    # Sin un largo valido no se sabe donde termina el cuerpo: se cierra
+                    await self._responder(escritor, 400, {"error": "Content-Length invalido"}, False)
+                    break
+                largo = int(largo)
+                if largo > self.MAX_CUERPO:
+                    await self._responder(escritor, 413, {"error": "Cuerpo demasiado grande"}, False)
+                    break
+                datos = await lector.readexactly(largo) if largo else b''
+                ruta = ruta.split('?', 1)[0]
+                try:
+                    estado, respuesta = await self._enrutar(metodo, ruta, datos)
+                except Exception as e:
+                    estado, respuesta = self._error_interno(e)
+                await self._responder(escritor, estado, respuesta, mantener)
+                if ruta in self.latencias:
+                    self.latencias[ruta].registrar(time.perf_counter() - inicio)
+                if not mantener:
+                    break
+        except (ConnectionError, self._asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    async def _enrutar(self, metodo, ruta, datos):
+        if ruta == "/salud" and metodo == "GET":
+            return 200, {"estado": "ok"}
+        if ruta == "/metricas" and metodo == "GET":
+            return 200, {r: h.resumen() for r, h in self.latencias.items()}
+        if ruta == "/metricas/prometheus" and metodo == "GET":
+            return 200, INSTRUMENTACION.exportar_prometheus()
+        if ruta in ("/consulta", "/lote"):
+            if metodo != "POST":
+                return 405, {"error": "Metodo no permitido"}
+            try:
+                cuerpo = json.loads(datos or b'null')
+            except ValueError as e:
+                return 400, {"error": 'JSON invalido: {}'.format(e)}
+            if ruta == "/consulta":
+                return await self._consulta(cuerpo)
+            return await self._lote(cuerpo)
+        return 404, {"error": "Ruta no encontrada"}
+
+    _RAZONES = {200: "OK", 400: "Bad Request", 404: "Not Found",
+                405: "Method Not Allowed", 413: "Payload Too Large",
+                500: "Internal Server Error", 502: "Bad Gateway"}
+
+    async def _responder(self, escritor, estado, respuesta, mantener):
+        if isinstance(respuesta, str):
+            tipo = 'text/plain; version=0.0.4'
+            cuerpo = respuesta.encode('utf-8')
+        else:
+            tipo = 'application/json'
+            cuerpo = json.dumps(respuesta, ensure_ascii=False).encode('utf-8')
+        escritor.write(('HTTP/1.1 {} {}\r\nContent-Type: {}; charset=utf-8\r\n'
+                        'Content-Length: {}\r\nConnection: {}\r\n\r\n').format(
+                            estado, self._RAZONES[estado], tipo, len(cuerpo),
+                            'keep-alive' if mantener else 'close').encode('latin-1') + cuerpo)
+        await escritor.drain()
+
+
+def _evaluador_para(ruta_mapa=None, prov="EC-P", ruta_reglas=None):
+    """
+    Retorna el evaluador compartido, o uno nuevo si se indica una tabla, una
+    provincia distinta o un archivo de reglas.
+    """
+    if not ruta_mapa and not ruta_reglas and prov == EVALUADOR.prov:
+        return EVALUADOR
+    mapa = MapaRestricciones.abrir(ruta_mapa, prov) if ruta_mapa else None
+    reglas = MotorReglas(ruta_reglas) if ruta_reglas else None
+    return EvaluadorPicoPlaca(mapa=mapa, prov=prov, reglas=reglas)
+
+
+def _iniciar_trabajador(ruta_mapa, prov="EC-P", ruta_reglas=None):
+    """
+    Inicializa un proceso trabajador: abre la tabla precompilada y compila las
+    reglas una sola vez; el cache de festivos del proceso se llena una vez por año.
+    """
+    PicoPlaca.evaluador = _evaluador_para(ruta_mapa, prov, ruta_reglas)
+
+
+def _procesar_lineas(lineas, primera_linea, formato, campos, en_linea):
+    """
+    Evalua un bloque de lineas crudas en un proceso trabajador.
+
+    Retorna
+    -------
+    Tupla (texto de salida del bloque, registros procesados, registros con error).
+    """
+    bloque = [_a_fila(n, r) for n, r in _leer_registros(lineas, formato, campos, primera_linea)]
+    evaluado, veredictos = _evaluar_bloque(bloque, en_linea)
+    salida = io.StringIO()
+    _escribir_bloque(salida, formato, evaluado, veredictos)
+    return salida.getvalue(), len(bloque), sum(1 for r in evaluado if r[4] is not None)
+
+
+def procesar_flujo_paralelo(entrada, salida, formato="csv", trabajadores=None, en_linea=False,
+                            tamaño_bloque=16384, ruta_mapa=None, prov="EC-P", ruta_reglas=None):
+    """
+    Procesa un flujo de registros repartiendo bloques de lineas entre varios procesos.
+
+    El proceso principal solo corta la entrada en bloques de lineas y escribe los
+    resultados; la lectura, validacion y evaluacion ocurren en los trabajadores.
+    La salida conserva el orden de la entrada y como maximo hay 2 bloques en vuelo
+    por trabajador, asi la memoria queda acotada sin importar el tamaño de la entrada.
+    Los campos CSV con saltos de linea entre comillas no estan soportados en este modo.
+
+    Parametros
+    ----------
+    entrada : archivo de texto
+        Registros CSV (con encabezado placa,fecha,hora) o JSONL
+    salida : archivo de texto
+        Destino de los veredictos, en el mismo formato que la entrada
+    formato : str, opcional
+        "csv" o "jsonl" (el valor predeterminado es "csv")
+    trabajadores : int, opcional
+        Numero de procesos (por defecto os.cpu_count())
+    en_linea : boolean, opcional
+        si esta en linea == Verdadero se utilizará la API de días festivos abstractos;
+        solo con un trabajador, porque cada proceso tendria su propio limitador,
+        su propia cuota mensual y escribiria su propio cache
+    tamaño_bloque : int, opcional
+        Lineas por bloque enviado a un trabajador (el valor predeterminado es 16384)
+    ruta_mapa : str, opcional
+        Tabla precompilada (MapaRestricciones) que cada trabajador abre al iniciar
+    prov : str, opcional
+        Codigo de provincia según ISO3166-2 (el valor predeterminado es "EC-P")
+    ruta_reglas : str, opcional
+        Archivo de reglas (ReglasPicoPlaca) que cada trabajador compila al iniciar
+    Retorna
+    -------
+    Tupla (registros procesados, registros con error).
+
+    Plantear
+    ------
+    ValorError
+        Si el formato no es csv ni jsonl, o si se pide en_linea con mas de un trabajador
+    """
+    import multiprocessing
+
+    if formato not in ("csv", "jsonl"):
+        raise ValueError('El formato debe ser csv o jsonl')
+    trabajadores = trabajadores or os.cpu_count() or 1
+    if en_linea and trabajadores > 1:
+        raise ValueError('La API en linea no admite varios trabajadores: la cuota y el cache son por proceso')
+    campos = None
+    numero = 1
+    if formato == "csv":
+        csv.writer(salida, lineterminator="\n").writerow(
+            ["linea", "placa", "fecha", "hora", "puede_circular", "error"])
+        encabezado = entrada.readline()
+        if not encabezado:
+            return 0, 0
+        campos = next(csv.reader([encabezado]))
+        numero = 2
+    procesados = errores = 0
+    pendientes = deque()
+
+    def recoger():
+        nonlocal procesados, errores
+        texto, n, e = pendientes.popleft().get()
+        salida.write(texto)
+        salida.flush()
+        procesados += n
+        errores += e
+
+    with multiprocessing.Pool(trabajadores, _iniciar_trabajador, (ruta_mapa, prov, ruta_reglas)) as pool:
+        while True:
+            lineas = list(itertools.islice(entrada, tamaño_bloque))
+            if not lineas:
+                break
+            pendientes.append(pool.apply_async(
+                _procesar_lineas, (lineas, numero, formato, campos, en_linea)))
+            numero += len(lineas)
+            if len(pendientes) >= 2 * trabajadores:
+                recoger()
+        while pendientes:
+            recoger()
+    return procesados, errores
+
+
+def _formato_de(ruta, formato):
+    """Deduce el formato del flujo a partir de la opcion --formato o la extension."""
+    if formato:
+        return formato
+    if ruta and ruta != "-" and ruta.lower().endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    return "csv"
+
+
+if __name__ == '__main__':
+    import argparse
+
+    if sys.argv[1:2] == ['serve']:
+        import asyncio
+
+        parser = argparse.ArgumentParser(
+            prog='PicoPlaca.py serve',
+            description='Servicio HTTP de consultas de Pico y Placa')
+        parser.add_argument('--host', default='127.0.0.1', help='direccion de escucha')
+        parser.add_argument('--puerto', type=int, default=8080, help='puerto de escucha')
+        parser.add_argument(
+            '-m',
+            '--mapa',
+            help='archivo de la tabla precompilada de restricciones (MapaRestricciones)')
+        parser.add_argument(
+            '--instrumentar',
+            action='store_true',
+            help='registrar tiempos por etapa en /metricas/prometheus')
+        parser.add_argument(
+            '--provincia',
+            default='EC-P',
+            choices=PROVINCIAS,
+            help='provincia cuyos festivos se aplican (ISO 3166-2:EC, por defecto EC-P)')
+        parser.add_argument(
+            '--reglas',
+            help='archivo JSON o TOML de reglas; se recarga automaticamente al cambiar')
+        parser.add_argument(
+            '--festivos',
+            help='instantanea de festivos (InstantaneaFestivos, por defecto {})'.format(RUTA_FESTIVOS))
+        parser.add_argument(
+            '--memo',
+            type=int,
+            default=0,
+            metavar='N',
+            help='memorizar los veredictos de hasta N fechas (MemoVeredictos, por defecto desactivado)')
+        args = parser.parse_args(sys.argv[2:])
+        if args.festivos:
+            CALENDARIO_FESTIVOS.usar_instantanea(args.festivos)
+        if args.instrumentar:
+            INSTRUMENTACION.activar()
+        try:
+            evaluador = _evaluador_para(args.mapa, args.provincia, args.reglas)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        evaluador.motor.vigilar()
+        memo = None
+        if args.memo > 0:
+            memo = MemoVeredictos(evaluador, args.memo)
+            INSTRUMENTACION.registrar_fuente("memo", memo.estadisticas)
+        servidor = ServidorPicoPlaca(evaluador, args.host, args.puerto, memo=memo)
+        print('Atendiendo en http://{}:{}'.format(args.host, args.puerto), file=sys.stderr)
+        try:
+            asyncio.run(servidor.servir_por_siempre())
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(
+        description='Pico y Placa Quito Predictor: Consulta si el vehículo con la placa proporcionada puede estar en la vía en la fecha y hora indicada')
+    parser.add_argument(
+        '-o',
+        '--EN_Linea',
+        action='store_true',
+        help='usar la API de días festivos de resumen')
+    parser.add_argument(
+        '-p',
+        '--placa',
+        help='la placa del vehículo: XXX-YYYY o XX-YYYY, donde X es una letra mayúscula e Y es un dígito')
+    parser.add_argument(
+        '-d',
+        '--fecha',
+        help='la fecha a comprobar: AAAA-MM-DD')
+    parser.add_argument(
+        '-t',
+        '--hora',
+        help='la hora a comprobar: HH:MM')
+    parser.add_argument(
+        '-i',
+        '--input',
+        help='archivo CSV o JSONL con registros placa, fecha, hora ("-" para la entrada estandar)')
+    parser.add_argument(
+        '-w',
+        '--output',
+        default='-',
+        help='archivo donde escribir los veredictos ("-" para la salida estandar)')
+    parser.add_argument(
+        '-f',
+        '--formato',
+        choices=['csv', 'jsonl'],
+        help='formato de los registros (por defecto se deduce de la extension de --input)')
+    parser.add_argument(
+        '-m',
+        '--mapa',
+        help='archivo de la tabla precompilada de restricciones (MapaRestricciones)')
+    parser.add_argument(
+        '--compilar-mapa',
+        nargs=2,
+        metavar=('INICIO', 'FIN'),
+        help='compila la tabla de restricciones del rango AAAA-MM-DD AAAA-MM-DD en el archivo de --mapa')
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='numero de procesos para --input, o de hilos para --conciliar (por defecto 1)')
+    parser.add_argument(
+        '--provincia',
+        default='EC-P',
+        choices=PROVINCIAS,
+        help='provincia cuyos festivos se aplican (ISO 3166-2:EC, por defecto EC-P)')
+    parser.add_argument(
+        '--reglas',
+        help='archivo JSON o TOML con las reglas de la ordenanza (ReglasPicoPlaca)')
+    parser.add_argument(
+        '--festivos',
+        help='instantanea de festivos (InstantaneaFestivos, por defecto {})'.format(RUTA_FESTIVOS))
+    parser.add_argument(
+        '--compilar-festivos',
+        nargs=2,
+        type=int,
+        metavar=('DESDE', 'HASTA'),
+        help='calcula los festivos de los años DESDE a HASTA en el archivo de --festivos')
+    parser.add_argument(
+        '--agregar',
+        action='store_true',
+        help='cuenta los vehiculos restringidos de --input por hora, dia, digito, exencion, festivo y '
+             'distrito; escribe un parcial JSON en --output (o un reporte CSV si termina en .csv)')
+    parser.add_argument(
+        '--fusionar',
+        nargs='+',
+        metavar='PARCIAL',
+        help='suma los parciales JSON de --agregar y escribe el total en --output')
+    parser.add_argument(
+        '--conciliar',
+        nargs=2,
+        type=int,
+        metavar=('DESDE', 'HASTA'),
+        help='compara los festivos sin conexion de los años DESDE a HASTA con la API y escribe '
+             'el informe JSON en --output (la clave se lee de HOLIDAYS_API_KEY)')
+    parser.add_argument(
+        '--progreso',
+        default=os.path.join(os.path.expanduser('~'), '.cache', 'picoplaca', 'conciliacion.json'),
+        help='archivo con los meses ya descargados por --conciliar, para continuar una conciliacion')
+    parser.add_argument(
+        '--refrescar',
+        action='store_true',
+        help='con --conciliar, descarta el archivo de --progreso y descarga todos los meses de nuevo')
+    parser.add_argument(
+        '--url-api',
+        default=ProveedorFestivosEnLinea.URL_ABSTRACTAPI,
+        help='URL de la API de festivos para --conciliar')
+    parser.add_argument(
+        '--tasa',
+        type=float,
+        default=1.0,
+        help='solicitudes por segundo a la API en --conciliar (por defecto 1)')
+    parser.add_argument(
+        '--congelar',
+        metavar='RUTA',
+        help='con --conciliar, guarda los festivos conciliados como instantanea (InstantaneaFestivos) en RUTA')
+    args = parser.parse_args()
+
+    if args.compilar_festivos:
+        ruta = args.festivos or RUTA_FESTIVOS
+        desde, hasta = args.compilar_festivos
+        if hasta < desde:
+            parser.error('--compilar-festivos requiere DESDE <= HASTA')
+        InstantaneaFestivos.compilar(range(desde, hasta + 1)).guardar(ruta)
+        print('Festivos de {} a {} guardados en {}.'.format(desde, hasta, ruta))
+        sys.exit(0)
+    if args.festivos:
+        CALENDARIO_FESTIVOS.usar_instantanea(args.festivos)
+
+    if args.compilar_mapa:
+        if not args.mapa:
+            parser.error('--compilar-mapa requiere --mapa')
+        reglas = ReglasPicoPlaca.cargar(args.reglas) if args.reglas else None
+        dias = MapaRestricciones.compilar(args.compilar_mapa[0], args.compilar_mapa[1], args.mapa,
+                                          args.provincia, reglas)
+        print('{} dias compilados en {}.'.format(dias, args.mapa))
+        sys.exit(0)
+    try:
+        PicoPlaca.evaluador = _evaluador_para(args.mapa, args.provincia, args.reglas)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    if args.conciliar:
+        desde, hasta = args.conciliar
+        if hasta < desde:
+            parser.error('--conciliar requiere DESDE <= HASTA')
+        import requests
+        conciliador = ConciliadorFestivos(os.environ.get('HOLIDAYS_API_KEY'), args.url_api, args.progreso,
+                                          tasa=args.tasa, trabajadores=max(args.workers, 1),
+                                          refrescar=args.refrescar)
+        años = range(desde, hasta + 1)
+        try:
+            informe = conciliador.conciliar(años)
+        except requests.HTTPError as e:
+            sys.exit(str(e))
+        salida = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+        try:
+            json.dump(informe, salida, ensure_ascii=False, indent=2)
+            salida.write('\n')
+        finally:
+            if salida is not sys.stdout:
+                salida.close()
+        if args.congelar:
+            conciliador.instantanea(años).guardar(args.congelar)
+        print('{} diferencias, {} años incompletos, {} solicitudes.'.format(
+            len(informe["diferencias"]), len(informe["incompletos"]), conciliador.solicitudes), file=sys.stderr)
+        sys.exit(1 if informe["incompletos"] else 0)
+
+    if args.agregar or args.fusionar:
+        if args.fusionar:
+            agregado = AgregadoRestricciones()
+            for ruta in args.fusionar:
+                with open(ruta, encoding='utf-8') as parcial:
+                    agregado.fusionar(AgregadoRestricciones.desde_dict(json.load(parcial)))
+        elif args.input:
+            formato = _formato_de(args.input, args.formato)
+            entrada = sys.stdin if args.input == '-' else open(args.input, newline='', encoding='utf-8')
+            try:
+                agregado = agregar_flujo(entrada, formato, args.EN_Linea)
+            finally:
+                if entrada is not sys.stdin:
+                    entrada.close()
         else:
-            print(
-                'El vehículo con placa {} NO PUEDE estar en la carretera en {} a las {}.'.format(
-                    args.placa,
-                    args.fecha,
-                    args.hora))
\ No newline at end of file
+            parser.error('--agregar requiere --input')
+        salida = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+        try:
+            if args.output.endswith('.csv'):
+                escritor = csv.DictWriter(salida, fieldnames=["distrito", "hora", "dia", "digito", "exencion",
+                                                              "festivo", "vehiculos", "restringidos"])
+                escritor.writeheader()
+                escritor.writerows(agregado.filas())
+            else:
+                json.dump(agregado.a_dict(), salida, ensure_ascii=False)
+                salida.write('\n')
+        finally:
+            if salida is not sys.stdout:
+                salida.close()
+        print('{} registros agregados, {} con errores.'.format(agregado.registros, agregado.errores),
+              file=sys.stderr)
+        sys.exit(0)
+
+    if args.input:
+        if args.workers > 1 and args.EN_Linea:
+            parser.error('--workers mayor que 1 no se puede combinar con --EN_Linea '
+                         '(la cuota y el cache de la API son por proceso)')
+        formato = _formato_de(args.input, args.formato)
+        entrada = sys.stdin if args.input == '-' else open(args.input, newline='', encoding='utf-8')
+        salida = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+        try:
+            if args.workers > 1:
+                procesados, errores = procesar_flujo_paralelo(
+                    entrada, salida, formato, args.workers, args.EN_Linea,
+                    ruta_mapa=args.mapa, prov=args.provincia, ruta_reglas=args.reglas)
+            else:
+                procesados, errores = procesar_flujo(entrada, salida, formato, args.EN_Linea)
+        finally:
+            if entrada is not sys.stdin:
+                entrada.close()
+            if salida is not sys.stdout:
+                salida.close()
+        print('{} registros procesados, {} con errores.'.format(procesados, errores), file=sys.stderr)
+        sys.exit(1 if errores else 0)
+
+    if not (args.placa and args.fecha and args.hora):
+        parser.error('se requieren --placa, --fecha y --hora, o bien --input')
+    pyp = PicoPlaca(args.placa, args.fecha, args.hora, args.EN_Linea)
+
+    if pyp.predecir():
+        print(
+            'El vehículo con placa {} PUEDE estar en la carretera el {} a las {}.'.format(
+                args.placa,
+                args.fecha,
+                args.hora))
+    else:
+        print(
+            'El vehículo con placa {} NO PUEDE estar en la carretera en {} a las {}.'.format(
+                args.placa,
+                args.fecha,
+                args.hora))
@@ -0,0 +1,318 @@
+"""
+Suite de benchmarks de PicoPlaca.
+
+Mide las rutas criticas (generacion de festivos, validacion de los setters,
+hora pico, dia de la semana y predecir), el rendimiento de extremo a extremo con
+lotes de 1k, 1M y 10M registros, el arranque en frio de la linea de comandos y
+el tiempo de importacion del modulo. Los resultados se guardan en JSON para
+comparar versiones:
+
+    python benchmarks.py --salida actual.json
+    python benchmarks.py --salida nueva.json --comparar actual.json
+
+El tiempo de "import PicoPlaca" medido con python -X importtime debe quedar bajo
+--presupuesto-importacion, y una consulta sin conexion no debe cargar ninguno de
+los modulos de MODULOS_EN_LINEA; si no, el programa termina con codigo 1.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+import PicoPlaca as pp
+
+# Primeras letras de provincia con su peso aproximado en el parque automotor de Quito
+_PROVINCIAS = "PPPPPPPPGGAIHTLCOXUN"
+_LETRAS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_RUTA_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "PicoPlaca.py")
+
+# Milisegundos que puede tardar "import PicoPlaca" con el bytecode ya compilado
+PRESUPUESTO_IMPORTACION_MS = 15.0
+# Dependencias que solo deben cargarse en linea, en el servidor o por lotes
+MODULOS_EN_LINEA = ("requests", "holidays", "dateutil", "asyncio", "numpy")
+
+
+def generar_registros(n, semilla=0, inicio=datetime.date(2024, 1, 1), dias=366):
+    """
+    Genera registros (placa, fecha, hora) con distribuciones realistas.
+
+    Las placas son mayormente de tres letras y de Pichincha, las fechas se reparten
+    en un año y las horas se concentran en las horas pico.
+
+    Parametros
+    ----------
+    n : int
+        Numero de registros
+    semilla : int, opcional
+        Semilla del generador aleatorio
+    Retorna
+    -------
+    Tupla de tres listas: placas, fechas y horas.
+    """
+    azar = random.Random(semilla)
+    fechas_posibles = [(inicio + datetime.timedelta(days=i)).isoformat() for i in range(dias)]
+    placas, fechas, horas = [], [], []
+    for _ in range(n):
+        letras = azar.choice(_PROVINCIAS) + azar.choice(_LETRAS)
+        if azar.random() < 0.95:
+            letras += azar.choice(_LETRAS)
+        placas.append("{}-{:04d}".format(letras, azar.randrange(10000)))
+        fechas.append(azar.choice(fechas_posibles))
+        if azar.random() < 0.6:
+            minuto = int(azar.gauss(8 * 60 + 15 if azar.random() < 0.5 else 17 * 60 + 45, 60))
+        else:
+            minuto = azar.randrange(24 * 60)
+        minuto = min(max(minuto, 0), 24 * 60 - 1)
+        horas.append("{:02d}:{:02d}".format(minuto // 60, minuto % 60))
+    return placas, fechas, horas
+
+
+def _micro(nombre, funcion, repeticiones=5, numero=None):
+    """Ejecuta un microbenchmark con timeit y retorna su resultado en dict."""
+    temporizador = timeit.Timer(funcion)
+    if numero is None:
+        numero, _ = temporizador.autorange()
+    tiempos = [t / numero for t in temporizador.repeat(repeticiones, numero)]
+    return {"nombre": nombre, "tipo": "micro", "iteraciones": numero,
+            "segundos_por_llamada": min(tiempos),
+            "mediana": statistics.median(tiempos)}
+
+
+def microbenchmarks():
+    """Mide cada funcion de la ruta critica por separado."""
+    base = pp.PicoPlaca("PBC-1231", "2024-05-20", "08:00", False)
+    buscar_dia = base._PicoPlaca__Buscar_dia
+    memo = pp.MemoVeredictos()
+    años = iter(range(1, 10 ** 9))
+
+    def generar_festivos():
+        # Cada llamada construye un objeto nuevo, como hacia la ruta sin conexion original
+        festivos = pp.FestividadesEcuador(prov="EC-P")
+        festivos._Es_Festivo(2000 + next(años) % 100)
+
+    def setter_placa():
+        base.placa = "PBC-1231"
+
+    def setter_hora():
+        base.hora = "08:00"
+
+    try:
+        return [
+            _micro("FestividadesEcuador._Es_Festivo", generar_festivos),
+            _micro("CalendarioFestivos.es_festivo (cache)",
+                   lambda: pp.CALENDARIO_FESTIVOS.es_festivo(datetime.date(2024, 5, 20))),
+            _micro("PicoPlaca.placa (setter)", setter_placa),
+            _micro("PicoPlaca.hora (setter)", setter_hora),
+            _micro("PicoPlaca._Es_Hora_Pico", lambda: base._Es_Hora_Pico("08:00")),
+            _micro("PicoPlaca.__Buscar_dia", lambda: buscar_dia("2024-05-20")),
+            _micro("PicoPlaca.predecir", base.predecir),
+            _micro("PicoPlaca(...).predecir",
+                   lambda: pp.PicoPlaca("PBC-1231", "2024-05-20", "08:00", False).predecir()),
+            _micro("EvaluadorPicoPlaca.evaluar",
+                   lambda: pp.EVALUADOR.evaluar("PBC-1231", "2024-05-20", "08:00")),
+            _micro("MemoVeredictos.evaluar (acierto)",
+                   lambda: memo.evaluar("PBC-1231", "2024-05-20", "08:00")),
+        ]
+    finally:
+        memo.cerrar()
+
+
+def rendimiento(n, bloque=100000, semilla=0):
+    """
+    Mide el rendimiento de extremo a extremo sobre n registros.
+
+    Los registros se generan y evaluan por bloques para acotar la memoria; solo se
+    cronometra la evaluacion. Con menos de un bloque tambien se mide el camino de
+    un objeto PicoPlaca por registro.
+    """
+    resultados = []
+    total = 0.0
+    total_agregado = 0.0
+    agregado = pp.AgregadoRestricciones()
+    permitidos = 0
+    hechos = 0
+    while hechos < n:
+        m = min(bloque, n - hechos)
+        placas, fechas, horas = generar_registros(m, semilla + hechos)
+        inicio = time.perf_counter()
+        permitidos += int(pp.EVALUADOR.evaluar_lote(placas, fechas, horas).sum())
+        total += time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        agregado.agregar_bloque(placas, fechas, horas, evaluador=pp.EVALUADOR)
+        total_agregado += time.perf_counter() - inicio
+        hechos += m
+    resultados.append({"nombre": "evaluar_lote", "tipo": "rendimiento", "registros": n,
+                       "segundos": total, "registros_por_segundo": n / total,
+                       "permitidos": permitidos})
+    resultados.append({"nombre": "AgregadoRestricciones.agregar_bloque", "tipo": "rendimiento",
+                       "registros": n, "segundos": total_agregado,
+                       "registros_por_segundo": n / total_agregado})
+    if n <= bloque:
+        placas, fechas, horas = generar_registros(n, semilla)
+        inicio = time.perf_counter()
+        for placa, fecha, hora in zip(placas, fechas, horas):
+            pp.PicoPlaca(placa, fecha, hora, False).predecir()
+        total = time.perf_counter() - inicio
+        resultados.append({"nombre": "PicoPlaca.predecir por registro", "tipo": "rendimiento",
+                           "registros": n, "segundos": total, "registros_por_segundo": n / total})
+    return resultados
+
+
+def arranque_en_frio(repeticiones=10):
+    """Mide el tiempo de una consulta por la linea de comandos en un proceso nuevo."""
+    comando = [sys.executable, _RUTA_SCRIPT, "-p", "PBC-1231", "-d", "2024-05-20", "-t", "08:00"]
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        subprocess.run(comando, check=True, stdout=subprocess.DEVNULL)
+        tiempos.append(time.perf_counter() - inicio)
+    return {"nombre": "CLI arranque en frio", "tipo": "arranque", "repeticiones": repeticiones,
+            "segundos": min(tiempos), "mediana": statistics.median(tiempos)}
+
+
+def _importtime(argumentos):
+    """
+    Ejecuta python -X importtime en un proceso nuevo.
+
+    Retorna
+    -------
+    dict modulo -> microsegundos acumulados de su importacion.
+    """
+    entorno = dict(os.environ)
+    # El presupuesto supone el bytecode en __pycache__, como en una instalacion
+    entorno.pop("PYTHONDONTWRITEBYTECODE", None)
+    proceso = subprocess.run([sys.executable, "-X", "importtime"] + argumentos, env=entorno,
+                             cwd=os.path.dirname(_RUTA_SCRIPT), check=True,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modulos = {}
+    for linea in proceso.stderr.splitlines():
+        if linea.startswith("import time:") and "|" in linea:
+            _, acumulado, nombre = linea[len("import time:"):].split("|")
+            if acumulado.strip().isdigit():
+                modulos[nombre.strip()] = int(acumulado)
+    return modulos
+
+
+def importacion(repeticiones=10):
+    """
+    Mide el tiempo de "import PicoPlaca" y los modulos que carga una consulta sin conexion.
+
+    Retorna
+    -------
+    dict con el resultado; "en_linea" lista los modulos de MODULOS_EN_LINEA que
+    cargo la consulta por la linea de comandos.
+    """
+    _importtime(["-c", "import PicoPlaca"])  # compila el bytecode si hace falta
+    tiempos = [_importtime(["-c", "import PicoPlaca"])["PicoPlaca"] / 1e6
+               for _ in range(repeticiones)]
+    consulta = _importtime([_RUTA_SCRIPT, "-p", "PBC-1231", "-d", "2024-05-20", "-t", "08:00"])
+    cargados = sorted({m.split(".")[0] for m in consulta} & set(MODULOS_EN_LINEA))
+    return {"nombre": "import PicoPlaca", "tipo": "importacion", "repeticiones": repeticiones,
+            "segundos": min(tiempos), "mediana": statistics.median(tiempos),
+            "en_linea": cargados}
+
+
+def _metrica(resultado):
+    """Retorna la metrica principal de un resultado, donde menor es mejor."""
+    if "segundos_por_llamada" in resultado:
+        return resultado["segundos_por_llamada"]
+    if "registros_por_segundo" in resultado:
+        return 1.0 / resultado["registros_por_segundo"]
+    return resultado["segundos"]
+
+
+def comparar(actual, base):
+    """
+    Imprime la razon entre los resultados actuales y los de una version anterior.
+
+    Retorna
+    -------
+    list de tuplas (clave, razon); una razon mayor que 1 es una regresion.
+    """
+    def clave(r):
+        return (r["tipo"], r["nombre"], r.get("registros"))
+
+    anteriores = {clave(r): r for r in base["resultados"]}
+    razones = []
+    for r in actual["resultados"]:
+        anterior = anteriores.get(clave(r))
+        if anterior is None:
+            continue
+        razon = _metrica(r) / _metrica(anterior)
+        razones.append((clave(r), razon))
+        print("{:>8.2f}x  {} {}".format(razon, r["nombre"], r.get("registros") or ""))
+    return razones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de PicoPlaca")
+    parser.add_argument("--salida", help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", help="JSON de una version anterior para comparar")
+    parser.add_argument("--tamaños", default="1000,1000000",
+                        help="tamaños de lote separados por coma (por ejemplo 1000,1000000,10000000)")
+    parser.add_argument("--sin-micro", action="store_true", help="omitir los microbenchmarks")
+    parser.add_argument("--sin-arranque", action="store_true", help="omitir el arranque en frio")
+    parser.add_argument("--sin-importacion", action="store_true",
+                        help="omitir la medicion y el presupuesto de importacion")
+    parser.add_argument("--presupuesto-importacion", type=float, default=PRESUPUESTO_IMPORTACION_MS,
+                        help="milisegundos maximos de import PicoPlaca ({})".format(PRESUPUESTO_IMPORTACION_MS))
+    parser.add_argument("--umbral", type=float, default=1.25,
+                        help="razon a partir de la cual --comparar reporta una regresion (1.25)")
+    args = parser.parse_args(argv)
+
+    resultados = []
+    if not args.sin_micro:
+        resultados.extend(microbenchmarks())
+    for n in [int(t) for t in args.tamaños.split(",") if t]:
+        resultados.extend(rendimiento(n))
+    if not args.sin_arranque:
+        resultados.append(arranque_en_frio())
+    importado = None if args.sin_importacion else importacion()
+    if importado:
+        resultados.append(importado)
+
+    informe = {
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "entorno": {"python": platform.python_version(),
+                    "implementacion": platform.python_implementation(),
+                    "plataforma": platform.platform(),
+                    "procesadores": os.cpu_count()},
+        "resultados": resultados,
+    }
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(texto + "\n")
+    else:
+        print(texto)
+
+    codigo = 0
+    if importado:
+        if importado["segundos"] * 1000 > args.presupuesto_importacion:
+            print("import PicoPlaca tarda {:.1f} ms, el presupuesto es {} ms".format(
+                importado["segundos"] * 1000, args.presupuesto_importacion), file=sys.stderr)
+            codigo = 1
+        if importado["en_linea"]:
+            print("La consulta sin conexion importa {}".format(", ".join(importado["en_linea"])),
+                  file=sys.stderr)
+            codigo = 1
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            base = json.load(archivo)
+        regresiones = [c for c, razon in comparar(informe, base) if razon > args.umbral]
+        if regresiones:
+            print("{} regresiones por encima de {}x".format(len(regresiones), args.umbral), file=sys.stderr)
+            return 1
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+# Hace importable PicoPlaca.py desde tests/ al correr pytest en la raiz del repositorio.
@@ -0,0 +1,57 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+
+class StubAPI:
+    """
+    Servidor HTTP local que imita la API de festivos.
+
+    responder(params) retorna (estado, cuerpo); cuerpo se envia como JSON.
+    Las consultas recibidas quedan en solicitudes.
+    """
+
+    def __init__(self, responder):
+        self.responder = responder
+        self.solicitudes = []
+        stub = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                stub.solicitudes.append(params)
+                estado, cuerpo = stub.responder(params)
+                datos = json.dumps(cuerpo).encode()
+                self.send_response(estado)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.url = "http://127.0.0.1:{}/v1/".format(self._servidor.server_port)
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+
+    def cerrar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+@pytest.fixture
+def stub_api():
+    creados = []
+
+    def crear(responder):
+        stub = StubAPI(responder)
+        creados.append(stub)
+        return stub
+
+    yield crear
+    for stub in creados:
+        stub.cerrar()
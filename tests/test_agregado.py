@@ -0,0 +1,74 @@
+import json
+import random
+
+import pytest
+
+import PicoPlaca as pp
+
+
+def _columnas(n, semilla=7):
+    azar = random.Random(semilla)
+    placas, fechas, horas, distritos = [], [], [], []
+    for _ in range(n):
+        placas.append(azar.choice(["PBX-", "PAX-", "PB-", "GUE-"]) + "{:04d}".format(azar.randrange(10000)))
+        fechas.append(azar.choice(["2024-07-{:02d}".format(azar.randint(1, 31)), "2024-08-09", "2024-12-06"]))
+        horas.append("{:02d}:{:02d}".format(azar.randrange(24), azar.randrange(60)))
+        distritos.append(azar.choice(["Norte", "Sur", ""]))
+    # Filas invalidas dispersas, como en los datos reales de camaras
+    for i, (columna, valor) in enumerate([(placas, "PBX-12"), (fechas, "2024-02-30"), (horas, "25:00"),
+                                          (fechas, "")]):
+        columna[7 + 50 * i] = valor
+    return placas, fechas, horas, distritos
+
+
+def _por_filas(placas, fechas, horas, distritos):
+    agregado = pp.AgregadoRestricciones()
+    for fila in zip(placas, fechas, horas, distritos):
+        agregado.agregar(*fila)
+    return agregado
+
+
+def test_bloque_con_filas_invalidas_sigue_vectorizado():
+    columnas = _columnas(400)
+    agregado = pp.AgregadoRestricciones()
+
+    def fila_por_fila(*args, **kwargs):
+        pytest.fail("el bloque no debe sumarse fila por fila")
+
+    agregado.agregar = fila_por_fila
+    assert agregado.agregar_bloque(*columnas) == 4
+    esperado = _por_filas(*columnas).a_dict()
+    assert agregado.a_dict() == esperado
+    assert (esperado["registros"], esperado["errores"]) == (400, 4)
+    assert sum(f["restringidos"] for f in esperado["grupos"]) > 0
+
+
+def test_bloque_solo_invalido():
+    agregado = pp.AgregadoRestricciones()
+    assert agregado.agregar_bloque(["PBX-12", "X"], ["2024-07-01", "2024-07-01"], ["08:00", "08:00"]) == 2
+    assert agregado.a_dict() == {"version": 1, "registros": 2, "errores": 2, "grupos": []}
+
+
+def test_fusionar_fragmentos_igual_al_total():
+    placas, fechas, horas, distritos = _columnas(600, semilla=11)
+    total = pp.AgregadoRestricciones()
+    total.agregar_bloque(placas, fechas, horas, distritos)
+    fusionado = pp.AgregadoRestricciones()
+    for inicio in range(0, 600, 250):
+        parcial = pp.AgregadoRestricciones()
+        parcial.agregar_bloque(placas[inicio:inicio + 250], fechas[inicio:inicio + 250],
+                               horas[inicio:inicio + 250], distritos[inicio:inicio + 250])
+        fusionado.fusionar(parcial)
+    assert fusionado.a_dict() == total.a_dict()
+
+
+def test_ida_y_vuelta_por_json():
+    agregado = pp.AgregadoRestricciones()
+    agregado.agregar_bloque(*_columnas(300, semilla=3))
+    datos = json.loads(json.dumps(agregado.a_dict()))
+    assert pp.AgregadoRestricciones.desde_dict(datos).a_dict() == agregado.a_dict()
+    datos["grupos"][0]["hora"] = 24
+    with pytest.raises(ValueError):
+        pp.AgregadoRestricciones.desde_dict(datos)
+    with pytest.raises(ValueError):
+        pp.AgregadoRestricciones.desde_dict({"version": 0})
@@ -0,0 +1,65 @@
+import datetime
+import random
+
+import pytest
+
+import PicoPlaca as pp
+
+
+def validacion_anterior(valor):
+    """La validacion de fechas de PicoPlaca antes de analizar_fecha."""
+    if len(valor) != 10:
+        raise ValueError
+    return datetime.datetime.strptime(valor, "%Y-%m-%d").date().toordinal()
+
+
+def resultado(funcion, valor):
+    try:
+        return funcion(valor)
+    except ValueError:
+        return None
+
+
+@pytest.mark.parametrize("valor", [
+    "2021-04-02", "2021-04- 2", "2024-02-29", "2023-02-29", "0000-01-01", "0001-01-01",
+    "9999-12-31", "2021-4-02", "2021-04-2 ", " 2021-04-2", "2021-04-00", "2021-13-01",
+    "２０２１-04-02", "2021-04-1２", "2021-04-0２", "2021-0４-02", "2021-04-3１", "2021/04/02",
+])
+def test_fecha_igual_a_strptime(valor):
+    assert resultado(pp.analizar_fecha, valor) == resultado(validacion_anterior, valor)
+
+
+def test_fecha_igual_a_strptime_aleatorio():
+    azar = random.Random(0)
+    alfabeto = "0123456789- /٣１x"
+    for _ in range(20000):
+        valor = list("{:04d}-{:02d}-{:02d}".format(azar.randint(0, 9999), azar.randint(0, 13),
+                                                   azar.randint(0, 32)))
+        for _ in range(azar.randint(0, 2)):
+            valor[azar.randrange(len(valor))] = azar.choice(alfabeto)
+        valor = "".join(valor)
+        assert resultado(pp.analizar_fecha, valor) == resultado(validacion_anterior, valor), valor
+
+
+def test_fecha_en_bytes():
+    assert pp.analizar_fecha(b"2021-04-02") == datetime.date(2021, 4, 2).toordinal()
+    with pytest.raises(ValueError, match="AAAA-MM-DD"):
+        pp.analizar_fecha(b"2021-04-32")
+
+
+def test_es_hora_pico_sin_strptime(monkeypatch):
+    class SinStrptime(datetime.datetime):
+        @classmethod
+        def strptime(cls, *args):
+            raise AssertionError("es_hora_pico no debe usar strptime")
+
+    monkeypatch.setattr(pp.datetime, "datetime", SinStrptime)
+    evaluador = pp.EvaluadorPicoPlaca()
+    version = evaluador.version(datetime.date(2024, 7, 22))
+    assert [evaluador.es_hora_pico(h, version) for h in ("06:59", "07:00", "09:30", "09:31", "19:30")] == [
+        False, True, True, False, True]
+    with pytest.raises(ValueError, match="HH:MM"):
+        evaluador.es_hora_pico("24:00", version)
+    with pytest.raises(ValueError, match="does not match format"):
+        evaluador.es_hora_pico("08:", version)
+    assert pp.PicoPlaca("PBX-1231", "2024-07-22", "08:", False)._Es_Hora_Pico("08:30") is True
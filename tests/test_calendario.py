@@ -0,0 +1,78 @@
+import datetime
+import threading
+
+import pytest
+
+import PicoPlaca as pp
+
+
+def test_contadores():
+    calendario = pp.CalendarioFestivos(instantanea=None)
+    assert calendario.es_festivo("2024-12-06", "EC-P")
+    assert calendario.estadisticas() == {"aciertos": 0, "fallos": 2, "instantanea": 0, "entradas": 2}
+    assert not calendario.es_festivo(datetime.date(2024, 7, 23), "EC-P")
+    # Una provincia sin festivos locales no necesita tabla propia
+    assert calendario.es_festivo("2024-12-25", "EC-N")
+    assert calendario.estadisticas() == {"aciertos": 3, "fallos": 2, "instantanea": 0, "entradas": 2}
+    calendario.limpiar()
+    assert calendario.estadisticas() == {"aciertos": 0, "fallos": 0, "instantanea": 0, "entradas": 0}
+
+
+def test_tablas_de_la_instantanea():
+    calendario = pp.CalendarioFestivos(instantanea=pp.InstantaneaFestivos.compilar([2024]))
+    assert calendario.es_festivo("2024-12-06", "EC-P")
+    assert not calendario.es_festivo("2025-12-08", "EC-P")
+    assert calendario.estadisticas()["instantanea"] == 2
+
+
+def test_desalojo_de_la_menos_usada():
+    calendario = pp.CalendarioFestivos(max_entradas=3, instantanea=None)
+    for año in (2020, 2021, 2022):
+        calendario.nacional(año)
+    calendario.nacional(2020)  # 2021 pasa a ser la menos usada
+    calendario.nacional(2023)
+    assert calendario.estadisticas()["entradas"] == 3
+    fallos = calendario.fallos
+    calendario.nacional(2020)
+    calendario.nacional(2022)
+    calendario.nacional(2023)
+    assert calendario.fallos == fallos
+    calendario.nacional(2021)
+    assert calendario.fallos == fallos + 1
+    assert calendario.estadisticas()["entradas"] == 3
+    with pytest.raises(ValueError):
+        pp.CalendarioFestivos(max_entradas=0)
+
+
+def test_precalentar_un_rango():
+    calendario = pp.CalendarioFestivos(instantanea=None)
+    calendario.precalentar(range(2020, 2031), "EC-G")
+    assert calendario.estadisticas() == {"aciertos": 0, "fallos": 22, "instantanea": 0, "entradas": 22}
+    for año in range(2020, 2031):
+        calendario.tabla("EC-G", año)
+    assert calendario.estadisticas()["fallos"] == 22
+    assert calendario.estadisticas()["aciertos"] == 22
+
+
+def test_consultas_desde_varios_hilos():
+    calendario = pp.CalendarioFestivos(max_entradas=8, instantanea=None)
+    esperado = {año: pp.CalendarioFestivos(instantanea=None).tabla("EC-P", año) for año in range(2010, 2030)}
+    errores = []
+
+    def consultar(desplazamiento):
+        try:
+            for i in range(200):
+                año = 2010 + (i * 7 + desplazamiento) % 20
+                assert calendario.tabla("EC-P", año) == esperado[año]
+        except AssertionError as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=consultar, args=(d,)) for d in range(6)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert errores == []
+    estadisticas = calendario.estadisticas()
+    assert estadisticas["aciertos"] + estadisticas["fallos"] == 6 * 200 * 2
+    assert estadisticas["entradas"] <= 8
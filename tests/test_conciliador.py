@@ -0,0 +1,71 @@
+import json
+import os
+import subprocess
+import sys
+
+import PicoPlaca as pp
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def navidad(q):
+    if q["month"] != "12":
+        return 200, []
+    return 200, [{"name": "Christmas Day", "location": "Ecuador", "date": "12/25/{}".format(q["year"])}]
+
+
+def conciliador(url, tmp_path, **kwargs):
+    kwargs.setdefault("proveedor", pp.ProveedorFestivosEnLinea(
+        api_key="clave", url_base=url, ruta_cache=str(tmp_path / "cache.json")))
+    return pp.ConciliadorFestivos(api_key="clave", url_base=url, tasa=1000.0, trabajadores=2,
+                                  espera_reintento=0, **kwargs)
+
+
+def test_descarga_y_continua(stub_api, tmp_path):
+    stub = stub_api(navidad)
+    ruta = str(tmp_path / "progreso.json")
+    assert conciliador(stub.url, tmp_path, ruta_progreso=ruta).descargar([2024]) == 12
+    assert {q["country"] for q in stub.solicitudes} == {"EC"}
+    with open(ruta, encoding="utf-8") as archivo:
+        datos = json.load(archivo)
+    assert (datos["url_base"], datos["pais"]) == (stub.url, "EC")
+    assert conciliador(stub.url, tmp_path, ruta_progreso=ruta).descargar([2024]) == 0
+    assert len(stub.solicitudes) == 12
+
+
+def test_progreso_de_otra_url_o_refrescar(stub_api, tmp_path):
+    viejo, nuevo = stub_api(navidad), stub_api(navidad)
+    ruta = str(tmp_path / "progreso.json")
+    conciliador(viejo.url, tmp_path, ruta_progreso=ruta).descargar([2024])
+    assert conciliador(nuevo.url, tmp_path, ruta_progreso=ruta).descargar([2024]) == 12
+    assert conciliador(nuevo.url, tmp_path, ruta_progreso=ruta, refrescar=True).descargar([2024]) == 12
+    assert len(nuevo.solicitudes) == 24
+
+
+def test_solicitudes_descuentan_la_cuota_compartida(stub_api, tmp_path):
+    stub = stub_api(navidad)
+    proveedor = pp.ProveedorFestivosEnLinea(api_key="clave", url_base=stub.url, cuota_mensual=5,
+                                            ruta_cache=str(tmp_path / "cache.json"))
+    c = conciliador(stub.url, tmp_path, proveedor=proveedor)
+    informe = c.conciliar([2024], provincias=[])
+    assert len(stub.solicitudes) == 5
+    assert informe["incompletos"] == [2024]
+    assert len(c.errores) == 7
+    with open(tmp_path / "cache.json", encoding="utf-8") as archivo:
+        assert list(json.load(archivo)["cuota"].values()) == [5]
+    # La cuota agotada tambien deja al proveedor sin solicitudes
+    assert proveedor.es_festivo("2024-12-25") is True
+    assert len(stub.solicitudes) == 5
+
+
+def test_cli_clave_rechazada(stub_api, tmp_path):
+    stub = stub_api(lambda q: (401, {"error": "unauthorized"}))
+    entorno = dict(os.environ, PICOPLACA_CACHE=str(tmp_path / "cache.json"))
+    entorno.pop("HOLIDAYS_API_KEY", None)
+    resultado = subprocess.run(
+        [sys.executable, os.path.join(RAIZ, "PicoPlaca.py"), "--conciliar", "2024", "2024",
+         "--url-api", stub.url, "--progreso", str(tmp_path / "progreso.json"), "--tasa", "1000"],
+        capture_output=True, text=True, env=entorno, timeout=60)
+    assert resultado.returncode == 1
+    assert "Falta la clave API" in resultado.stderr
+    assert "Traceback" not in resultado.stderr
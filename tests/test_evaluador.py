@@ -0,0 +1,73 @@
+import itertools
+import threading
+
+import PicoPlaca as pp
+
+
+CASOS = list(itertools.product(
+    ["PBX-1234", "PBX-1230", "AA-0001", "PCD-0123"],
+    ["2024-07-22", "2024-07-26", "2024-12-25", "2024-07-27"],
+    ["06:59", "07:00", "09:30", "12:00", "16:00", "19:31"],
+))
+
+
+def test_instrumentacion_no_cambia_respuestas():
+    evaluador = pp.EvaluadorPicoPlaca()
+    esperado = [evaluador.evaluar(*caso) for caso in CASOS]
+    pp.INSTRUMENTACION.reiniciar()
+    pp.INSTRUMENTACION.activar()
+    try:
+        assert [evaluador.evaluar(*caso) for caso in CASOS] == esperado
+    finally:
+        pp.INSTRUMENTACION.desactivar()
+    etapas = pp.INSTRUMENTACION.etapas
+    assert etapas["validacion"][0] == len(CASOS)
+    assert etapas["festivo_sin_conexion"][0] == len(CASOS)
+    assert {"exencion", "hora_pico", "dia_semana"} <= set(etapas)
+    pp.INSTRUMENTACION.reiniciar()
+
+
+def test_picoplaca_delega_en_el_evaluador(monkeypatch):
+    evaluador = pp.EvaluadorPicoPlaca()
+    esperado = [evaluador.evaluar(*caso) for caso in CASOS]
+    assert [pp.PicoPlaca(*caso, False).predecir() for caso in CASOS] == esperado
+    memo = pp.MemoVeredictos(evaluador)
+    try:
+        monkeypatch.setattr(pp.PicoPlaca, "memo", memo)
+        assert [pp.PicoPlaca(*caso, False).predecir() for caso in CASOS] == esperado
+    finally:
+        memo.cerrar()
+    # Con otras reglas en el evaluador, predecir() responde con ellas
+    todo_el_dia = pp.ReglasPicoPlaca.desde_dict({"versiones": [
+        {"vigente_desde": "2010-01-01", "restricciones": {"Sabado": list(range(10))},
+         "horas_pico": [["00:00", "23:59"]], "letras_exentas": ""}]})
+    monkeypatch.setattr(pp.PicoPlaca, "memo", None)
+    monkeypatch.setattr(pp.PicoPlaca, "evaluador", pp.EvaluadorPicoPlaca(reglas=todo_el_dia))
+    assert pp.PicoPlaca("PBX-1234", "2024-07-27", "12:00", False).predecir() is False
+    assert pp.PicoPlaca("PBX-1234", "2024-07-26", "08:00", False).predecir() is True
+
+
+def test_evaluaciones_concurrentes():
+    evaluador = pp.EvaluadorPicoPlaca(calendario=pp.CalendarioFestivos(max_entradas=2, instantanea=None))
+    esperado = [pp.EvaluadorPicoPlaca().evaluar(*caso) for caso in CASOS]
+    memo = pp.MemoVeredictos(evaluador, max_entradas=2)
+    barrera = threading.Barrier(8)
+    resultados = {}
+
+    def evaluar(i):
+        barrera.wait()
+        resultados[i] = [
+            [evaluador.evaluar(*caso) for caso in CASOS],
+            [memo.evaluar(*caso) for caso in CASOS],
+            [evaluador.evaluar_validado(caso[0], evaluador.validar_fecha(caso[1]), caso[2]) for caso in CASOS],
+        ]
+
+    try:
+        hilos = [threading.Thread(target=evaluar, args=(i,)) for i in range(8)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+    finally:
+        memo.cerrar()
+    assert resultados == {i: [esperado] * 3 for i in range(8)}
@@ -0,0 +1,78 @@
+import datetime
+import os
+import subprocess
+import sys
+
+import PicoPlaca as pp
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MARTES = datetime.date(2024, 7, 23)
+
+
+def test_festividades_ecuador():
+    festivos = pp.FestividadesEcuador(prov="EC-P")
+    assert datetime.date(2024, 12, 6) in festivos
+    assert "2024-12-25" in festivos
+    assert datetime.datetime(2024, 1, 1, 8, 30) in festivos
+    assert MARTES not in festivos
+    assert festivos.years == {2024}
+    assert festivos.get("2024-01-01") == "Año Nuevo [New Year's Day]"
+    assert datetime.date(2024, 12, 6) not in pp.FestividadesEcuador(prov="EC-G")
+    sin_expandir = pp.FestividadesEcuador(prov="EC-P", expand=False)
+    assert "2024-12-25" not in sin_expandir and not sin_expandir.years
+
+
+def test_tablas_iguales_a_la_instantanea():
+    # Si falla, cambiaron las reglas sin incrementar FestividadesEcuador.VERSION_REGLAS
+    assert pp.InstantaneaFestivos.abrir(pp.RUTA_FESTIVOS).vigente
+    calculado = pp.CalendarioFestivos(instantanea=None)
+    for año in range(2000, 2061):
+        assert pp.CALENDARIO_FESTIVOS.nacional(año) == calculado.nacional(año)
+        for prov in pp.FESTIVOS_PROVINCIALES:
+            assert pp.CALENDARIO_FESTIVOS.provincial(prov, año) == calculado.provincial(prov, año)
+    assert pp.CALENDARIO_FESTIVOS.desde_instantanea > 0
+
+
+def test_instantanea_sin_dateutil():
+    codigo = ("import sys, PicoPlaca as pp; assert pp.CALENDARIO_FESTIVOS.es_festivo('2024-12-06', 'EC-P'); "
+              "assert 'dateutil' not in sys.modules")
+    subprocess.run([sys.executable, "-c", codigo], check=True, cwd=RAIZ, timeout=60)
+
+
+def _instantanea_con_martes(huella=None):
+    tablas = pp.InstantaneaFestivos.compilar([2024]).tablas
+    tablas[("EC", 2024)] = tablas[("EC", 2024)] + (MARTES.toordinal(),)
+    return pp.InstantaneaFestivos(tablas, huella)
+
+
+def test_instantanea_de_otras_reglas_se_ignora(tmp_path):
+    ruta = str(tmp_path / "festivos.pyfe")
+    _instantanea_con_martes().guardar(ruta)
+    assert pp.InstantaneaFestivos.abrir(ruta).vigente
+    assert pp.CalendarioFestivos(instantanea=ruta).es_festivo(MARTES)
+
+    _instantanea_con_martes(huella=pp.InstantaneaFestivos.abrir(ruta).huella ^ 1).guardar(ruta)
+    vieja = pp.CalendarioFestivos(instantanea=ruta)
+    assert not vieja.es_festivo(MARTES)
+    assert vieja.desde_instantanea == 0
+    assert not pp.CalendarioFestivos(instantanea=pp.InstantaneaFestivos.abrir(ruta)).es_festivo(MARTES)
+
+
+def test_archivo_de_formato_anterior_se_ignora(tmp_path):
+    ruta = tmp_path / "festivos.pyfe"
+    ruta.write_bytes(b"PYFE\x01\x00\x00\x00\x00\x00\x00\x00")
+    assert not pp.CalendarioFestivos(instantanea=str(ruta)).es_festivo(MARTES)
+
+
+def test_tablas_provinciales_solo_locales():
+    calendario = pp.CalendarioFestivos(instantanea=None)
+    for año in (2015, 2016, 2024):
+        nacional = calendario.nacional(año)
+        for prov in pp.PROVINCIAS:
+            fijas = [datetime.date(año, mes, dia) for mes, dia, _ in pp.FESTIVOS_PROVINCIALES.get(prov, ())]
+            local = calendario.provincial(prov, año)
+            assert len(local) == len(fijas)
+            # Cada fecha local es su fecha fija o su traslado (a lo sumo 3 dias)
+            assert all(any(abs((f - fija).days) <= 3 for fija in fijas) for f in local)
+            assert calendario.tabla(prov, año) == nacional | local
@@ -0,0 +1,44 @@
+import io
+
+import pytest
+
+import PicoPlaca as pp
+
+ENTRADA = ("placa,fecha,hora\n"
+           "PBX-1234,2024-07-23,08:00\n"
+           "PBX-1234,2024-07-23,12:00\n"
+           "pbx-1234,2024-07-23,08:00\n"
+           "PBX-1233,2024-02-30,08:00\n"
+           "AB-0003,2024-07-23,08:00\n")
+
+ESPERADO = ("linea,placa,fecha,hora,puede_circular,error\n"
+            "2,PBX-1234,2024-07-23,08:00,NO,\n"
+            "3,PBX-1234,2024-07-23,12:00,SI,\n"
+            "4,pbx-1234,2024-07-23,08:00,,\"{}\"\n"
+            "5,PBX-1233,2024-02-30,08:00,,{}\n"
+            "6,AB-0003,2024-07-23,08:00,SI,\n").format(
+                pp.EvaluadorPicoPlaca.MENSAJE_PLACA, pp.EvaluadorPicoPlaca.MENSAJE_FECHA)
+
+
+def test_filas_invalidas_no_sacan_al_bloque_del_lote(monkeypatch):
+    evaluador = pp.EvaluadorPicoPlaca()
+
+    def escalar(*args):
+        raise AssertionError("el bloque debe evaluarse con componentes_lote")
+
+    evaluador.evaluar = escalar
+    monkeypatch.setattr(pp.PicoPlaca, "evaluador", evaluador)
+    salida = io.StringIO()
+    assert pp.procesar_flujo(io.StringIO(ENTRADA), salida) == (5, 2)
+    assert salida.getvalue() == ESPERADO
+
+
+def test_paralelo_igual_al_secuencial():
+    salida = io.StringIO()
+    assert pp.procesar_flujo_paralelo(io.StringIO(ENTRADA), salida, trabajadores=2, tamaño_bloque=2) == (5, 2)
+    assert salida.getvalue() == ESPERADO
+
+
+def test_paralelo_en_linea_se_rechaza():
+    with pytest.raises(ValueError, match="trabajadores"):
+        pp.procesar_flujo_paralelo(io.StringIO(ENTRADA), io.StringIO(), trabajadores=2, en_linea=True)
@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+import PicoPlaca as pp
+
+INVALIDAS = [("PBX-12", "2024-07-22", "08:00"), ("pbx-1234", "2024-07-22", "08:00"),
+             ("PBX-1234", "2024-02-30", "08:00"), ("PBX-1234", "2024/07/22", "08:00"),
+             ("PBX-1234", "2024-07-22", "24:00"), ("PBX-1234", "2024-07-22", "8:00")]
+
+
+def _filas(n, semilla=5):
+    azar = random.Random(semilla)
+    filas = []
+    for _ in range(n):
+        # Letras exentas (AUZEXM), placas de dos letras y no exentas
+        letras = azar.choice(["PBX", "PAX", "PUZ", "PMC", "GEE", "PB", "AA", "ZX"])
+        placa = "{}-{:04d}".format(letras, azar.randrange(10000))
+        # Festivos nacionales y de Quito, dias laborables y fines de semana
+        fecha = azar.choice(["2024-12-06", "2024-12-25", "2024-08-09", "2024-02-12", "2024-02-13",
+                             "2024-07-{:02d}".format(azar.randint(1, 31))])
+        hora = "{:02d}:{:02d}".format(azar.choice([6, 7, 9, 12, 16, 19, 22]), azar.randrange(60))
+        filas.append((placa, fecha, hora))
+    return filas
+
+
+def _predecir(fila):
+    return pp.PicoPlaca(*fila, False).predecir()
+
+
+def test_mismas_respuestas_que_predecir():
+    filas = _filas(2000)
+    placas, fechas, horas = (list(c) for c in zip(*filas))
+    lote = pp.PicoPlaca.predecir_lote(placas, fechas, horas).tolist()
+    assert lote == [_predecir(f) for f in filas]
+    assert True in lote and False in lote
+
+
+@pytest.mark.parametrize("fila", INVALIDAS)
+def test_filas_invalidas_mismo_error_que_predecir(fila):
+    with pytest.raises(ValueError) as individual:
+        _predecir(fila)
+    filas = _filas(20) + [fila]
+    with pytest.raises(ValueError) as lote:
+        pp.PicoPlaca.predecir_lote(*(list(c) for c in zip(*filas)))
+    assert str(lote.value) == "Fila 20: {}".format(individual.value)
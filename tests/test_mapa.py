@@ -0,0 +1,117 @@
+import datetime
+
+import pytest
+
+import PicoPlaca as pp
+
+
+def test_mascaras_iguales_al_calculo(tmp_path):
+    ruta = str(tmp_path / "mapa.pypm")
+    assert pp.MapaRestricciones.compilar("2024-01-01", "2024-12-31", ruta, "EC-G") == 366
+    mapa = pp.MapaRestricciones.abrir(ruta)
+    try:
+        assert mapa.prov == "EC-G"
+        for i in range(366):
+            fecha = datetime.date(2024, 1, 1) + datetime.timedelta(days=i)
+            assert mapa.mascara(fecha) == pp.MapaRestricciones.mascara_calculada(fecha, "EC-G")
+        # La Fundacion de Guayaquil (jueves 2024-07-25) se traslada al viernes
+        assert mapa.mascara(datetime.date(2024, 7, 26)) == 0
+        assert mapa.mascara(datetime.date(2024, 7, 25)) != 0
+    finally:
+        mapa.cerrar()
+
+
+def test_provincia_distinta_se_rechaza(tmp_path):
+    ruta = str(tmp_path / "mapa.pypm")
+    pp.MapaRestricciones.compilar("2024-01-01", "2024-01-31", ruta, "EC-G")
+    with pytest.raises(ValueError, match="EC-G"):
+        pp.MapaRestricciones.abrir(ruta, "EC-P")
+    pp.MapaRestricciones.abrir(ruta, "EC-G").cerrar()
+
+
+def test_evaluador_de_otra_provincia_se_rechaza(tmp_path):
+    ruta = str(tmp_path / "mapa.pypm")
+    pp.MapaRestricciones.compilar("2024-12-01", "2024-12-31", ruta, "EC-P")
+    mapa = pp.MapaRestricciones.abrir(ruta)
+    try:
+        with pytest.raises(ValueError, match="EC-P"):
+            pp.EvaluadorPicoPlaca(mapa=mapa, prov="EC-G")
+        # La Fundacion de Quito (viernes 2024-12-06) solo es festiva en EC-P
+        assert pp.EvaluadorPicoPlaca(mapa=mapa).evaluar("PBX-1239", "2024-12-06", "08:00") is True
+        assert pp.EvaluadorPicoPlaca(prov="EC-G").evaluar("PBX-1239", "2024-12-06", "08:00") is False
+    finally:
+        mapa.cerrar()
+
+
+def test_archivo_incompatible(tmp_path):
+    ruta = tmp_path / "otro.bin"
+    ruta.write_bytes(b"XXXX" + bytes(40))
+    with pytest.raises(ValueError):
+        pp.MapaRestricciones.abrir(str(ruta))
+    ruta.write_bytes(b"PY")
+    with pytest.raises(ValueError):
+        pp.MapaRestricciones.abrir(str(ruta))
+
+
+def _reglas_2025():
+    return pp.ReglasPicoPlaca.desde_dict({"versiones": [
+        {"vigente_desde": "2010-05-03",
+         "restricciones": {"Lunes": [1, 2], "Martes": [3, 4], "Miercoles": [5, 6],
+                           "Jueves": [7, 8], "Viernes": [9, 0]},
+         "horas_pico": [["07:00", "09:30"], ["16:00", "19:30"]], "letras_exentas": "AUZEXM"},
+        {"vigente_desde": "2025-01-01",
+         "restricciones": {"Lunes": [3, 4], "Martes": [1, 2]},
+         "horas_pico": [["06:00", "08:00"]], "letras_exentas": ""}]})
+
+
+def test_mapa_de_otras_reglas(tmp_path):
+    ruta = str(tmp_path / "mapa.pypm")
+    pp.MapaRestricciones.compilar("2024-01-01", "2024-12-31", ruta, "EC-P")
+    mapa = pp.MapaRestricciones.abrir(ruta)
+    try:
+        assert mapa.huella == pp.ReglasPicoPlaca.predeterminadas().huella
+        with pytest.raises(ValueError, match="otras reglas"):
+            pp.EvaluadorPicoPlaca(mapa=mapa, reglas=_reglas_2025())
+        motor = pp.MotorReglas(reglas=pp.ReglasPicoPlaca.predeterminadas())
+        evaluador = pp.EvaluadorPicoPlaca(mapa=mapa, reglas=motor)
+        lunes = datetime.date(2024, 1, 8)
+        assert evaluador.digitos_restringidos(lunes) == 0b110
+        # Tras una recarga con otras reglas el mapa deja de usarse
+        motor.reglas = _reglas_2025()
+        assert evaluador.digitos_restringidos(lunes) == 0b110
+        assert evaluador.digitos_restringidos(datetime.date(2025, 1, 6)) == 0b11000
+        assert not evaluador.evaluar("PBX-1233", "2025-01-06", "07:30")
+    finally:
+        mapa.cerrar()
+
+
+def test_fuera_del_rango_usa_las_reglas_del_evaluador(tmp_path):
+    ruta = str(tmp_path / "mapa.pypm")
+    reglas = _reglas_2025()
+    pp.MapaRestricciones.compilar("2024-01-01", "2024-01-31", ruta, "EC-P", reglas)
+    mapa = pp.MapaRestricciones.abrir(ruta)
+    try:
+        evaluador = pp.EvaluadorPicoPlaca(mapa=mapa, reglas=reglas)
+        assert evaluador.mascara_del_dia(datetime.date(2025, 1, 7)) == 0b110
+        assert not evaluador.evaluar("PBX-1231", "2025-01-07", "06:30")
+    finally:
+        mapa.cerrar()
+
+
+def test_tablas_lote_y_hora_pico_por_fecha():
+    reglas = _reglas_2025()
+    tablas = reglas.tablas_lote()
+    assert tablas is reglas.tablas_lote()
+    for i, version in enumerate(reglas.versiones):
+        assert tablas["pico"][i].tolist() == [version.es_pico(m) for m in range(24 * 60)]
+    evaluador = pp.EvaluadorPicoPlaca(reglas=reglas)
+    placas = ["PBX-1231", "PBX-1231", "PAB-0003"]
+    fechas = ["2025-01-07", "2024-01-09", "2025-01-06"]
+    horas = ["06:30", "06:30", "07:30"]
+    assert evaluador.evaluar_lote(placas, fechas, horas).tolist() == [
+        evaluador.evaluar(*fila) for fila in zip(placas, fechas, horas)]
+    consulta = pp.PicoPlaca("PBX-1231", "2025-01-07", "06:30", False)
+    consulta.evaluador = evaluador
+    assert consulta._Es_Hora_Pico("06:30")
+    consulta.fecha = "2024-01-09"
+    assert not consulta._Es_Hora_Pico("06:30")
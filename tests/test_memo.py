@@ -0,0 +1,56 @@
+import datetime
+
+import PicoPlaca as pp
+
+
+def test_entrada_calculada_durante_una_invalidacion_no_se_guarda():
+    evaluador = pp.EvaluadorPicoPlaca()
+    memo = pp.MemoVeredictos(evaluador)
+    try:
+        es_festivo = evaluador.es_festivo
+
+        def invalidar_mientras_calcula(dia, en_linea=False):
+            # Otro hilo recibe el aviso del calendario a mitad del calculo
+            memo.invalidar([dia])
+            return es_festivo(dia, en_linea)
+
+        evaluador.es_festivo = invalidar_mientras_calcula
+        assert memo.evaluar("PBX-1234", "2024-07-23", "08:00") is False
+        assert memo.estadisticas()["fallos"] == 1
+        del evaluador.es_festivo
+        memo.evaluar("PBX-1234", "2024-07-23", "08:00")
+        memo.evaluar("PBX-1234", "2024-07-23", "08:00")
+        assert memo.estadisticas()["fallos"] == 2
+        assert memo.estadisticas()["aciertos"] == 1
+    finally:
+        memo.cerrar()
+
+
+def test_ajuste_del_calendario_invalida_la_fecha():
+    calendario = pp.CalendarioFestivos()
+    memo = pp.MemoVeredictos(pp.EvaluadorPicoPlaca(calendario=calendario))
+    try:
+        assert memo.evaluar("PBX-1234", "2024-07-23", "08:00") is False
+        dia = datetime.date(2024, 7, 23)
+        calendario.ajustar("EC-P", 2024, calendario.provincial("EC-P", 2024) | {dia})
+        assert memo.evaluar("PBX-1234", "2024-07-23", "08:00") is True
+    finally:
+        memo.cerrar()
+
+
+def test_escrituras_no_canonicas_comparten_la_entrada():
+    calendario = pp.CalendarioFestivos()
+    memo = pp.MemoVeredictos(pp.EvaluadorPicoPlaca(calendario=calendario))
+    try:
+        # Los digitos 3-4 se restringen los martes y 9-0 los viernes
+        assert memo.evaluar("PBX-1234", "2024-07-2３", "08:00") is False
+        assert memo.evaluar("PBX-1234", "2024-07-23", "08:00") is False
+        assert memo.evaluar("PBX-1230", "2024-07- 5", "08:00") is False
+        assert memo.estadisticas()["entradas"] == 2
+        nuevos = {datetime.date(2024, 7, 23), datetime.date(2024, 7, 5)}
+        calendario.ajustar("EC-P", 2024, calendario.provincial("EC-P", 2024) | nuevos)
+        assert memo.estadisticas()["entradas"] == 0
+        assert memo.evaluar("PBX-1234", "2024-07-2３", "08:00") is True
+        assert memo.evaluar("PBX-1230", "2024-07- 5", "08:00") is True
+    finally:
+        memo.cerrar()
@@ -0,0 +1,50 @@
+import datetime
+
+import PicoPlaca as pp
+
+LUNES = datetime.datetime(2024, 7, 22, 6, 0)
+MARTES = datetime.date(2024, 7, 23)
+
+
+class SinAPI:
+    def es_festivo(self, fecha):
+        raise AssertionError("el planificador no debe consultar la API")
+
+
+def planificador(calendario):
+    evaluador = pp.EvaluadorPicoPlaca(calendario=calendario, proveedor=SinAPI())
+    p = pp.PlanificadorRestricciones(evaluador, desde=LUNES)
+    for placa in ("PBX-1231", "PBX-1233", "PBX-1234", "PAX-1233"):
+        p.agregar(placa)
+    return p
+
+
+def test_eventos_de_la_hora_pico():
+    p = planificador(pp.CalendarioFestivos(instantanea=None))
+    try:
+        assert p.proxima_transicion() == datetime.datetime(2024, 7, 22, 7, 0)
+        eventos = p.avanzar(datetime.datetime(2024, 7, 23, 7, 0))
+        assert [(i.isoformat(), t, sorted(placas)) for i, t, placas in eventos] == [
+            ("2024-07-22T07:00:00", "entra", ["PBX-1231"]),
+            ("2024-07-22T09:31:00", "sale", ["PBX-1231"]),
+            ("2024-07-22T16:00:00", "entra", ["PBX-1231"]),
+            ("2024-07-22T19:31:00", "sale", ["PBX-1231"]),
+            ("2024-07-23T07:00:00", "entra", ["PBX-1233", "PBX-1234"]),
+        ]
+    finally:
+        p.cerrar()
+
+
+def test_festivo_conciliado_recalcula():
+    calendario = pp.CalendarioFestivos(instantanea=None)
+    p = planificador(calendario)
+    try:
+        p.avanzar(datetime.datetime(2024, 7, 23, 8, 0))
+        assert sorted(p.restringidos()) == ["PBX-1233", "PBX-1234"]
+        calendario.ajustar(pp.CalendarioFestivos.NACIONAL, 2024, calendario.nacional(2024) | {MARTES})
+        assert p.proxima_transicion() == datetime.datetime(2024, 7, 23, 8, 0)
+        eventos = p.avanzar(datetime.datetime(2024, 7, 23, 8, 1))
+        assert [(t, sorted(placas)) for _, t, placas in eventos] == [("sale", ["PBX-1233", "PBX-1234"])]
+        assert p.restringidos() == []
+    finally:
+        p.cerrar()
@@ -0,0 +1,119 @@
+import datetime
+import threading
+import time
+
+import pytest
+import requests
+
+import PicoPlaca as pp
+
+NAVIDAD = [{"name": "Christmas Day", "location": "Ecuador"}]
+
+
+def proveedor(url, **kwargs):
+    kwargs.setdefault("tasa", 1000.0)
+    return pp.ProveedorFestivosEnLinea(api_key="clave", url_base=url, **kwargs)
+
+
+def test_consulta_y_cache(stub_api):
+    stub = stub_api(lambda q: (200, NAVIDAD if q["month"] == "12" else []))
+    p = proveedor(stub.url)
+    assert p.es_festivo("2024-12-25") is True
+    assert p.es_festivo(datetime.date(2024, 12, 25)) is True
+    assert p.es_festivo("2024-03-05") is False
+    assert len(stub.solicitudes) == 2
+    assert stub.solicitudes[0]["api_key"] == "clave"
+    assert p.estadisticas()["aciertos"] == 1
+
+
+def test_jueves_santo_no_es_festivo(stub_api):
+    stub = stub_api(lambda q: (200, [{"name": "Maundy Thursday"}]))
+    assert proveedor(stub.url).es_festivo("2024-03-28") is False
+
+
+def test_cache_en_disco(stub_api, tmp_path):
+    stub = stub_api(lambda q: (200, NAVIDAD))
+    ruta = str(tmp_path / "cache.json")
+    assert proveedor(stub.url, ruta_cache=ruta).es_festivo("2024-12-25") is True
+    assert proveedor(stub.url, ruta_cache=ruta).es_festivo("2024-12-25") is True
+    assert len(stub.solicitudes) == 1
+
+
+def test_consultas_concurrentes_se_agrupan(stub_api):
+    def lento(q):
+        time.sleep(0.2)
+        return 200, NAVIDAD
+
+    stub = stub_api(lento)
+    p = proveedor(stub.url)
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(p.es_festivo("2024-12-25")))
+             for _ in range(8)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert resultados == [True] * 8
+    assert len(stub.solicitudes) == 1
+
+
+def test_cuota_agotada_usa_la_tabla_sin_conexion(stub_api):
+    stub = stub_api(lambda q: (200, []))
+    p = proveedor(stub.url, cuota_mensual=1)
+    assert p.es_festivo("2024-03-05") is False
+    # 2024-12-25 es festivo en la tabla sin conexion
+    assert p.es_festivo("2024-12-25") is True
+    assert len(stub.solicitudes) == 1
+    assert p.estadisticas()["respaldos"] == 1
+
+
+def test_429_usa_la_tabla_sin_conexion(stub_api):
+    stub = stub_api(lambda q: (429, {"error": "quota"}))
+    p = proveedor(stub.url)
+    assert p.es_festivo("2024-12-25") is True
+    assert p.es_festivo("2024-12-26") is False
+    # La cuota queda marcada como agotada: la segunda fecha no llega a la API
+    assert len(stub.solicitudes) == 1
+
+
+def test_401_llega_tambien_a_las_consultas_en_espera(stub_api):
+    def sin_clave(q):
+        time.sleep(0.2)
+        return 401, {"error": "unauthorized"}
+
+    stub = stub_api(sin_clave)
+    p = proveedor(stub.url)
+    errores = []
+
+    def consultar():
+        try:
+            p.es_festivo("2024-12-25")
+        except requests.HTTPError as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=consultar) for _ in range(4)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert len(errores) == 4
+    assert len(stub.solicitudes) == 1
+
+
+def test_respuesta_que_no_es_lista(stub_api):
+    stub = stub_api(lambda q: (200, {"error": {"message": "invalid api key"}}))
+    with pytest.raises(requests.HTTPError, match="Respuesta invalida"):
+        proveedor(stub.url).es_festivo("2024-12-25")
+
+
+def test_reservar_cuota(tmp_path):
+    ruta = str(tmp_path / "cache.json")
+    p = pp.ProveedorFestivosEnLinea(api_key="clave", url_base="http://127.0.0.1:9/", cuota_mensual=2,
+                                    ruta_cache=ruta)
+    assert p.reservar_cuota() is True
+    assert p.reservar_cuota(guardar=True) is True
+    assert p.reservar_cuota(guardar=True) is False
+    assert p.estadisticas()["solicitudes"] == 2
+    otro = pp.ProveedorFestivosEnLinea(api_key="clave", url_base="http://127.0.0.1:9/", cuota_mensual=2,
+                                       ruta_cache=ruta)
+    assert otro.reservar_cuota() is False
@@ -0,0 +1,157 @@
+import asyncio
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+
+import PicoPlaca as pp
+
+
+class Servidor:
+    """Ejecuta un ServidorPicoPlaca en 127.0.0.1:0 con su bucle en otro hilo."""
+
+    def __init__(self, **kwargs):
+        self.bucle = asyncio.new_event_loop()
+        threading.Thread(target=self.bucle.run_forever, daemon=True).start()
+        self.servidor = pp.ServidorPicoPlaca(puerto=0, **kwargs)
+        self._ejecutar(self.servidor.iniciar())
+        self.puerto = self.servidor.puerto
+
+    def _ejecutar(self, corrutina):
+        return asyncio.run_coroutine_threadsafe(corrutina, self.bucle).result(10)
+
+    def conexion(self):
+        return http.client.HTTPConnection("127.0.0.1", self.puerto, timeout=10)
+
+    def cerrar(self):
+        self._ejecutar(self.servidor.detener())
+        self._ejecutar(self._cancelar_conexiones())
+        self.bucle.call_soon_threadsafe(self.bucle.stop)
+
+    @staticmethod
+    async def _cancelar_conexiones():
+        tareas = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+
+@pytest.fixture
+def servidor():
+    creados = []
+
+    def crear(**kwargs):
+        s = Servidor(**kwargs)
+        creados.append(s)
+        return s
+
+    yield crear
+    for s in creados:
+        s.cerrar()
+
+
+def pedir(conexion, metodo, ruta, cuerpo=None):
+    datos = None if cuerpo is None else json.dumps(cuerpo)
+    conexion.request(metodo, ruta, datos, {"Content-Type": "application/json"})
+    respuesta = conexion.getresponse()
+    return respuesta.status, json.loads(respuesta.read())
+
+
+def test_consulta_y_keep_alive(servidor):
+    conexion = servidor().conexion()
+    estado, r = pedir(conexion, "POST", "/consulta",
+                      {"placa": "PBX-1234", "fecha": "2024-07-23", "hora": "08:00"})
+    assert (estado, r) == (200, {"puede_circular": False})
+    socket_antes = conexion.sock
+    estado, r = pedir(conexion, "POST", "/consulta",
+                      {"placa": "PBX-1234", "fecha": "2024-07-23", "hora": "12:00"})
+    assert (estado, r) == (200, {"puede_circular": True})
+    assert conexion.sock is socket_antes
+    estado, r = pedir(conexion, "POST", "/consulta", {"placa": "pbx-1234", "fecha": "2024-07-25", "hora": "12:00"})
+    assert estado == 400 and r["error"] == pp.EvaluadorPicoPlaca.MENSAJE_PLACA
+
+
+def test_consultas_concurrentes_se_agrupan(servidor):
+    s = servidor(espera_lote=0.05)
+    placas = ["PBX-123{}".format(d) for d in range(10)] + ["mala"]
+    resultados = {}
+
+    def consultar(placa):
+        resultados[placa] = pedir(s.conexion(), "POST", "/consulta",
+                                  {"placa": placa, "fecha": "2024-07-22", "hora": "08:00"})
+
+    hilos = [threading.Thread(target=consultar, args=(p,)) for p in placas]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    for placa in placas[:-1]:
+        esperado = pp.EVALUADOR.evaluar(placa, "2024-07-22", "08:00")
+        assert resultados[placa] == (200, {"puede_circular": esperado})
+    assert resultados["mala"][0] == 400
+
+
+def test_lote(servidor):
+    consultas = [{"placa": "PBX-12{:02d}".format(i), "fecha": "2024-07-2{}".format(i % 7), "hora": "08:00"}
+                 for i in range(40)]
+    consultas += [{"placa": "PBX-1234", "fecha": "2024-02-30", "hora": "08:00"}, "x", {"placa": "PBX-1234"}]
+    estado, r = pedir(servidor().conexion(), "POST", "/lote", {"consultas": consultas})
+    assert estado == 200
+    resultados = r["resultados"]
+    for c, resultado in zip(consultas[:40], resultados):
+        assert resultado == {"puede_circular": pp.EVALUADOR.evaluar(c["placa"], c["fecha"], c["hora"])}
+    assert resultados[40] == {"error": pp.EvaluadorPicoPlaca.MENSAJE_FECHA}
+    assert "error" in resultados[41] and "error" in resultados[42]
+
+
+def test_cuerpos_malformados(servidor):
+    s = servidor()
+    conexion = s.conexion()
+    conexion.request("POST", "/consulta", b"{no es json")
+    respuesta = conexion.getresponse()
+    assert respuesta.status == 400 and "JSON invalido" in json.loads(respuesta.read())["error"]
+    assert pedir(conexion, "POST", "/lote", {"otra": 1})[0] == 400
+    assert pedir(conexion, "GET", "/consulta")[0] == 405
+    assert pedir(conexion, "GET", "/nada")[0] == 404
+    for largo in (b"abc", b"-5"):
+        with socket.create_connection(("127.0.0.1", s.puerto), timeout=10) as crudo:
+            crudo.sendall(b"POST /consulta HTTP/1.1\r\nContent-Length: " + largo + b"\r\n\r\n{}")
+            respuesta = crudo.makefile("rb").read()
+        assert respuesta.startswith(b"HTTP/1.1 400 ")
+        assert b"Content-Length invalido" in respuesta
+
+
+def test_errores_internos_no_detienen_el_servidor(servidor):
+    s = servidor()
+
+    def fallar(*args):
+        raise RuntimeError("falla")
+
+    s.servidor.evaluador = pp.EvaluadorPicoPlaca()
+    s.servidor.evaluador.evaluar = fallar
+    conexion = s.conexion()
+    consulta = {"placa": "PBX-1234", "fecha": "2024-07-22", "hora": "08:00"}
+    assert pedir(conexion, "POST", "/consulta", consulta) == (500, {"error": "Error interno: RuntimeError"})
+    del s.servidor.evaluador.evaluar
+    assert pedir(conexion, "POST", "/consulta", consulta)[0] == 200
+
+
+def test_fallo_de_la_api_es_502(servidor, stub_api):
+    stub = stub_api(lambda q: (401, {"error": "unauthorized"}))
+    proveedor = pp.ProveedorFestivosEnLinea(api_key="clave", url_base=stub.url, tasa=1000.0)
+    s = servidor(evaluador=pp.EvaluadorPicoPlaca(proveedor=proveedor))
+    estado, r = pedir(s.conexion(), "POST", "/consulta",
+                      {"placa": "PBX-1234", "fecha": "2024-07-22", "hora": "08:00", "en_linea": True})
+    assert estado == 502 and r["error"].startswith("Fallo la API de festivos")
+
+
+def test_metricas_de_latencia(servidor):
+    conexion = servidor().conexion()
+    for _ in range(3):
+        pedir(conexion, "POST", "/consulta", {"placa": "PBX-1234", "fecha": "2024-07-22", "hora": "08:00"})
+    assert pedir(conexion, "GET", "/salud") == (200, {"estado": "ok"})
+    estado, metricas = pedir(conexion, "GET", "/metricas")
+    assert estado == 200
+    assert metricas["/consulta"]["cuenta"] == 3
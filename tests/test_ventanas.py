@@ -0,0 +1,69 @@
+import datetime
+
+import pytest
+
+import PicoPlaca as pp
+
+LUNES = datetime.datetime(2024, 7, 22)
+MINUTO = datetime.timedelta(minutes=1)
+
+
+def _reglas_medianoche():
+    # Horas pico que se tocan a medianoche y dos dias seguidos restringidos
+    return pp.ReglasPicoPlaca.desde_dict({"versiones": [
+        {"vigente_desde": "2010-01-01",
+         "restricciones": {"Lunes": [1, 2], "Martes": [1, 2]},
+         "horas_pico": [["00:00", "01:00"], ["23:00", "23:59"]], "letras_exentas": "AUZEXM"}]})
+
+
+def _permitido(evaluador, placa, instante):
+    return evaluador.evaluar(placa, instante.strftime("%Y-%m-%d"), instante.strftime("%H:%M"))
+
+
+def _comparar_minuto_a_minuto(evaluador, placa, desde, minutos, dias):
+    # Primer minuto permitido desde cada minuto, calculado hacia atras con evaluar()
+    total = minutos + dias * 24 * 60
+    permitido = [_permitido(evaluador, placa, desde + i * MINUTO) for i in range(total)]
+    siguiente = [None] * total
+    proximo = None
+    for i in range(total - 1, -1, -1):
+        if permitido[i]:
+            proximo = i
+        siguiente[i] = proximo
+    for i in range(minutos):
+        momento = desde + i * MINUTO
+        esperado = siguiente[i]
+        if esperado is not None and esperado >= i + dias * 24 * 60:
+            esperado = None
+        obtenido = evaluador.proxima_hora_permitida(placa, momento, dias)
+        assert obtenido == (None if esperado is None else desde + esperado * MINUTO), momento
+        ventanas = evaluador.ventanas_restriccion(placa, momento, dias)
+        for (_, fin), (inicio, _) in zip(ventanas, ventanas[1:]):
+            assert fin < inicio
+
+
+@pytest.mark.parametrize("placa", ["PBX-1231", "PBX-1234", "PAX-1233", "PB-1232"])
+def test_reglas_predeterminadas_igual_que_evaluar(placa):
+    _comparar_minuto_a_minuto(pp.EvaluadorPicoPlaca(), placa, LUNES, 2 * 24 * 60, 1)
+
+
+def test_horas_pico_a_medianoche_igual_que_evaluar():
+    evaluador = pp.EvaluadorPicoPlaca(reglas=_reglas_medianoche())
+    h = datetime.timedelta(hours=1)
+    assert evaluador.ventanas_restriccion("PBX-1231", LUNES, 3) == [
+        (LUNES, LUNES + h + MINUTO),
+        (LUNES + 23 * h, LUNES + 25 * h + MINUTO),
+        (LUNES + 47 * h, LUNES + 48 * h)]
+    assert evaluador.proxima_hora_permitida("PBX-1231", LUNES + 23 * h + 30 * MINUTO) == LUNES + 25 * h + MINUTO
+    _comparar_minuto_a_minuto(evaluador, "PBX-1231", LUNES - 2 * h, 52 * 60, 1)
+
+
+def test_restringido_hasta_el_fin_del_horizonte():
+    reglas = pp.ReglasPicoPlaca.desde_dict({"versiones": [
+        {"vigente_desde": "2010-01-01", "restricciones": {"Lunes": [1], "Martes": [1]},
+         "horas_pico": [["00:00", "23:59"]], "letras_exentas": ""}]})
+    evaluador = pp.EvaluadorPicoPlaca(reglas=reglas)
+    momento = LUNES + datetime.timedelta(hours=8)
+    assert evaluador.proxima_hora_permitida("PBX-1231", momento, dias=1) is None
+    assert evaluador.proxima_hora_permitida("PBX-1231", momento, dias=2) == LUNES + datetime.timedelta(days=2)
+    assert evaluador.proxima_hora_permitida("PBX-1235", momento, dias=1) == momento